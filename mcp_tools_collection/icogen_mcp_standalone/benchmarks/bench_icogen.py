@@ -0,0 +1,254 @@
+"""
+PNG转ICO基准测试 - 分阶段测量解码、缩放、编码和写出的耗时与内存峰值
+
+- 合成测试PNG：小图/大图，RGBA/调色板，带/不带透明通道
+- 每种源图像分别测试多组目标尺寸，以及 file（写入文件）和 hex（内存中编码为十六进制）两种输出方式
+- 每个用例在独立子进程中运行，互不影响内存峰值
+- 结果写入JSON文件，可用 --baseline 与之前版本的结果对比
+
+用法:
+    python benchmarks/bench_icogen.py [--repeat N] [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import PIL
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from icogen_mcp.icofile import encode_ico  # noqa: E402
+from icogen_mcp.resize import resize_images  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SOURCE_SIZES = {"small": 128, "large": 1024}
+SOURCE_KINDS = ("rgba_alpha", "rgba_opaque", "palette_alpha", "palette_opaque")
+SIZE_SETS = {
+    "default": [(16, 16), (32, 32), (48, 48)],
+    "full": [(16, 16), (24, 24), (32, 32), (48, 48), (64, 64), (128, 128), (256, 256)],
+}
+OUTPUT_MODES = ("file", "hex")
+
+
+def make_source(size: int, kind: str) -> Image.Image:
+    """生成带渐变和几何图形的测试图像"""
+    gradient = Image.linear_gradient("L").resize((size, size))
+    img = Image.merge(
+        "RGBA",
+        (
+            gradient,
+            gradient.rotate(90),
+            gradient.rotate(180),
+            Image.new("L", (size, size), 255),
+        ),
+    )
+    draw = ImageDraw.Draw(img)
+    step = max(size // 16, 1)
+    for i in range(0, size // 2, step):
+        draw.ellipse((i, i, size - i, size - i), outline=(255, 255, 255, 255), width=2)
+
+    if kind.endswith("_alpha"):
+        # 圆形不透明区域，四角完全透明，中间有半透明过渡
+        alpha = Image.radial_gradient("L").resize((size, size))
+        img.putalpha(alpha.point(lambda v: 255 if v < 96 else max(0, 255 - v)))
+
+    if kind.startswith("palette"):
+        if kind.endswith("_alpha"):
+            return img.quantize(colors=255, method=Image.Quantize.FASTOCTREE)
+        return img.convert("RGB").quantize(colors=256)
+    return img
+
+
+def write_sources(directory: str):
+    """将所有测试图像保存为PNG，返回 (名称, 边长, 类型, 路径) 列表"""
+    sources = []
+    for label, size in SOURCE_SIZES.items():
+        for kind in SOURCE_KINDS:
+            path = os.path.join(directory, f"{label}_{kind}.png")
+            make_source(size, kind).save(path, format="PNG")
+            sources.append((label, size, kind, path))
+    return sources
+
+
+def write_file(data: bytes, output_path: str) -> None:
+    """与 save_ico 相同：写入同目录的临时文件后替换目标文件"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output_path)), suffix=".ico.tmp"
+    )
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+
+
+def run_pipeline(png_path: str, sizes, mode: str, output_path: str):
+    """执行一次完整转换，返回各阶段耗时（秒）和输出字节数"""
+    stages = {}
+
+    start = time.perf_counter()
+    img = Image.open(png_path)
+    img.load()
+    stages["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    images = list(resize_images(img, sizes).values())
+    stages["resize"] = time.perf_counter() - start
+
+    if mode == "file":
+        # 先在内存中编码，再按 save_ico 的方式（临时文件加原子替换）写出，分别计时；
+        # 服务中 save_ico 边编码边写出，总耗时与两阶段之和相近
+        start = time.perf_counter()
+        data = encode_ico(images)
+        stages["encode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_file(data, output_path)
+        stages["write"] = time.perf_counter() - start
+        output_bytes = os.path.getsize(output_path)
+    else:
+        start = time.perf_counter()
+        data = encode_ico(images)
+        stages["encode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data.hex()
+        stages["hex"] = time.perf_counter() - start
+        output_bytes = len(data)
+
+    return stages, output_bytes
+
+
+def run_case(png_path: str, sizes, mode: str, repeat: int):
+    """在子进程中运行单个用例，各阶段取多次运行中的最小耗时"""
+    output_path = os.path.join(tempfile.gettempdir(), f"bench_icogen_{os.getpid()}.ico")
+    try:
+        best = {}
+        output_bytes = 0
+        for _ in range(repeat):
+            stages, output_bytes = run_pipeline(png_path, sizes, mode, output_path)
+            for name, seconds in stages.items():
+                best[name] = min(best.get(name, seconds), seconds)
+
+        # 单独运行一次测量Python层分配的峰值，tracemalloc会拖慢计时
+        tracemalloc.start()
+        run_pipeline(png_path, sizes, mode, output_path)
+        _current, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    max_rss = None
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":
+            max_rss *= 1024  # Linux以KB为单位，macOS以字节为单位
+
+    stages_ms = {name: round(seconds * 1000, 3) for name, seconds in best.items()}
+    return {
+        "stages_ms": stages_ms,
+        "total_ms": round(sum(stages_ms.values()), 3),
+        "output_bytes": output_bytes,
+        "traced_peak_bytes": traced_peak,
+        "max_rss_bytes": max_rss,
+    }
+
+
+def case_id(result) -> str:
+    return "/".join(
+        (result["source"], result["kind"], result["size_set"], result["mode"])
+    )
+
+
+def print_comparison(results, baseline_path: str) -> None:
+    """打印与基线结果的总耗时和内存峰值对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_id(r): r for r in json.load(f)["results"]}
+
+    print(f"\ncompared with {baseline_path}:")
+    print(f"{'case':<45} {'total':>10} {'traced_peak':>12}")
+    for result in results:
+        old = baseline.get(case_id(result))
+        if old is None:
+            continue
+        time_ratio = result["total_ms"] / old["total_ms"] if old["total_ms"] else 0
+        mem_ratio = (
+            result["traced_peak_bytes"] / old["traced_peak_bytes"]
+            if old["traced_peak_bytes"]
+            else 0
+        )
+        print(f"{case_id(result):<45} {time_ratio:>9.2f}x {mem_ratio:>11.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="icogen PNG转ICO基准测试")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_icogen.json", help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="用于对比的旧结果JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        sources = write_sources(work_dir)
+        print(
+            f"{'source':<6} {'kind':<15} {'sizes':<8} {'mode':<5} "
+            f"{'total(ms)':>10} {'stages(ms)':<48} {'peak(KB)':>9}"
+        )
+        for label, edge, kind, path in sources:
+            for set_name, sizes in SIZE_SETS.items():
+                for mode in OUTPUT_MODES:
+                    # 每个用例使用全新的子进程，保证内存峰值互不影响
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(1, mp_context=context) as pool:
+                        case = pool.submit(
+                            run_case, path, sizes, mode, args.repeat
+                        ).result()
+                    case.update(
+                        source=label,
+                        source_size=edge,
+                        kind=kind,
+                        size_set=set_name,
+                        mode=mode,
+                    )
+                    results.append(case)
+                    stages = " ".join(
+                        f"{name}={ms:.2f}" for name, ms in case["stages_ms"].items()
+                    )
+                    print(
+                        f"{label:<6} {kind:<15} {set_name:<8} {mode:<5} "
+                        f"{case['total_ms']:>10.2f} {stages:<48} "
+                        f"{case['traced_peak_bytes'] / 1024:>9.1f}"
+                    )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
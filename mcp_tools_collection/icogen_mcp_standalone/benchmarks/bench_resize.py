@@ -0,0 +1,82 @@
+"""
+缩放引擎基准测试 - 对比 quality 与 fast 模式在不同源尺寸下的耗时和误差
+
+用法:
+    python benchmarks/bench_resize.py [--repeat N] [--source-sizes 512 1024 2048]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from icogen_mcp.resize import resize_images  # noqa: E402
+
+ICON_SIZES = [(16, 16), (24, 24), (32, 32), (48, 48), (64, 64), (128, 128), (256, 256)]
+
+
+def make_source(size: int) -> Image.Image:
+    """生成带渐变、几何图形和噪声的RGBA测试图像"""
+    gradient = Image.linear_gradient("L").resize((size, size))
+    noise = Image.effect_noise((size, size), 48)
+    img = Image.merge(
+        "RGBA",
+        (gradient, noise, gradient.rotate(90), Image.new("L", (size, size), 255)),
+    )
+    draw = ImageDraw.Draw(img)
+    step = max(size // 16, 1)
+    for i in range(0, size // 2, step):
+        draw.ellipse((i, i, size - i, size - i), outline=(255, 255, 255, 200), width=2)
+    return img
+
+
+def time_mode(img: Image.Image, mode: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resize_images(img, ICON_SIZES, mode=mode)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_error(img: Image.Image):
+    quality = resize_images(img, ICON_SIZES, mode="quality")
+    fast = resize_images(img, ICON_SIZES, mode="fast")
+    mean_err = 0.0
+    max_err = 0
+    for size in ICON_SIZES:
+        diff = ImageChops.difference(quality[size], fast[size])
+        mean_err = max(mean_err, max(ImageStat.Stat(diff).mean))
+        max_err = max(max_err, max(high for _low, high in diff.getextrema()))
+    return mean_err, max_err
+
+
+def main():
+    parser = argparse.ArgumentParser(description="icogen 缩放引擎基准测试")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--source-sizes", type=int, nargs="+", default=[256, 512, 1024, 2048]
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'source':>8} {'quality(ms)':>12} {'fast(ms)':>10} {'speedup':>8} "
+        f"{'mean_err':>9} {'max_err':>8}"
+    )
+    for source_size in args.source_sizes:
+        img = make_source(source_size)
+        quality_time = time_mode(img, "quality", args.repeat)
+        fast_time = time_mode(img, "fast", args.repeat)
+        mean_err, max_err = measure_error(img)
+        print(
+            f"{source_size:>8} {quality_time * 1000:>12.2f} {fast_time * 1000:>10.2f} "
+            f"{quality_time / fast_time:>7.2f}x {mean_err:>9.3f} {max_err:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
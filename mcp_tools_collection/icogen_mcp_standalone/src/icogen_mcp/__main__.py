@@ -1,5 +1,30 @@
+import os
+
 from .server import app, init_service
 from .service import IcoGeneratorService
+from .cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_SOURCE_CACHE_MAX_BYTES,
+    IcoResultCache,
+    SourceImageCache,
+)
+from .resize import DEFAULT_RESIZE_MODE
+from .icofile import DEFAULT_ENTRY_FORMAT
+from .store import DEFAULT_RESOURCE_TTL, IcoResourceStore
+from .executor import DEFAULT_MAX_QUEUE, BoundedExecutor
+
+# 环境变量名称
+ENV_CACHE_DIR = "ICOGEN_CACHE_DIR"
+ENV_CACHE_MAX_BYTES = "ICOGEN_CACHE_MAX_BYTES"
+ENV_RESIZE_MODE = "ICOGEN_RESIZE_MODE"
+ENV_RESOURCE_TTL = "ICOGEN_RESOURCE_TTL"
+ENV_ENTRY_FORMAT = "ICOGEN_ENTRY_FORMAT"
+ENV_COMPRESS_LEVEL = "ICOGEN_COMPRESS_LEVEL"
+ENV_OPTIMIZE = "ICOGEN_OPTIMIZE"
+ENV_ENCODE_THREADS = "ICOGEN_ENCODE_THREADS"
+ENV_SOURCE_CACHE_MAX_BYTES = "ICOGEN_SOURCE_CACHE_MAX_BYTES"
+ENV_MAX_CONCURRENCY = "ICOGEN_MAX_CONCURRENCY"
+ENV_MAX_QUEUE = "ICOGEN_MAX_QUEUE"
 
 
 def parse_args():
@@ -9,10 +34,51 @@ def parse_args():
     return parser.parse_args()
 
 
+def create_result_cache():
+    """根据环境变量创建结果缓存，未设置缓存目录时返回None"""
+    cache_dir = os.environ.get(ENV_CACHE_DIR)
+    if not cache_dir:
+        return None
+    max_bytes = int(os.environ.get(ENV_CACHE_MAX_BYTES, DEFAULT_CACHE_MAX_BYTES))
+    return IcoResultCache(cache_dir, max_bytes=max_bytes)
+
+
+def create_source_cache():
+    """根据环境变量创建已解码源图像缓存，上限设为0时返回None"""
+    max_bytes = int(
+        os.environ.get(ENV_SOURCE_CACHE_MAX_BYTES, DEFAULT_SOURCE_CACHE_MAX_BYTES)
+    )
+    if max_bytes <= 0:
+        return None
+    return SourceImageCache(max_bytes=max_bytes)
+
+
+def _env_int(name):
+    """读取整数环境变量，未设置时返回None"""
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
 def main():
     # 初始化服务
-    service = IcoGeneratorService()
-    init_service(service)
+    service = IcoGeneratorService(
+        result_cache=create_result_cache(),
+        resize_mode=os.environ.get(ENV_RESIZE_MODE, DEFAULT_RESIZE_MODE),
+        entry_format=os.environ.get(ENV_ENTRY_FORMAT, DEFAULT_ENTRY_FORMAT),
+        compress_level=_env_int(ENV_COMPRESS_LEVEL),
+        optimize=os.environ.get(ENV_OPTIMIZE, "").lower() in ("1", "true", "yes"),
+        encode_threads=_env_int(ENV_ENCODE_THREADS),
+        source_cache=create_source_cache(),
+    )
+    resource_store = IcoResourceStore(
+        ttl=float(os.environ.get(ENV_RESOURCE_TTL, DEFAULT_RESOURCE_TTL))
+    )
+    max_queue = _env_int(ENV_MAX_QUEUE)
+    executor = BoundedExecutor(
+        max_concurrency=_env_int(ENV_MAX_CONCURRENCY),
+        max_queue=DEFAULT_MAX_QUEUE if max_queue is None else max_queue,
+    )
+    init_service(service, resource_store, executor)
 
     # 运行服务器
     app.run()
@@ -0,0 +1,265 @@
+"""
+批量转换模块 - 使用进程池并行执行PNG到ICO的转换
+
+- 支持文件列表、glob模式和目录三种输入方式
+- 每个文件的缩放和ICO编码在独立的工作进程中执行，可以使用调用方共享的进程池，
+  使所有批次的工作进程总数受同一个上限约束
+- 按完成顺序逐个返回结果，单个文件失败不会影响整个批次
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+Size = Tuple[int, int]
+
+
+def resolve_batch_inputs(
+    files: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    directory: Optional[str] = None,
+    recursive: bool = True,
+) -> List[str]:
+    """
+    解析批量转换的输入，返回去重后的PNG文件路径列表
+
+    参数:
+        files (list, optional): PNG文件路径列表
+        pattern (str, optional): glob模式，如 "assets/**/*.png"
+        directory (str, optional): 包含PNG文件的目录
+        recursive (bool): 扫描目录时是否包含子目录，默认True
+
+    返回:
+        list: PNG文件的绝对路径列表，按输入顺序排列
+    """
+    if not files and not pattern and not directory:
+        raise ValueError("必须至少指定files、pattern或directory中的一个")
+
+    candidates: List[str] = []
+    if files:
+        candidates.extend(files)
+    if pattern:
+        candidates.extend(sorted(glob.glob(pattern, recursive=True)))
+    if directory:
+        if not os.path.isdir(directory):
+            raise ValueError(f"目录不存在: {directory}")
+        if recursive:
+            for root, _dirs, names in os.walk(directory):
+                for name in sorted(names):
+                    if name.lower().endswith(".png"):
+                        candidates.append(os.path.join(root, name))
+        else:
+            for name in sorted(os.listdir(directory)):
+                if name.lower().endswith(".png"):
+                    candidates.append(os.path.join(directory, name))
+
+    seen = set()
+    resolved: List[str] = []
+    for path in candidates:
+        abs_path = os.path.abspath(path)
+        if abs_path not in seen:
+            seen.add(abs_path)
+            resolved.append(abs_path)
+    return resolved
+
+
+def plan_output_path(
+    png_path: str, output_dir: Optional[str] = None, base_dir: Optional[str] = None
+) -> str:
+    """
+    计算单个PNG文件对应的ICO输出路径
+
+    参数:
+        png_path (str): PNG文件路径
+        output_dir (str, optional): 输出目录，为None时输出到源文件同目录
+        base_dir (str, optional): 输入根目录，指定时在output_dir下保留相对目录结构
+
+    返回:
+        str: ICO文件路径
+    """
+    stem = os.path.splitext(png_path)[0]
+    if output_dir is None:
+        return stem + ".ico"
+
+    if base_dir is not None:
+        rel_path = os.path.relpath(stem, os.path.abspath(base_dir))
+        # 只有 ".." 路径段表示在根目录之外，"..logo" 这样的文件名不算
+        outside = rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep)
+        if not outside:
+            return os.path.join(output_dir, rel_path + ".ico")
+    return os.path.join(output_dir, os.path.basename(stem) + ".ico")
+
+
+def split_output_conflicts(
+    jobs: List[Tuple[str, str]],
+) -> Tuple[List[Tuple[str, str]], List[Dict[str, Any]]]:
+    """
+    找出输出路径重复的任务
+
+    多个输入映射到同一个ICO文件时（如不同目录下的同名文件输出到同一output_dir），
+    只保留第一个，其余的标记为失败，避免工作进程并发写同一个文件。
+
+    参数:
+        jobs (list): (png_path, output_path) 元组列表
+
+    返回:
+        tuple: (可以执行的任务列表, 冲突任务的失败结果列表)
+    """
+    owners: Dict[str, str] = {}
+    unique: List[Tuple[str, str]] = []
+    conflicts: List[Dict[str, Any]] = []
+    for png_path, output_path in jobs:
+        key = os.path.normcase(os.path.abspath(output_path))
+        owner = owners.setdefault(key, png_path)
+        if owner == png_path:
+            unique.append((png_path, output_path))
+        else:
+            conflicts.append(
+                {
+                    "png_path": png_path,
+                    "output_path": output_path,
+                    "success": False,
+                    "error": f"输出路径与 {owner} 冲突: {output_path}",
+                    "elapsed": 0.0,
+                }
+            )
+    return unique, conflicts
+
+
+def _convert_worker(
+    png_path: str,
+    output_path: str,
+    sizes: Optional[List[Size]],
+    options: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    工作进程入口：转换单个文件，所有异常都转换为结果字典
+
+    options 中的参数会原样传给 IcoGeneratorService.png_to_ico
+    """
+    # 在工作进程内导入，避免循环依赖
+    from .service import IcoGeneratorService
+
+    start_time = time.time()
+    try:
+        output_parent = os.path.dirname(output_path)
+        if output_parent:
+            os.makedirs(output_parent, exist_ok=True)
+        IcoGeneratorService().png_to_ico(
+            png_path, output_path, sizes, **(options or {})
+        )
+        return {
+            "png_path": png_path,
+            "output_path": output_path,
+            "success": True,
+            "elapsed": time.time() - start_time,
+        }
+    except Exception as e:
+        return {
+            "png_path": png_path,
+            "output_path": output_path,
+            "success": False,
+            "error": str(e),
+            "elapsed": time.time() - start_time,
+        }
+
+
+def _failed_result(png_path: str, output_path: str, error: Exception) -> Dict[str, Any]:
+    """工作进程异常退出（如被系统杀死）或进程池不可用时的结果，只影响当前文件"""
+    return {
+        "png_path": png_path,
+        "output_path": output_path,
+        "success": False,
+        "error": str(error),
+        "elapsed": None,
+    }
+
+
+def _iter_pool(
+    pool: Executor,
+    jobs: List[Tuple[str, str]],
+    sizes: Optional[List[Size]],
+    window: int,
+    options: Optional[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    """
+    在进程池中执行任务，同时提交的任务不超过 window 个，按完成顺序产出结果
+
+    提前停止迭代时取消尚未开始的任务，不占用共享进程池。
+    """
+    job_iter = iter(jobs)
+    futures: Dict[Future, Tuple[str, str]] = {}
+    try:
+        while True:
+            while len(futures) < window:
+                job = next(job_iter, None)
+                if job is None:
+                    break
+                try:
+                    future = pool.submit(
+                        _convert_worker, job[0], job[1], sizes, options
+                    )
+                except Exception as e:
+                    yield _failed_result(job[0], job[1], e)
+                    continue
+                futures[future] = job
+            if not futures:
+                return
+            done, _pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                png_path, output_path = futures.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield _failed_result(png_path, output_path, e)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def iter_batch(
+    jobs: List[Tuple[str, str]],
+    sizes: Optional[List[Size]] = None,
+    max_workers: Optional[int] = None,
+    options: Optional[Dict[str, Any]] = None,
+    pool: Optional[Executor] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    执行批量转换，按完成顺序逐个产出每个文件的结果
+
+    参数:
+        jobs (list): (png_path, output_path) 元组列表
+        sizes (list, optional): 图标尺寸列表
+        max_workers (int, optional): 工作进程数，默认为CPU核心数；为1时在当前进程内顺序执行。
+            指定pool时为本批次同时提交的最大文件数，默认不限制（受pool大小约束）
+        options (dict, optional): 传给 png_to_ico 的其他参数，如缩放模式
+        pool (Executor, optional): 共享的进程池，为None时为本批次创建独立的进程池
+
+    返回:
+        Iterator[dict]: 每个文件的转换结果
+    """
+    if not jobs:
+        return
+
+    if pool is not None:
+        yield from _iter_pool(pool, jobs, sizes, max_workers or len(jobs), options)
+        return
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+
+    if workers <= 1:
+        for png_path, output_path in jobs:
+            yield _convert_worker(png_path, output_path, sizes, options)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _iter_pool(executor, jobs, sizes, len(jobs), options)
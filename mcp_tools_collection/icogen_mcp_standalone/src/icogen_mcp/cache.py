@@ -0,0 +1,384 @@
+"""
+缓存模块
+
+- IcoResultCache: 基于内容寻址的ICO转换结果磁盘缓存，缓存键由源文件内容哈希、
+  尺寸列表和编码参数共同决定
+- SourceImageCache: 进程内的已解码源图像缓存，按路径、修改时间和文件大小识别源文件
+- 两者都按总字节数限制大小，超出时按LRU顺序淘汰，并记录命中、未命中和淘汰次数
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .icofile import write_file_atomic
+
+# 默认缓存上限：256MB
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# 默认已解码源图像缓存上限：128MB
+DEFAULT_SOURCE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """
+    计算文件内容的SHA-256摘要
+
+    参数:
+        path (str): 文件路径
+
+    返回:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IcoResultCache:
+    """
+    ICO转换结果的磁盘缓存:
+    - 缓存文件按键的前两位分目录存放，写入使用临时文件加重命名保证原子性
+    - 启动时扫描缓存目录，按修改时间重建LRU顺序
+    - 线程安全
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        初始化缓存
+
+        参数:
+            cache_dir (str): 缓存目录，不存在时自动创建
+            max_bytes (int): 缓存总大小上限（字节）
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(
+        source_digest: str, sizes: List[Tuple[int, int]], settings: Dict[str, Any]
+    ) -> str:
+        """
+        根据源文件摘要、尺寸列表和编码参数生成缓存键
+
+        参数:
+            source_digest (str): 源文件内容摘要
+            sizes (list): 图标尺寸列表（顺序有意义）
+            settings (dict): 影响输出的编码参数，如重采样算法
+
+        返回:
+            str: 缓存键（十六进制SHA-256）
+        """
+        payload = json.dumps(
+            {
+                "source": source_digest,
+                "sizes": [list(size) for size in sizes],
+                "settings": settings,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".ico")
+
+    def _load_index(self) -> None:
+        """扫描缓存目录，按修改时间从旧到新重建LRU索引"""
+        found = []
+        for root, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".ico"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[: -len(".ico")], st.st_size))
+
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        """淘汰最久未使用的条目直到总大小不超过上限，调用方需持有锁"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """查找条目并更新LRU顺序和命中统计，返回缓存文件路径"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._entry_path(key)
+            if not os.path.exists(path):
+                # 缓存文件被外部删除
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        try:
+            # 更新修改时间，使重启后的LRU顺序保持一致
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        读取缓存的ICO数据
+
+        参数:
+            key (str): 缓存键
+
+        返回:
+            bytes: 命中时返回ICO数据，否则返回None
+        """
+        path = self._lookup(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def copy_to(self, key: str, output_path: str) -> bool:
+        """
+        将缓存的ICO文件复制到指定路径
+
+        先复制到目标目录中的临时文件再原子替换，与直接生成ICO文件时相同，
+        目标文件不会处于写了一半的状态。
+
+        参数:
+            key (str): 缓存键
+            output_path (str): 目标文件路径
+
+        返回:
+            bool: 命中并复制成功返回True，否则返回False
+        """
+        path = self._lookup(key)
+        if path is None:
+            return False
+
+        def copy(f) -> None:
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, f)
+
+        try:
+            write_file_atomic(output_path, copy)
+        except OSError:
+            return False
+        return True
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        写入ICO数据到缓存
+
+        参数:
+            key (str): 缓存键
+            data (bytes): ICO文件内容
+        """
+        if len(data) > self.max_bytes:
+            return
+        self._store(key, lambda f: f.write(data), len(data))
+
+    def put_file(self, key: str, path: str) -> None:
+        """
+        将已生成的ICO文件复制到缓存
+
+        参数:
+            key (str): 缓存键
+            path (str): ICO文件路径
+        """
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            return
+
+        def copy(f) -> None:
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, f)
+
+        self._store(key, copy, size)
+
+    def _store(self, key: str, write, size: int) -> None:
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        返回:
+            dict: 包含hits、misses、evictions、entries、bytes等字段
+        """
+        with self._lock:
+            return {
+                "cache_dir": self.cache_dir,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """清空缓存中的所有条目"""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.remove(self._entry_path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """
+    估算已解码图像占用的内存字节数
+    """
+    # Pillow内部8位单通道模式每像素1字节，16位模式2字节，多通道和32位模式4字节
+    if image.mode in ("1", "L", "P"):
+        pixel_size = 1
+    elif image.mode.startswith("I;16"):
+        pixel_size = 2
+    else:
+        pixel_size = 4
+    return image.width * image.height * pixel_size
+
+
+class SourceImageCache:
+    """
+    已解码源图像的内存缓存:
+    - 缓存键为 (绝对路径, 修改时间, 文件大小)，源文件变化后自动失效
+    - 按解码后的像素字节数限制总大小，超出时按LRU顺序淘汰
+    - 缓存的图像只读共享，调用方不应原地修改
+    - 线程安全
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_SOURCE_CACHE_MAX_BYTES):
+        """
+        参数:
+            max_bytes (int): 已解码图像的总字节数上限
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, int], Tuple[Image.Image, int]]" = (
+            OrderedDict()
+        )
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str) -> Image.Image:
+        """
+        获取已解码的源图像，未命中时解码并加入缓存
+
+        参数:
+            path (str): 图像文件路径
+
+        返回:
+            Image.Image: 已完成解码的图像
+        """
+        abs_path = os.path.abspath(path)
+        st = os.stat(abs_path)
+        key = (abs_path, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 解码在锁外进行，避免阻塞其他文件的读取
+        image = Image.open(abs_path)
+        image.load()
+        nbytes = image_nbytes(image)
+        if nbytes > self.max_bytes:
+            return image
+
+        with self._lock:
+            # 同一文件的旧版本不再有用，直接移除
+            for old_key in [k for k in self._entries if k[0] == abs_path]:
+                self._total_bytes -= self._entries.pop(old_key)[1]
+            self._entries[key] = (image, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                _key, (_image, size) = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+        return image
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        返回:
+            dict: 包含hits、misses、evictions、entries、bytes等字段
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
@@ -0,0 +1,192 @@
+"""
+执行器模块 - 在有界线程池中运行阻塞的图像处理任务
+
+- 工具处理函数为异步函数，Pillow的解码、缩放和编码在线程池中执行，
+  不会阻塞FastMCP的事件循环（Pillow在这些操作中会释放GIL）
+- 同时运行的任务数受 max_concurrency 限制，超出的任务排队等待
+- 排队任务数达到 max_queue 时立即拒绝新任务，避免请求无限堆积
+- 批量转换共享一个进程池，工作进程总数同样不超过 max_concurrency；
+  批量转换的调度线程只等待进程池，不占用线程池的并发名额
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+# 默认排队上限
+DEFAULT_MAX_QUEUE = 64
+
+
+class ExecutorBusyError(RuntimeError):
+    """执行器排队已满时抛出"""
+
+    pass
+
+
+class SharedProcessPool(Executor):
+    """
+    多个批次共享的进程池，最多 max_workers 个工作进程
+
+    工作进程在第一次提交时创建。工作进程异常退出（如被系统杀死）会使
+    ProcessPoolExecutor 不可用，之后的提交抛出 BrokenProcessPool，
+    此时创建新的进程池并重新提交，已提交的任务以 BrokenProcessPool 失败。
+    """
+
+    def __init__(self, max_workers: int):
+        """
+        参数:
+            max_workers (int): 最大工作进程数
+        """
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._shutdown = False
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        提交函数到进程池，进程池已损坏时重建后再提交一次
+
+        异常:
+            RuntimeError: 进程池已关闭
+        """
+        pool = self._get_pool()
+        try:
+            return pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            return self._get_pool(broken=pool).submit(fn, *args, **kwargs)
+
+    def _get_pool(
+        self, broken: Optional[ProcessPoolExecutor] = None
+    ) -> ProcessPoolExecutor:
+        """返回当前的进程池，不存在或与 broken 相同时创建新的进程池"""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if self._pool is None or self._pool is broken:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭进程池，之后不能再提交任务"""
+        with self._lock:
+            self._shutdown = True
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+class BoundedExecutor:
+    """
+    带并发上限和排队上限的线程池执行器
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        """
+        参数:
+            max_concurrency (int, optional): 同时运行的最大任务数，默认为CPU核心数
+            max_queue (int): 等待运行的最大任务数，达到后拒绝新任务
+        """
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="icogen-worker"
+        )
+        self._lock = threading.Lock()
+        # 批量转换共享的进程池，工作进程在第一次使用时创建
+        self._process_pool = SharedProcessPool(self.max_concurrency)
+        self._running = 0
+        self._queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> "asyncio.Future":
+        """
+        提交阻塞函数到线程池，返回可在当前事件循环中等待的Future
+
+        参数:
+            fn (callable): 要运行的函数
+            *args, **kwargs: 传给函数的参数
+
+        返回:
+            asyncio.Future: 函数的执行结果
+
+        异常:
+            ExecutorBusyError: 排队任务数已达上限，此时任务不会被提交
+        """
+        with self._lock:
+            if self._running + self._queued >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusyError(
+                    f"服务繁忙：{self._running} 个任务正在执行，{self._queued} 个任务排队中，请稍后重试"
+                )
+            self._queued += 1
+
+        future = self._pool.submit(self._track, functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._on_done)
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中运行阻塞函数并等待结果，参数和异常同 submit
+        """
+        return await self.submit(fn, *args, **kwargs)
+
+    def _on_done(self, future) -> None:
+        if future.cancelled():
+            # 排队期间被取消（如客户端断开），任务不会再执行
+            with self._lock:
+                self._queued -= 1
+
+    def _track(self, call: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return call()
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+
+    def process_pool(self) -> SharedProcessPool:
+        """
+        获取批量转换共享的进程池，最多 max_concurrency 个工作进程
+
+        多个批次同时执行时共用这些进程，总进程数不会随批次数增长。
+        进程池中的任务不计入 stats() 的 running 和 queued。
+        """
+        return self._process_pool
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取执行器统计信息
+        """
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        """关闭线程池和进程池，等待正在执行的任务完成"""
+        self._pool.shutdown(wait=True)
+        self._process_pool.shutdown(wait=True)
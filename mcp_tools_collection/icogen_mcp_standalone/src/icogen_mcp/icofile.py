@@ -0,0 +1,273 @@
+"""
+ICO文件写入模块 - 逐个编码各尺寸条目并组装为ICO容器
+
+- 每个尺寸可以存储为PNG压缩数据或BMP/DIB位图，由调用方选择
+- 先写入ICONDIR和占位的ICONDIRENTRY，再写入各条目数据，最后回填偏移量和长度
+- 可在线程池中并行编码各条目（zlib压缩期间会释放GIL），再按顺序写入容器
+- 写入文件时使用临时文件加重命名，保证目标文件要么完整要么不变
+- 整个过程中不会在内存中同时保留完整ICO数据的多个副本
+"""
+
+import io
+import os
+import shutil
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+from PIL import Image
+
+# ICO格式中单个图像的最大边长
+MAX_ICO_DIMENSION = 256
+
+# 条目格式：png 全部使用PNG；bmp 全部使用BMP/DIB；auto 256像素使用PNG，其余使用BMP
+ENTRY_FORMATS = ("png", "bmp", "auto")
+DEFAULT_ENTRY_FORMAT = "png"
+
+# 新建ICO文件的权限；mkstemp 创建的临时文件只有所有者可读写
+NEW_FILE_MODE = 0o644
+
+_ICONDIR = struct.Struct("<HHH")
+_ICONDIRENTRY = struct.Struct("<BBBBHHII")
+_BITMAPINFOHEADER = struct.Struct("<IiiHHIIiiII")
+
+
+def select_frames(images: List[Image.Image]) -> List[Image.Image]:
+    """
+    按尺寸从小到大排序并去重，跳过超出ICO限制的图像
+
+    参数:
+        images (list): 各尺寸的图像
+
+    返回:
+        list: 将写入ICO文件的图像
+    """
+    frames = {}
+    for img in images:
+        width, height = img.size
+        if width > MAX_ICO_DIMENSION or height > MAX_ICO_DIMENSION:
+            continue
+        frames.setdefault(img.size, img)
+    if not frames:
+        raise ValueError("没有可写入ICO文件的图像尺寸（单个尺寸最大为256x256）")
+    return [frames[size] for size in sorted(frames)]
+
+
+def entry_format_for(size: Tuple[int, int], entry_format: str) -> str:
+    """
+    返回指定尺寸条目实际使用的格式（png 或 bmp）
+    """
+    if entry_format not in ENTRY_FORMATS:
+        raise ValueError(
+            f"不支持的条目格式: {entry_format}，可选值: {', '.join(ENTRY_FORMATS)}"
+        )
+    if entry_format == "auto":
+        return "png" if max(size) >= MAX_ICO_DIMENSION else "bmp"
+    return entry_format
+
+
+def _save_png(
+    frame: Image.Image,
+    fp: BinaryIO,
+    compress_level: Optional[int],
+    optimize: bool,
+) -> None:
+    params = {"optimize": optimize}
+    if compress_level is not None:
+        params["compress_level"] = compress_level
+    frame.save(fp, format="PNG", **params)
+
+
+def encode_dib(frame: Image.Image) -> bytes:
+    """
+    将RGBA图像编码为ICO使用的32位DIB数据（BITMAPINFOHEADER + BGRA像素 + AND掩码）
+
+    参数:
+        frame (Image.Image): RGBA图像
+
+    返回:
+        bytes: DIB数据
+    """
+    width, height = frame.size
+    # 32位像素每行天然4字节对齐，行序自下而上
+    pixels = frame.tobytes("raw", ("BGRA", width * 4, -1))
+    # AND掩码：完全透明的像素置1，每行按4字节对齐
+    mask_stride = ((width + 31) // 32) * 4
+    mask = frame.getchannel("A").point(lambda a: 255 if a == 0 else 0).convert("1")
+    mask_bytes = mask.tobytes("raw", ("1", mask_stride, -1))
+    header = _BITMAPINFOHEADER.pack(
+        _BITMAPINFOHEADER.size,
+        width,
+        height * 2,  # ICO中的高度包含XOR位图和AND掩码
+        1,
+        32,
+        0,  # BI_RGB
+        len(pixels) + len(mask_bytes),
+        0,
+        0,
+        0,
+        0,
+    )
+    return header + pixels + mask_bytes
+
+
+def encode_entry(
+    frame: Image.Image,
+    entry_format: str = DEFAULT_ENTRY_FORMAT,
+    compress_level: Optional[int] = None,
+    optimize: bool = False,
+) -> bytes:
+    """
+    编码单个尺寸的条目数据
+
+    参数:
+        frame (Image.Image): 图像
+        entry_format (str): 条目格式，png、bmp 或 auto
+        compress_level (int, optional): PNG的zlib压缩级别(0-9)，默认使用Pillow的默认值
+        optimize (bool): PNG是否启用optimize（更小但更慢）
+
+    返回:
+        bytes: 条目数据
+    """
+    if frame.mode != "RGBA":
+        frame = frame.convert("RGBA")
+    if entry_format_for(frame.size, entry_format) == "bmp":
+        return encode_dib(frame)
+    buffer = io.BytesIO()
+    _save_png(frame, buffer, compress_level, optimize)
+    return buffer.getvalue()
+
+
+def write_ico(
+    fp: BinaryIO,
+    images: List[Image.Image],
+    entry_format: str = DEFAULT_ENTRY_FORMAT,
+    compress_level: Optional[int] = None,
+    optimize: bool = False,
+    max_threads: Optional[int] = None,
+) -> None:
+    """
+    将图像写入可定位的二进制流，每个条目均为32位色
+
+    参数:
+        fp (BinaryIO): 可写、可定位的二进制流，从当前位置开始写入
+        images (list): 各尺寸的图像
+        entry_format (str): 条目格式，png、bmp 或 auto
+        compress_level (int, optional): PNG的zlib压缩级别(0-9)
+        optimize (bool): PNG是否启用optimize
+        max_threads (int, optional): 并行编码的线程数，为None或1时逐个编码
+    """
+    frames = select_frames(images)
+    start = fp.tell()
+
+    # 写入文件头和占位的目录项
+    fp.write(_ICONDIR.pack(0, 1, len(frames)))
+    fp.write(b"\0" * (_ICONDIRENTRY.size * len(frames)))
+
+    entries: List[Tuple[Tuple[int, int], int, int]] = []
+    if max_threads is not None and max_threads > 1 and len(frames) > 1:
+        # 并行编码各条目，再按尺寸顺序写入
+        with ThreadPoolExecutor(max_workers=min(max_threads, len(frames))) as pool:
+            futures = [
+                pool.submit(encode_entry, frame, entry_format, compress_level, optimize)
+                for frame in frames
+            ]
+            for frame, future in zip(frames, futures):
+                payload = future.result()
+                offset = fp.tell()
+                fp.write(payload)
+                entries.append((frame.size, offset - start, len(payload)))
+                del payload
+    else:
+        for frame in frames:
+            offset = fp.tell()
+            if entry_format_for(frame.size, entry_format) == "png":
+                # PNG数据直接编码到目标流
+                if frame.mode != "RGBA":
+                    frame = frame.convert("RGBA")
+                _save_png(frame, fp, compress_level, optimize)
+            else:
+                fp.write(encode_entry(frame, entry_format))
+            entries.append((frame.size, offset - start, fp.tell() - offset))
+
+    # 回填目录项
+    end = fp.tell()
+    fp.seek(start + _ICONDIR.size)
+    for (width, height), offset, length in entries:
+        fp.write(
+            _ICONDIRENTRY.pack(
+                width if width < 256 else 0,  # 0 表示 256
+                height if height < 256 else 0,
+                0,  # 调色板颜色数
+                0,  # 保留
+                1,  # 颜色平面数
+                32,  # 每像素位数
+                length,
+                offset,
+            )
+        )
+    fp.seek(end)
+
+
+def encode_ico(images: List[Image.Image], **options) -> bytes:
+    """
+    将图像编码为ICO二进制数据
+
+    参数:
+        images (list): 各尺寸的图像
+        **options: 传给 write_ico 的编码参数
+
+    返回:
+        bytes: ICO文件内容
+    """
+    buffer = io.BytesIO()
+    write_ico(buffer, images, **options)
+    return buffer.getvalue()
+
+
+def save_ico(images: List[Image.Image], output_path: str, **options) -> None:
+    """
+    将图像流式写入ICO文件，写入过程在同目录的临时文件中完成后再原子替换目标文件
+
+    参数:
+        images (list): 各尺寸的图像
+        output_path (str): 输出ICO文件路径
+        **options: 传给 write_ico 的编码参数
+    """
+    write_file_atomic(output_path, lambda f: write_ico(f, images, **options))
+
+
+def write_file_atomic(output_path: str, write: Callable[[BinaryIO], None]) -> None:
+    """
+    在目标文件同目录的临时文件中写入内容，完成后原子替换目标文件
+
+    写入失败或进程崩溃时目标文件保持不变，并发读取方不会看到写了一半的文件。
+
+    参数:
+        output_path (str): 目标文件路径
+        write (callable): 接收已打开的二进制文件对象并写入内容的函数
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".ico.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        _apply_mode(tmp_path, output_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _apply_mode(tmp_path: str, output_path: str) -> None:
+    """
+    设置临时文件的权限：覆盖已有文件时沿用其权限，新建时使用 NEW_FILE_MODE
+    """
+    try:
+        shutil.copymode(output_path, tmp_path)
+    except FileNotFoundError:
+        os.chmod(tmp_path, NEW_FILE_MODE)
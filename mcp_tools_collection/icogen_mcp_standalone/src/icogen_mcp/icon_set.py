@@ -0,0 +1,228 @@
+"""
+图标集模块 - 从同一组缩放图像一次性生成多平台图标
+
+支持的目标:
+- ico: Windows ICO图标
+- icns: macOS ICNS图标
+- favicon: 网站favicon（favicon.ico、各尺寸PNG、apple-touch-icon）
+- android: Android启动图标（各密度mipmap目录）
+- ios: iOS AppIcon.appiconset（含Contents.json）
+
+所有目标共享同一组缩放图像，每个尺寸只缩放一次。
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from .icofile import save_ico
+
+Size = Tuple[int, int]
+
+ICON_SET_TARGETS = ("ico", "icns", "favicon", "android", "ios")
+DEFAULT_ICON_SET_TARGETS = ICON_SET_TARGETS
+
+ICO_SIZES = [16, 24, 32, 48, 64, 128, 256]
+ICNS_SIZES = [32, 64, 128, 256, 512, 1024]
+FAVICON_ICO_SIZES = [16, 32, 48]
+# (文件名, 边长)
+FAVICON_PNGS = [
+    ("favicon-16x16.png", 16),
+    ("favicon-32x32.png", 32),
+    ("apple-touch-icon.png", 180),
+    ("android-chrome-192x192.png", 192),
+    ("android-chrome-512x512.png", 512),
+]
+# (mipmap目录, 边长)
+ANDROID_DENSITIES = [
+    ("mipmap-mdpi", 48),
+    ("mipmap-hdpi", 72),
+    ("mipmap-xhdpi", 96),
+    ("mipmap-xxhdpi", 144),
+    ("mipmap-xxxhdpi", 192),
+]
+ANDROID_PLAY_STORE_SIZE = 512
+# (idiom, 点尺寸, 缩放倍数)
+IOS_ICONS = [
+    ("iphone", 20, 2),
+    ("iphone", 20, 3),
+    ("iphone", 29, 2),
+    ("iphone", 29, 3),
+    ("iphone", 40, 2),
+    ("iphone", 40, 3),
+    ("iphone", 60, 2),
+    ("iphone", 60, 3),
+    ("ipad", 20, 1),
+    ("ipad", 20, 2),
+    ("ipad", 29, 1),
+    ("ipad", 29, 2),
+    ("ipad", 40, 1),
+    ("ipad", 40, 2),
+    ("ipad", 76, 1),
+    ("ipad", 76, 2),
+    ("ipad", 83.5, 2),
+    ("ios-marketing", 1024, 1),
+]
+
+
+def _ios_pixels(points: float, scale: int) -> int:
+    return int(round(points * scale))
+
+
+def _point_label(points: float) -> str:
+    return f"{points:g}"
+
+
+def icon_set_sizes(targets: List[str]) -> List[Size]:
+    """
+    返回生成指定目标所需的全部尺寸（去重，从大到小）
+
+    参数:
+        targets (list): 目标列表
+
+    返回:
+        list: (宽度, 高度) 列表
+    """
+    edges = set()
+    for target in targets:
+        if target == "ico":
+            edges.update(ICO_SIZES)
+        elif target == "icns":
+            edges.update(ICNS_SIZES)
+        elif target == "favicon":
+            edges.update(FAVICON_ICO_SIZES)
+            edges.update(edge for _name, edge in FAVICON_PNGS)
+        elif target == "android":
+            edges.update(edge for _dir, edge in ANDROID_DENSITIES)
+            edges.add(ANDROID_PLAY_STORE_SIZE)
+        elif target == "ios":
+            edges.update(_ios_pixels(points, scale) for _i, points, scale in IOS_ICONS)
+        else:
+            raise ValueError(
+                f"不支持的图标目标: {target}，可选值: {', '.join(ICON_SET_TARGETS)}"
+            )
+    return [(edge, edge) for edge in sorted(edges, reverse=True)]
+
+
+def _save_png(image: Image.Image, path: str) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image.save(path, format="PNG")
+    return path
+
+
+def write_icon_set(
+    images: Dict[Size, Image.Image],
+    output_dir: str,
+    name: str,
+    targets: List[str],
+    ico_options: Optional[Dict[str, Any]] = None,
+) -> Dict[str, List[str]]:
+    """
+    使用已缩放的图像写出各目标的图标文件
+
+    参数:
+        images (dict): 尺寸到缩放图像的映射，需包含 icon_set_sizes(targets) 的全部尺寸
+        output_dir (str): 输出目录
+        name (str): ICO/ICNS文件的基础文件名
+        targets (list): 目标列表
+        ico_options (dict, optional): 传给 save_ico 的编码参数
+
+    返回:
+        dict: 目标名到生成文件路径列表的映射
+    """
+    ico_options = ico_options or {}
+    os.makedirs(output_dir, exist_ok=True)
+
+    def image_for(edge: int) -> Image.Image:
+        return images[(edge, edge)]
+
+    outputs: Dict[str, List[str]] = {}
+    for target in targets:
+        files: List[str] = []
+        if target == "ico":
+            path = os.path.join(output_dir, name + ".ico")
+            save_ico([image_for(edge) for edge in ICO_SIZES], path, **ico_options)
+            files.append(path)
+
+        elif target == "icns":
+            path = os.path.join(output_dir, name + ".icns")
+            largest = image_for(max(ICNS_SIZES))
+            others = [image_for(edge) for edge in ICNS_SIZES if edge != largest.width]
+            largest.save(path, format="ICNS", append_images=others)
+            files.append(path)
+
+        elif target == "favicon":
+            favicon_dir = os.path.join(output_dir, "favicon")
+            path = os.path.join(favicon_dir, "favicon.ico")
+            os.makedirs(favicon_dir, exist_ok=True)
+            save_ico(
+                [image_for(edge) for edge in FAVICON_ICO_SIZES], path, **ico_options
+            )
+            files.append(path)
+            for file_name, edge in FAVICON_PNGS:
+                files.append(
+                    _save_png(image_for(edge), os.path.join(favicon_dir, file_name))
+                )
+
+        elif target == "android":
+            android_dir = os.path.join(output_dir, "android")
+            for density_dir, edge in ANDROID_DENSITIES:
+                files.append(
+                    _save_png(
+                        image_for(edge),
+                        os.path.join(android_dir, density_dir, "ic_launcher.png"),
+                    )
+                )
+            files.append(
+                _save_png(
+                    image_for(ANDROID_PLAY_STORE_SIZE),
+                    os.path.join(android_dir, "ic_launcher-playstore.png"),
+                )
+            )
+
+        elif target == "ios":
+            iconset_dir = os.path.join(output_dir, "ios", "AppIcon.appiconset")
+            contents_images = []
+            written = set()
+            for idiom, points, scale in IOS_ICONS:
+                pixels = _ios_pixels(points, scale)
+                file_name = f"icon-{pixels}.png"
+                if file_name not in written:
+                    image = image_for(pixels)
+                    if idiom == "ios-marketing" and image.mode in ("RGBA", "LA", "P"):
+                        # App Store图标不允许透明通道，合成到白色背景上
+                        background = Image.new("RGB", image.size, (255, 255, 255))
+                        rgba = image.convert("RGBA")
+                        background.paste(rgba, mask=rgba.getchannel("A"))
+                        image = background
+                    files.append(_save_png(image, os.path.join(iconset_dir, file_name)))
+                    written.add(file_name)
+                label = _point_label(points)
+                contents_images.append(
+                    {
+                        "size": f"{label}x{label}",
+                        "idiom": idiom,
+                        "filename": file_name,
+                        "scale": f"{scale}x",
+                    }
+                )
+            contents_path = os.path.join(iconset_dir, "Contents.json")
+            with open(contents_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "images": contents_images,
+                        "info": {"version": 1, "author": "icogen-mcp"},
+                    },
+                    f,
+                    indent=2,
+                )
+            files.append(contents_path)
+
+        else:
+            raise ValueError(
+                f"不支持的图标目标: {target}，可选值: {', '.join(ICON_SET_TARGETS)}"
+            )
+        outputs[target] = files
+    return outputs
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 from typing import Annotated, Optional, List, Any, Dict
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from .batch import resolve_batch_inputs
+from .executor import BoundedExecutor
 from .service import IcoGeneratorService
+from .store import IcoResourceStore, resource_uri
 from pydantic import Field
 
 PngPath = Annotated[
@@ -35,16 +40,130 @@ SizeNoted = Annotated[
         ],
     ),
 ]
+OutputEncoding = Annotated[
+    Optional[str],
+    Field(
+        description="未指定output_path时ICO数据的返回方式：hex 十六进制字符串（默认，兼容旧版本）；base64 Base64字符串，体积比hex小33%；resource 将ICO暂存在服务端并返回资源URI，通过读取该资源获取二进制数据",
+        default="hex",
+        pattern=r"^(hex|base64|resource)$",
+    ),
+]
+ResizeMode = Annotated[
+    Optional[str],
+    Field(
+        description="缩放模式：quality 每个尺寸都从原图缩放，输出最精确；fast 使用金字塔逐级缩放，大尺寸源图明显更快，误差在2个色阶以内。默认使用服务配置（quality）",
+        default=None,
+        pattern=r"^(quality|fast)$",
+    ),
+]
+EntryFormat = Annotated[
+    Optional[str],
+    Field(
+        description="ICO中每个尺寸条目的存储格式：png 压缩最小；bmp 兼容旧系统、编码最快；auto 256像素使用PNG，其余尺寸使用BMP。默认使用服务配置（png）",
+        default=None,
+        pattern=r"^(png|bmp|auto)$",
+    ),
+]
+CompressLevel = Annotated[
+    Optional[int],
+    Field(
+        description="PNG条目的zlib压缩级别(0-9)，越高文件越小但编码越慢。默认使用服务配置",
+        default=None,
+        ge=0,
+        le=9,
+    ),
+]
+OptimizePng = Annotated[
+    Optional[bool],
+    Field(
+        description="是否对PNG条目启用optimize，可进一步减小体积但显著增加编码时间。默认使用服务配置",
+        default=None,
+    ),
+]
+IconSetTargets = Annotated[
+    Optional[List[str]],
+    Field(
+        description="要生成的图标目标列表，可选 ico、icns、favicon、android、ios，默认全部生成",
+        default=None,
+        examples=[["ico", "icns"], ["favicon", "android", "ios"]],
+    ),
+]
+IconSetOutputDir = Annotated[
+    str,
+    Field(
+        description="图标集输出目录，不存在时自动创建",
+        min_length=1,
+        max_length=500,
+    ),
+]
+IconSetName = Annotated[
+    Optional[str],
+    Field(
+        description="ICO/ICNS文件的基础文件名（不含扩展名），默认为源PNG文件名",
+        default=None,
+        max_length=100,
+    ),
+]
+PngPathList = Annotated[
+    Optional[List[str]],
+    Field(
+        description="要转换的PNG文件路径列表",
+        default=None,
+    ),
+]
+GlobPattern = Annotated[
+    Optional[str],
+    Field(
+        description="匹配PNG文件的glob模式，支持**递归匹配，如 assets/**/*.png",
+        default=None,
+        max_length=500,
+    ),
+]
+DirectoryPath = Annotated[
+    Optional[str],
+    Field(
+        description="包含PNG文件的目录，将递归扫描其中所有PNG文件",
+        default=None,
+        max_length=500,
+    ),
+]
+OutputDirPath = Annotated[
+    Optional[str],
+    Field(
+        description="ICO输出目录，如果不指定则在各源文件同目录下生成同名ICO文件；指定directory时保留相对目录结构",
+        default=None,
+        max_length=500,
+    ),
+]
+MaxWorkers = Annotated[
+    Optional[int],
+    Field(
+        description="本批次同时转换的最大文件数，默认不限制；所有批次共享最多ICOGEN_MAX_CONCURRENCY个工作进程",
+        default=None,
+        ge=1,
+        le=64,
+    ),
+]
 # FastMCP app
 app = FastMCP("icogen-mcp")
 
 # Injected at runtime by __main__.py
 _service: Optional[IcoGeneratorService] = None
+_resource_store: IcoResourceStore = IcoResourceStore()
+_executor: BoundedExecutor = BoundedExecutor()
 
 
-def init_service(service: IcoGeneratorService) -> None:
-    global _service
+def init_service(
+    service: IcoGeneratorService,
+    resource_store: Optional[IcoResourceStore] = None,
+    executor: Optional[BoundedExecutor] = None,
+) -> None:
+    global _service, _resource_store, _executor
     _service = service
+    if resource_store is not None:
+        _resource_store = resource_store
+    if executor is not None:
+        _executor = executor
 
 
 def _svc() -> IcoGeneratorService:
@@ -55,6 +174,55 @@ def _svc() -> IcoGeneratorService:
     return _service
 
 
+def _encode_result(data: bytes, encoding: str) -> Dict[str, Any]:
+    """按指定方式编码ICO二进制数据"""
+    if encoding == "base64":
+        return {
+            "success": True,
+            "encoding": "base64",
+            "mime_type": "image/x-icon",
+            "size": len(data),
+            "data": base64.b64encode(data).decode("ascii"),
+        }
+    if encoding == "resource":
+        resource_id = _resource_store.put(data)
+        return {
+            "success": True,
+            "encoding": "resource",
+            "mime_type": "image/x-icon",
+            "size": len(data),
+            "resource_uri": resource_uri(resource_id),
+            "expires_in": _resource_store.ttl,
+        }
+    # 将二进制数据转换为十六进制字符串返回
+    return {"success": True, "data": data.hex()}
+
+
+# ------------------ Resources ------------------
+
+
+@app.resource(
+    "icogen://ico/{resource_id}",
+    name="generated_ico",
+    description="convert_png_to_ico 以 resource 方式返回的ICO文件，在有效期内可读取",
+    mime_type="image/x-icon",
+)
+def read_generated_ico(resource_id: str) -> bytes:
+    """
+    读取暂存的ICO文件
+
+    参数:
+        resource_id (str): convert_png_to_ico 返回的资源id
+
+    返回:
+        bytes: ICO文件的二进制数据
+    """
+    data = _resource_store.get(resource_id)
+    if data is None:
+        raise ValueError(f"资源不存在或已过期: {resource_id}")
+    return data
+
+
 # ------------------ Tools ------------------
 
 
@@ -69,8 +237,15 @@ def _svc() -> IcoGeneratorService:
         "openWorldHint": True,  # 与文件系统交互
     },
 )
-def convert_png_to_ico(
-    png_path: PngPath, output_path: IcoPath = None, sizes: SizeNoted = None
+async def convert_png_to_ico(
+    png_path: PngPath,
+    output_path: IcoPath = None,
+    sizes: SizeNoted = None,
+    resize_mode: ResizeMode = None,
+    output_encoding: OutputEncoding = "hex",
+    entry_format: EntryFormat = None,
+    compress_level: CompressLevel = None,
+    optimize: OptimizePng = None,
 ) -> Dict[str, Any]:
     """
     将PNG文件转换为ICO文件
@@ -79,6 +254,11 @@ def convert_png_to_ico(
         png_path (str): PNG文件路径
         output_path (str, optional): 输出ICO文件的路径，如果为None则返回二进制数据
         sizes (list, optional): ICO文件中包含的图标尺寸列表，默认为[[16,16], [32,32], [48,48]]
+        resize_mode (str, optional): 缩放模式，quality 或 fast
+        output_encoding (str, optional): 未指定output_path时的返回方式，hex、base64 或 resource
+        entry_format (str, optional): 条目格式，png、bmp 或 auto
+        compress_level (int, optional): PNG压缩级别(0-9)
+        optimize (bool, optional): 是否启用PNG optimize
 
     返回:
         dict: 包含成功信息或错误信息的字典
@@ -89,13 +269,192 @@ def convert_png_to_ico(
         if sizes is not None:
             size_tuples = [tuple(size) for size in sizes]  # type: ignore
 
-        # 调用服务生成ICO
-        result = _svc().png_to_ico(png_path, output_path, size_tuples)
+        def convert() -> Dict[str, Any]:
+            # 调用服务生成ICO
+            result = _svc().png_to_ico(
+                png_path,
+                output_path,
+                size_tuples,
+                resize_mode,
+                entry_format=entry_format,
+                compress_level=compress_level,
+                optimize=optimize,
+            )
+
+            if output_path:
+                return {"success": True, "message": f"ICO文件已生成: {output_path}"}
+            return _encode_result(result or b"", output_encoding or "hex")
+
+        # 在有界线程池中执行，避免阻塞事件循环
+        return await _executor.run(convert)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.tool(
+    name="convert_png_batch",
+    description="批量将PNG图像文件转换为ICO图标文件，支持文件列表、glob模式或目录输入，使用进程池并行转换，单个文件失败不影响其他文件",
+    annotations={
+        "title": "PNG批量转ICO转换器",
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": True,
+    },
+)
+async def convert_png_batch(
+    ctx: Context,
+    files: PngPathList = None,
+    pattern: GlobPattern = None,
+    directory: DirectoryPath = None,
+    output_dir: OutputDirPath = None,
+    sizes: SizeNoted = None,
+    max_workers: MaxWorkers = None,
+    resize_mode: ResizeMode = None,
+    entry_format: EntryFormat = None,
+    compress_level: CompressLevel = None,
+    optimize: OptimizePng = None,
+) -> Dict[str, Any]:
+    """
+    批量将PNG文件转换为ICO文件
+
+    参数:
+        files (list, optional): PNG文件路径列表
+        pattern (str, optional): glob模式
+        directory (str, optional): 包含PNG文件的目录
+        output_dir (str, optional): ICO输出目录
+        sizes (list, optional): ICO文件中包含的图标尺寸列表
+        max_workers (int, optional): 本批次同时转换的最大文件数
+        resize_mode (str, optional): 缩放模式，quality 或 fast
+        entry_format (str, optional): 条目格式，png、bmp 或 auto
+        compress_level (int, optional): PNG压缩级别(0-9)
+        optimize (bool, optional): 是否启用PNG optimize
+
+    返回:
+        dict: 包含total、succeeded、failed和每个文件结果的字典
+    """
+    try:
+        size_tuples = None
+        if sizes is not None:
+            size_tuples = [tuple(size) for size in sizes]  # type: ignore
+
+        loop = asyncio.get_running_loop()
+        png_paths = await _executor.run(resolve_batch_inputs, files, pattern, directory)
+        total = len(png_paths)
+
+        # 在默认线程池中驱动共享进程池，每完成一个文件就通过队列推送给事件循环。
+        # 调度线程大部分时间在等待工作进程，不占用执行器的并发名额，避免同时执行的批次
+        # 挤占单文件转换；所有批次共用最多 ICOGEN_MAX_CONCURRENCY 个工作进程
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce() -> None:
+            try:
+                for item in _svc().iter_png_to_ico_batch(
+                    png_paths,
+                    output_dir,
+                    size_tuples,
+                    max_workers,
+                    directory,
+                    resize_mode,
+                    entry_format,
+                    compress_level,
+                    optimize,
+                    pool=_executor.process_pool(),
+                ):
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
 
-        if output_path:
-            return {"success": True, "message": f"ICO文件已生成: {output_path}"}
-        else:
-            # 将二进制数据转换为十六进制字符串返回
-            return {"success": True, "data": result.hex() if result else ""}
+        producer = loop.run_in_executor(None, produce)
+
+        results = []
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            results.append(item)
+            await ctx.report_progress(
+                len(results), total, f"{item['png_path']} -> {item['output_path']}"
+            )
+            if not item["success"]:
+                await ctx.warning(f"转换失败: {item['png_path']}: {item['error']}")
+        await producer
+
+        succeeded = sum(1 for item in results if item["success"])
+        return {
+            "success": True,
+            "total": total,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.tool(
+    name="generate_icon_set",
+    description="从一个PNG图像一次性生成多平台图标：Windows ICO、macOS ICNS、网站favicon、Android启动图标和iOS AppIcon。源图像只解码一次，所有格式共享同一组缩放结果",
+    annotations={
+        "title": "多平台图标集生成器",
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": True,
+    },
+)
+async def generate_icon_set(
+    png_path: PngPath,
+    output_dir: IconSetOutputDir,
+    targets: IconSetTargets = None,
+    name: IconSetName = None,
+    resize_mode: ResizeMode = None,
+) -> Dict[str, Any]:
+    """
+    生成多平台图标集
+
+    参数:
+        png_path (str): PNG文件路径
+        output_dir (str): 输出目录
+        targets (list, optional): 目标列表，可选 ico、icns、favicon、android、ios
+        name (str, optional): ICO/ICNS文件的基础文件名
+        resize_mode (str, optional): 缩放模式，quality 或 fast
+
+    返回:
+        dict: 包含各目标生成文件列表的字典
+    """
+    try:
+        result = await _executor.run(
+            _svc().generate_icon_set, png_path, output_dir, targets, name, resize_mode
+        )
+        return {"success": True, **result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.tool(
+    name="get_cache_stats",
+    description="查询ICO生成服务的缓存统计信息，包括转换结果磁盘缓存、已解码源图像缓存和资源存储的命中次数、条目数和占用字节数，以及执行器的运行和排队任务数",
+    annotations={
+        "title": "缓存统计查询器",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": False,
+        "openWorldHint": False,
+    },
+)
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    查询缓存统计信息
+
+    返回:
+        dict: 包含result_cache、source_cache、resource_store和executor统计信息的字典，未启用的缓存为None
+    """
+    try:
+        stats = _svc().cache_stats()
+        stats["resource_store"] = _resource_store.stats()
+        stats["executor"] = _executor.stats()
+        return {"success": True, **stats}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -1,7 +1,22 @@
-import io
-from typing import Optional, List, Tuple
+import os
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterator, Optional, List, Tuple
 from PIL import Image
 
+from .batch import (
+    iter_batch,
+    plan_output_path,
+    resolve_batch_inputs,
+    split_output_conflicts,
+)
+from .cache import IcoResultCache, SourceImageCache, hash_file
+from .icon_set import DEFAULT_ICON_SET_TARGETS, icon_set_sizes, write_icon_set
+from .icofile import DEFAULT_ENTRY_FORMAT, ENTRY_FORMATS, encode_ico, save_ico
+from .resize import DEFAULT_RESIZE_MODE, RESIZE_MODES, resize_images
+
+DEFAULT_SIZES = [(16, 16), (32, 32), (48, 48)]
+
 
 class IcoGeneratorService:
     """
@@ -9,16 +24,117 @@ class IcoGeneratorService:
     - 将PNG文件转换为ICO文件
     - 支持自定义ICO文件中的图标尺寸
     - 可以将生成的ICO文件保存到指定路径或返回二进制数据
+    - 支持使用进程池批量转换多个PNG文件
+    - 可选的磁盘结果缓存，相同输入直接返回缓存的ICO文件
+    - 支持quality（逐尺寸缩放）和fast（金字塔缩放）两种缩放模式
+    - 每个尺寸可选PNG或BMP条目，支持调节PNG压缩级别并在线程池中并行编码
+    - 可选的已解码源图像缓存，同一源文件的多次转换只解码一次
+    - 一次解码、一次缩放生成ICO、ICNS、favicon及Android/iOS图标集
     """
 
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        result_cache: Optional[IcoResultCache] = None,
+        resize_mode: str = DEFAULT_RESIZE_MODE,
+        entry_format: str = DEFAULT_ENTRY_FORMAT,
+        compress_level: Optional[int] = None,
+        optimize: bool = False,
+        encode_threads: Optional[int] = None,
+        source_cache: Optional[SourceImageCache] = None,
+    ):
+        """
+        参数:
+            result_cache (IcoResultCache, optional): 转换结果缓存，为None时不使用缓存
+            resize_mode (str): 默认缩放模式，"quality" 或 "fast"
+            entry_format (str): 默认条目格式，"png"、"bmp" 或 "auto"
+            compress_level (int, optional): 默认PNG压缩级别(0-9)，None表示使用Pillow默认值
+            optimize (bool): 默认是否启用PNG optimize
+            encode_threads (int, optional): 并行编码条目的线程数，None或1表示逐个编码
+            source_cache (SourceImageCache, optional): 已解码源图像缓存，为None时每次都重新解码
+        """
+        if resize_mode not in RESIZE_MODES:
+            raise ValueError(f"不支持的缩放模式: {resize_mode}")
+        if entry_format not in ENTRY_FORMATS:
+            raise ValueError(f"不支持的条目格式: {entry_format}")
+        self.result_cache = result_cache
+        self.resize_mode = resize_mode
+        self.entry_format = entry_format
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.encode_threads = encode_threads
+        self.source_cache = source_cache
+
+    def open_source(self, png_path: str) -> Image.Image:
+        """
+        打开并解码源图像，启用源图像缓存时复用已解码的结果
+        """
+        if self.source_cache is not None:
+            return self.source_cache.get(png_path)
+        return Image.open(png_path)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        获取各缓存的统计信息，未启用的缓存返回None
+        """
+        return {
+            "result_cache": (
+                self.result_cache.stats() if self.result_cache is not None else None
+            ),
+            "source_cache": (
+                self.source_cache.stats() if self.source_cache is not None else None
+            ),
+        }
+
+    def encode_options(
+        self,
+        entry_format: Optional[str] = None,
+        compress_level: Optional[int] = None,
+        optimize: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        合并单次调用的编码参数与服务默认值
+        """
+        return {
+            "entry_format": entry_format or self.entry_format,
+            "compress_level": (
+                compress_level if compress_level is not None else self.compress_level
+            ),
+            "optimize": optimize if optimize is not None else self.optimize,
+        }
+
+    def encode_settings(
+        self,
+        resize_mode: Optional[str] = None,
+        encode_options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        返回影响ICO输出的编码参数，作为结果缓存键的一部分
+        """
+        settings = {
+            "resample": "lanczos",
+            "resize_mode": resize_mode or self.resize_mode,
+            "encoder": "icofile",
+        }
+        settings.update(encode_options or self.encode_options())
+        return settings
+
+    def result_cache_key(
+        self, png_path: str, sizes: List[Tuple[int, int]], settings: Dict[str, Any]
+    ) -> str:
+        """
+        计算指定源文件、尺寸列表和编码参数的结果缓存键
+        """
+        return IcoResultCache.make_key(hash_file(png_path), sizes, settings)
 
     def png_to_ico(
         self,
         png_path: str,
         output_path: Optional[str] = None,
         sizes: Optional[List[Tuple[int, int]]] = None,
+        resize_mode: Optional[str] = None,
+        entry_format: Optional[str] = None,
+        compress_level: Optional[int] = None,
+        optimize: Optional[bool] = None,
     ) -> Optional[bytes]:
         """
         将PNG文件转换为ICO文件
@@ -27,40 +143,251 @@ class IcoGeneratorService:
             png_path (str): PNG文件路径
             output_path (str, optional): 输出ICO文件的路径，如果为None则返回二进制数据
             sizes (list, optional): ICO文件中包含的图标尺寸列表，默认为[(16,16), (32,32), (48,48)]
+            resize_mode (str, optional): 缩放模式，默认使用服务的缩放模式
+            entry_format (str, optional): 条目格式，png、bmp 或 auto
+            compress_level (int, optional): PNG压缩级别(0-9)
+            optimize (bool, optional): 是否启用PNG optimize
 
         返回:
             bytes: 如果output_path为None，则返回ICO文件的二进制数据
             None: 如果output_path不为None，则将ICO文件保存到指定路径
         """
         if sizes is None:
-            sizes = [(16, 16), (32, 32), (48, 48)]
+            sizes = DEFAULT_SIZES
+        if resize_mode is None:
+            resize_mode = self.resize_mode
+        options = self.encode_options(entry_format, compress_level, optimize)
 
-        # 打开PNG图像
-        original_img = Image.open(png_path)
+        # 优先使用缓存结果，命中时无需解码和编码
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache_key(
+                png_path, sizes, self.encode_settings(resize_mode, options)
+            )
+            if output_path:
+                if self.result_cache.copy_to(cache_key, output_path):
+                    return None
+            else:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
-        # 创建一个内存中的ICO文件
-        ico_buffer = io.BytesIO()
+        # 打开PNG图像
+        original_img = self.open_source(png_path)
 
         # 创建不同尺寸的图像列表
-        images = []
-        for size in sizes:
-            # 调整图像大小
-            resized_img = original_img.resize(size, Image.Resampling.LANCZOS)
-            images.append(resized_img)
-
-        # 保存为ICO文件
-        if images:
-            images[0].save(
-                ico_buffer, format="ICO", append_images=images[1:], sizes=sizes
-            )
-            ico_data = ico_buffer.getvalue()
+        resized = resize_images(original_img, sizes, mode=resize_mode)
+        images = list(resized.values())
+        if not images:
+            raise ValueError("未能创建任何图像")
 
-            # 保存到文件或返回二进制数据
-            if output_path:
-                with open(output_path, "wb") as f:
-                    f.write(ico_data)
-                return None
+        # 保存到文件或返回二进制数据
+        if output_path:
+            # 各尺寸直接编码写入目标文件，不在内存中组装完整ICO
+            save_ico(images, output_path, max_threads=self.encode_threads, **options)
+            if cache_key is not None:
+                self.result_cache.put_file(cache_key, output_path)
+            return None
+
+        ico_data = encode_ico(images, max_threads=self.encode_threads, **options)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, ico_data)
+        return ico_data
+
+    def generate_icon_set(
+        self,
+        png_path: str,
+        output_dir: str,
+        targets: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        resize_mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        从一个PNG文件生成多平台图标集
+
+        源图像只解码一次，所有目标需要的尺寸由同一个缩放金字塔生成并在各格式间共享。
+
+        参数:
+            png_path (str): PNG文件路径
+            output_dir (str): 输出目录
+            targets (list, optional): 目标列表，可选 ico、icns、favicon、android、ios，默认全部
+            name (str, optional): ICO/ICNS文件的基础文件名，默认为源文件名
+            resize_mode (str, optional): 缩放模式，默认使用服务的缩放模式
+
+        返回:
+            dict: 包含各目标生成的文件列表、共享的尺寸数和被放大的尺寸
+        """
+        if not targets:
+            targets = list(DEFAULT_ICON_SET_TARGETS)
+        targets = list(dict.fromkeys(targets))
+        if name is None:
+            name = os.path.splitext(os.path.basename(png_path))[0]
+        if resize_mode is None:
+            resize_mode = self.resize_mode
+
+        sizes = icon_set_sizes(targets)
+        original_img = self.open_source(png_path)
+        resized = resize_images(original_img, sizes, mode=resize_mode)
+
+        ico_options = dict(self.encode_options(), max_threads=self.encode_threads)
+        files = write_icon_set(resized, output_dir, name, targets, ico_options)
+
+        source_width, source_height = original_img.size
+        return {
+            "files": files,
+            "sizes": len(sizes),
+            "upscaled_sizes": [
+                list(size)
+                for size in sorted(sizes)
+                if size[0] > source_width or size[1] > source_height
+            ],
+        }
+
+    def iter_png_to_ico_batch(
+        self,
+        png_paths: List[str],
+        output_dir: Optional[str] = None,
+        sizes: Optional[List[Tuple[int, int]]] = None,
+        max_workers: Optional[int] = None,
+        base_dir: Optional[str] = None,
+        resize_mode: Optional[str] = None,
+        entry_format: Optional[str] = None,
+        compress_level: Optional[int] = None,
+        optimize: Optional[bool] = None,
+        pool: Optional[Executor] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        批量转换PNG文件，按完成顺序逐个产出结果
+
+        参数:
+            png_paths (list): PNG文件路径列表
+            output_dir (str, optional): 输出目录，为None时输出到各源文件同目录
+            sizes (list, optional): ICO文件中包含的图标尺寸列表
+            max_workers (int, optional): 工作进程数，默认为CPU核心数
+            base_dir (str, optional): 输入根目录，用于在output_dir下保留相对目录结构
+            resize_mode (str, optional): 缩放模式，默认使用服务的缩放模式
+            entry_format (str, optional): 条目格式，png、bmp 或 auto
+            compress_level (int, optional): PNG压缩级别(0-9)
+            optimize (bool, optional): 是否启用PNG optimize
+            pool (Executor, optional): 共享的进程池，为None时为本批次创建独立的进程池；
+                指定时max_workers为本批次同时转换的最大文件数
+
+        返回:
+            Iterator[dict]: 每个文件的结果，包含png_path、output_path、success、error等字段
+        """
+        jobs, conflicts = split_output_conflicts(
+            [
+                (png_path, plan_output_path(png_path, output_dir, base_dir))
+                for png_path in png_paths
+            ]
+        )
+        yield from conflicts
+        if resize_mode is None:
+            resize_mode = self.resize_mode
+        encode_options = self.encode_options(entry_format, compress_level, optimize)
+        options = dict(encode_options, resize_mode=resize_mode)
+        if self.result_cache is None:
+            yield from iter_batch(jobs, sizes, max_workers, options, pool)
+            return
+
+        # 缓存由当前进程统一管理：命中的文件直接复制，未命中的交给进程池并在完成后写回缓存
+        cache_sizes = sizes or DEFAULT_SIZES
+        settings = self.encode_settings(resize_mode, encode_options)
+        pending = []
+        cache_keys: Dict[str, str] = {}
+        for png_path, output_path in jobs:
+            start_time = time.time()
+            try:
+                cache_key = self.result_cache_key(png_path, cache_sizes, settings)
+                output_parent = os.path.dirname(output_path)
+                if output_parent:
+                    os.makedirs(output_parent, exist_ok=True)
+            except OSError as e:
+                # 单个文件无法读取或输出目录无法创建时只影响当前文件
+                yield {
+                    "png_path": png_path,
+                    "output_path": output_path,
+                    "success": False,
+                    "error": str(e),
+                    "elapsed": time.time() - start_time,
+                }
+                continue
+            if self.result_cache.copy_to(cache_key, output_path):
+                yield {
+                    "png_path": png_path,
+                    "output_path": output_path,
+                    "success": True,
+                    "cached": True,
+                    "elapsed": time.time() - start_time,
+                }
             else:
-                return ico_data
-        else:
-            raise ValueError("未能创建任何图像")
+                cache_keys[png_path] = cache_key
+                pending.append((png_path, output_path))
+
+        for item in iter_batch(pending, sizes, max_workers, options, pool):
+            if item["success"]:
+                try:
+                    self.result_cache.put_file(
+                        cache_keys[item["png_path"]], item["output_path"]
+                    )
+                except OSError:
+                    pass
+            yield item
+
+    def png_to_ico_batch(
+        self,
+        files: Optional[List[str]] = None,
+        pattern: Optional[str] = None,
+        directory: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        sizes: Optional[List[Tuple[int, int]]] = None,
+        max_workers: Optional[int] = None,
+        resize_mode: Optional[str] = None,
+        entry_format: Optional[str] = None,
+        compress_level: Optional[int] = None,
+        optimize: Optional[bool] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量将PNG文件转换为ICO文件
+
+        参数:
+            files (list, optional): PNG文件路径列表
+            pattern (str, optional): glob模式，如 "assets/**/*.png"
+            directory (str, optional): 包含PNG文件的目录（递归扫描）
+            output_dir (str, optional): 输出目录，为None时输出到各源文件同目录
+            sizes (list, optional): ICO文件中包含的图标尺寸列表
+            max_workers (int, optional): 工作进程数，默认为CPU核心数
+            resize_mode (str, optional): 缩放模式，默认使用服务的缩放模式
+            entry_format (str, optional): 条目格式，png、bmp 或 auto
+            compress_level (int, optional): PNG压缩级别(0-9)
+            optimize (bool, optional): 是否启用PNG optimize
+            on_result (callable, optional): 每个文件完成时的回调
+
+        返回:
+            dict: 包含total、succeeded、failed和results列表的汇总信息
+        """
+        png_paths = resolve_batch_inputs(files, pattern, directory)
+        results = []
+        for item in self.iter_png_to_ico_batch(
+            png_paths,
+            output_dir,
+            sizes,
+            max_workers,
+            base_dir=directory,
+            resize_mode=resize_mode,
+            entry_format=entry_format,
+            compress_level=compress_level,
+            optimize=optimize,
+        ):
+            results.append(item)
+            if on_result is not None:
+                on_result(item)
+
+        succeeded = sum(1 for item in results if item["success"])
+        return {
+            "total": len(png_paths),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+        }
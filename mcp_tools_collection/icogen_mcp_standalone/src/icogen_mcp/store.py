@@ -0,0 +1,109 @@
+"""
+资源存储模块 - 以资源URI形式暂存生成的ICO数据
+
+- 每个ICO数据分配一个随机id，客户端通过MCP资源读取
+- 条目在TTL到期后失效，总大小超出上限时淘汰最早的条目
+- 线程安全
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 默认资源有效期：5分钟
+DEFAULT_RESOURCE_TTL = 300
+# 默认存储上限：64MB
+DEFAULT_RESOURCE_MAX_BYTES = 64 * 1024 * 1024
+
+RESOURCE_URI_PREFIX = "icogen://ico/"
+
+
+class IcoResourceStore:
+    """
+    带TTL的内存ICO资源存储
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_RESOURCE_TTL,
+        max_bytes: int = DEFAULT_RESOURCE_MAX_BYTES,
+    ):
+        """
+        参数:
+            ttl (float): 资源有效期（秒）
+            max_bytes (int): 存储总大小上限（字节）
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # resource_id -> (过期时间, 数据)，按插入顺序排列
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._total_bytes = 0
+
+    def put(self, data: bytes) -> str:
+        """
+        存入ICO数据
+
+        参数:
+            data (bytes): ICO文件内容
+
+        返回:
+            str: 资源id
+        """
+        if len(data) > self.max_bytes:
+            raise ValueError(f"ICO数据过大: {len(data)} 字节，上限 {self.max_bytes}")
+
+        resource_id = uuid.uuid4().hex
+        with self._lock:
+            self._purge_locked(time.monotonic())
+            self._entries[resource_id] = (time.monotonic() + self.ttl, data)
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes:
+                _rid, (_expires, old) = self._entries.popitem(last=False)
+                self._total_bytes -= len(old)
+        return resource_id
+
+    def get(self, resource_id: str) -> Optional[bytes]:
+        """
+        读取ICO数据
+
+        参数:
+            resource_id (str): 资源id
+
+        返回:
+            bytes: 未过期时返回ICO数据，否则返回None
+        """
+        with self._lock:
+            self._purge_locked(time.monotonic())
+            entry = self._entries.get(resource_id)
+            return entry[1] if entry is not None else None
+
+    def _purge_locked(self, now: float) -> None:
+        """删除已过期的条目，调用方需持有锁"""
+        # 所有条目TTL相同，插入顺序即过期顺序
+        while self._entries:
+            resource_id, (expires, data) = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            del self._entries[resource_id]
+            self._total_bytes -= len(data)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取存储统计信息
+        """
+        with self._lock:
+            self._purge_locked(time.monotonic())
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+
+def resource_uri(resource_id: str) -> str:
+    """返回资源id对应的MCP资源URI"""
+    return RESOURCE_URI_PREFIX + resource_id
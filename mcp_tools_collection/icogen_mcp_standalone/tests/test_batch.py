@@ -0,0 +1,102 @@
+"""
+批量转换的输入解析、输出路径规划和冲突处理测试
+"""
+
+import os
+
+from PIL import Image
+
+from icogen_mcp.batch import (
+    iter_batch,
+    plan_output_path,
+    resolve_batch_inputs,
+    split_output_conflicts,
+)
+
+
+def test_plan_output_path_next_to_source():
+    assert plan_output_path("/src/a.png") == "/src/a.ico"
+
+
+def test_plan_output_path_keeps_relative_layout():
+    out = os.path.join("/out", "icons", "a.ico")
+    assert plan_output_path("/src/icons/a.png", "/out", "/src") == out
+
+
+def test_plan_output_path_dotted_names_stay_inside_root():
+    assert plan_output_path("/src/..logo.png", "/out", "/src") == os.path.join(
+        "/out", "..logo.ico"
+    )
+    assert plan_output_path("/src/...icons/a.png", "/out", "/src") == os.path.join(
+        "/out", "...icons", "a.ico"
+    )
+
+
+def test_plan_output_path_outside_root_is_flattened():
+    assert plan_output_path("/other/a.png", "/out", "/src") == os.path.join(
+        "/out", "a.ico"
+    )
+    # 相对路径正好是 ".."
+    assert plan_output_path("/src.png", "/out", "/src/sub") == os.path.join(
+        "/out", "src.ico"
+    )
+
+
+def test_plan_output_path_without_base_dir_is_flattened():
+    assert plan_output_path("/src/icons/a.png", "/out") == os.path.join("/out", "a.ico")
+
+
+def test_split_output_conflicts_keeps_first_owner():
+    jobs = [
+        ("/x/a.png", "/out/a.ico"),
+        ("/y/a.png", "/out/a.ico"),
+        ("/x/b.png", "/out/b.ico"),
+        ("/z/a.png", "/out/./a.ico"),
+    ]
+    unique, conflicts = split_output_conflicts(jobs)
+
+    assert unique == [jobs[0], jobs[2]]
+    assert [item["png_path"] for item in conflicts] == ["/y/a.png", "/z/a.png"]
+    assert all(not item["success"] for item in conflicts)
+    assert "/x/a.png" in conflicts[0]["error"]
+
+
+def test_resolve_batch_inputs_deduplicates(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("a.png", "b.PNG", "notes.txt", os.path.join("sub", "c.png")):
+        (tmp_path / name).write_bytes(b"")
+
+    flat = resolve_batch_inputs(directory=str(tmp_path), recursive=False)
+    assert [os.path.basename(path) for path in flat] == ["a.png", "b.PNG"]
+
+    paths = resolve_batch_inputs(
+        files=[str(tmp_path / "a.png")],
+        pattern=str(tmp_path / "**" / "*.png"),
+        directory=str(tmp_path),
+    )
+    assert sorted(os.path.relpath(path, tmp_path) for path in paths) == [
+        "a.png",
+        "b.PNG",
+        os.path.join("sub", "c.png"),
+    ]
+    assert paths[0] == str(tmp_path / "a.png")
+
+
+def test_iter_batch_reports_each_file(tmp_path):
+    good = tmp_path / "good.png"
+    Image.new("RGBA", (64, 64), (255, 0, 0, 255)).save(good)
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"not a png")
+    jobs = [
+        (str(good), str(tmp_path / "out" / "good.ico")),
+        (str(bad), str(tmp_path / "out" / "bad.ico")),
+    ]
+
+    results = {
+        os.path.basename(item["png_path"]): item
+        for item in iter_batch(jobs, sizes=[(16, 16), (32, 32)], max_workers=1)
+    }
+    assert results["good.png"]["success"]
+    assert not results["bad.png"]["success"]
+    with Image.open(tmp_path / "out" / "good.ico") as ico:
+        assert sorted(ico.info["sizes"]) == [(16, 16), (32, 32)]
@@ -0,0 +1,65 @@
+"""
+IcoResultCache 测试
+"""
+
+import os
+
+import pytest
+
+from icogen_mcp import cache as cache_module
+from icogen_mcp.cache import IcoResultCache
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    return IcoResultCache(str(tmp_path / "cache"), max_bytes=1024)
+
+
+def test_hit_and_miss(result_cache, tmp_path):
+    key = IcoResultCache.make_key("digest", [(16, 16)], {"resize_mode": "quality"})
+    assert result_cache.get(key) is None
+    assert not result_cache.copy_to(key, str(tmp_path / "out.ico"))
+
+    result_cache.put(key, b"ico-data")
+    assert result_cache.get(key) == b"ico-data"
+    assert result_cache.copy_to(key, str(tmp_path / "out.ico"))
+    assert (tmp_path / "out.ico").read_bytes() == b"ico-data"
+
+    stats = result_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert (stats["entries"], stats["bytes"]) == (1, len(b"ico-data"))
+
+    # 尺寸或编码参数不同时为不同的键
+    other = IcoResultCache.make_key("digest", [(32, 32)], {"resize_mode": "quality"})
+    assert other != key
+    assert result_cache.get(other) is None
+
+
+def test_lru_eviction_and_reload(result_cache, tmp_path):
+    result_cache.put("aa" + "0" * 62, b"x" * 600)
+    result_cache.put("bb" + "0" * 62, b"y" * 300)
+    result_cache.get("aa" + "0" * 62)
+    result_cache.put("cc" + "0" * 62, b"z" * 300)
+
+    assert result_cache.get("bb" + "0" * 62) is None
+    assert result_cache.stats()["evictions"] == 1
+
+    reloaded = IcoResultCache(result_cache.cache_dir, max_bytes=1024)
+    assert reloaded.get("aa" + "0" * 62) == b"x" * 600
+    assert reloaded.get("cc" + "0" * 62) == b"z" * 300
+
+
+def test_failed_copy_leaves_target_unchanged(result_cache, tmp_path, monkeypatch):
+    key = "dd" + "0" * 62
+    result_cache.put(key, b"new-data")
+    target = tmp_path / "out.ico"
+    target.write_bytes(b"old-data")
+
+    def partial_copy(src, dst):
+        dst.write(src.read(3))
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache_module.shutil, "copyfileobj", partial_copy)
+    assert not result_cache.copy_to(key, str(target))
+    assert target.read_bytes() == b"old-data"
+    assert set(os.listdir(tmp_path)) == {"cache", "out.ico"}
@@ -0,0 +1,34 @@
+"""
+共享进程池测试
+"""
+
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from icogen_mcp.executor import SharedProcessPool
+
+
+def test_shared_pool_rebuilds_after_worker_dies():
+    pool = SharedProcessPool(max_workers=1)
+    try:
+        pid = pool.submit(os.getpid).result()
+        # 工作进程被杀死后正在执行的任务失败，进程池随之不可用
+        crashed = pool.submit(os.kill, pid, signal.SIGKILL)
+        with pytest.raises(BrokenProcessPool):
+            crashed.result(timeout=30)
+        broken = pool._pool
+
+        assert pool.submit(pow, 2, 5).result(timeout=30) == 32
+        assert pool._pool is not broken
+    finally:
+        pool.shutdown()
+
+
+def test_shared_pool_rejects_after_shutdown():
+    pool = SharedProcessPool(max_workers=1)
+    pool.shutdown()
+    with pytest.raises(RuntimeError):
+        pool.submit(pow, 2, 5)
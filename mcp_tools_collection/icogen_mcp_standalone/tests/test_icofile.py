@@ -0,0 +1,158 @@
+"""
+ICO文件写入测试：生成的文件由 Pillow 重新读取校验
+"""
+
+import io
+import os
+import stat
+import struct
+
+import pytest
+from PIL import Image
+
+from icogen_mcp.icofile import NEW_FILE_MODE, encode_ico, save_ico, write_ico
+
+SIZES = [(16, 16), (32, 32), (48, 48), (256, 256)]
+
+
+def _make_images(sizes=SIZES):
+    images = []
+    for width, height in sizes:
+        img = Image.new("RGBA", (width, height), (255, 0, 0, 255))
+        # 左上角透明，右下角半透明蓝色
+        img.paste((0, 0, 0, 0), (0, 0, width // 2, height // 2))
+        img.paste((0, 0, 255, 128), (width // 2, height // 2, width, height))
+        images.append(img)
+    return images
+
+
+def _read_directory(data):
+    reserved, kind, count = struct.unpack_from("<HHH", data)
+    assert (reserved, kind) == (0, 1)
+    entries = []
+    for i in range(count):
+        width, height, _colors, _reserved, planes, bpp, length, offset = (
+            struct.unpack_from("<BBBBHHII", data, 6 + 16 * i)
+        )
+        entries.append((width or 256, height or 256, planes, bpp, length, offset))
+    return entries
+
+
+def test_header_offsets_cover_file():
+    data = encode_ico(_make_images())
+    entries = _read_directory(data)
+
+    assert [(w, h) for w, h, *_ in entries] == SIZES
+    assert all((planes, bpp) == (1, 32) for _w, _h, planes, bpp, _l, _o in entries)
+    # 条目数据紧跟目录，依次相连直到文件末尾
+    position = 6 + 16 * len(entries)
+    for *_rest, length, offset in entries:
+        assert offset == position
+        position += length
+    assert position == len(data)
+
+
+def test_round_trip_through_pillow(tmp_path):
+    path = tmp_path / "icon.ico"
+    images = _make_images()
+    save_ico(images, str(path))
+
+    with Image.open(path) as ico:
+        assert ico.format == "ICO"
+        assert sorted(ico.info["sizes"]) == SIZES
+        for expected in images:
+            ico.size = expected.size
+            decoded = ico.convert("RGBA")
+            assert decoded.size == expected.size
+            assert decoded.tobytes() == expected.tobytes()
+
+
+def test_write_ico_at_stream_offset():
+    # 偏移量相对于ICO数据的起始位置
+    stream = io.BytesIO()
+    stream.write(b"prefix")
+    write_ico(stream, _make_images())
+
+    data = stream.getvalue()[len(b"prefix") :]
+    assert data == encode_ico(_make_images())
+
+
+def test_frames_are_sorted_deduplicated_and_limited():
+    images = _make_images([(48, 48), (16, 16), (48, 48), (512, 512)])
+    entries = _read_directory(encode_ico(images))
+    assert [(w, h) for w, h, *_ in entries] == [(16, 16), (48, 48)]
+
+    with pytest.raises(ValueError):
+        encode_ico(_make_images([(512, 512)]))
+
+
+def test_save_ico_file_mode(tmp_path):
+    path = tmp_path / "icon.ico"
+    save_ico(_make_images(), str(path))
+    assert stat.S_IMODE(os.stat(path).st_mode) == NEW_FILE_MODE
+
+    # 覆盖已有文件时保留其权限
+    os.chmod(path, 0o600)
+    save_ico(_make_images([(16, 16)]), str(path))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert len(_read_directory(path.read_bytes())) == 1
+
+
+def test_save_ico_failure_leaves_target_unchanged(tmp_path):
+    path = tmp_path / "icon.ico"
+    path.write_bytes(b"old")
+
+    with pytest.raises(ValueError):
+        save_ico(_make_images(), str(path), entry_format="gif")
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["icon.ico"]
+
+
+def _entry_kinds(data):
+    kinds = []
+    for *_rest, length, offset in _read_directory(data):
+        payload = data[offset : offset + length]
+        if payload.startswith(b"\x89PNG\r\n\x1a\n"):
+            kinds.append("png")
+        else:
+            # BITMAPINFOHEADER：高度为图像高度的两倍（含AND掩码），32位色
+            size, width, height, _planes, bpp = struct.unpack_from("<IiiHH", payload)
+            assert (size, height, bpp) == (40, width * 2, 32)
+            kinds.append("bmp")
+    return kinds
+
+
+@pytest.mark.parametrize(
+    "entry_format, kinds",
+    [
+        ("png", ["png", "png", "png", "png"]),
+        ("bmp", ["bmp", "bmp", "bmp", "bmp"]),
+        ("auto", ["bmp", "bmp", "bmp", "png"]),
+    ],
+)
+def test_entry_formats_decode_through_pillow(entry_format, kinds):
+    images = _make_images()
+    data = encode_ico(images, entry_format=entry_format)
+    assert _entry_kinds(data) == kinds
+
+    with Image.open(io.BytesIO(data)) as ico:
+        for expected in images:
+            ico.size = expected.size
+            assert ico.convert("RGBA").tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("entry_format", ["png", "bmp", "auto"])
+def test_parallel_encoding_matches_sequential(entry_format):
+    images = _make_images()
+    sequential = encode_ico(images, entry_format=entry_format)
+    parallel = encode_ico(images, entry_format=entry_format, max_threads=4)
+    assert parallel == sequential
+
+
+def test_compress_level_applies_to_png_entries():
+    images = _make_images([(256, 256)])
+    fast = encode_ico(images, compress_level=0)
+    small = encode_ico(images, compress_level=9)
+    assert len(fast) > len(small)
+    with Image.open(io.BytesIO(fast)) as ico:
+        assert ico.convert("RGBA").tobytes() == images[0].tobytes()
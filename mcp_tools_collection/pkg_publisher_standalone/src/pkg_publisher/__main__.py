@@ -1,5 +1,27 @@
 from .server import app, init_service
-from .service import PkgPublisherService, setup_logging, __version__
+from .executors import (
+    DEFAULT_PTY_COLUMNS,
+    DEFAULT_PTY_ROWS,
+    DEFAULT_READ_CHUNK_SIZE,
+    READ_MODE_CHUNK,
+)
+from .service import (
+    DEFAULT_MAX_TASKS,
+    DEFAULT_TASK_TTL,
+    ENV_MAX_TASKS,
+    ENV_PTY_COLUMNS,
+    ENV_PTY_ROWS,
+    ENV_READ_CHUNK_SIZE,
+    ENV_READ_MODE,
+    ENV_SPILL_DIR,
+    ENV_SPILL_DISK_QUOTA,
+    ENV_SPILL_TO_DISK,
+    ENV_TASK_TTL,
+    PkgPublisherService,
+    setup_logging,
+    __version__,
+)
+from .streaming_buffer import DEFAULT_DISK_QUOTA
 import logging
 import os
 import tempfile
@@ -29,8 +51,25 @@ def main():
     logger.info(f"PYPI_API_TOKEN: {'(set)' if os.environ.get('PYPI_API_TOKEN') else '(not set)'}")
     logger.info(f"TEST_PYPI_API_TOKEN: {'(set)' if os.environ.get('TEST_PYPI_API_TOKEN') else '(not set)'}")
     logger.info("=" * 60)
-    
-    service = PkgPublisherService()
+
+    spill_to_disk = os.environ.get(ENV_SPILL_TO_DISK, "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    service = PkgPublisherService(
+        spill_to_disk=spill_to_disk,
+        spill_dir=os.environ.get(ENV_SPILL_DIR) or None,
+        disk_quota=int(os.environ.get(ENV_SPILL_DISK_QUOTA, DEFAULT_DISK_QUOTA)),
+        read_mode=os.environ.get(ENV_READ_MODE) or READ_MODE_CHUNK,
+        read_chunk_size=int(
+            os.environ.get(ENV_READ_CHUNK_SIZE, DEFAULT_READ_CHUNK_SIZE)
+        ),
+        pty_columns=int(os.environ.get(ENV_PTY_COLUMNS, DEFAULT_PTY_COLUMNS)),
+        pty_rows=int(os.environ.get(ENV_PTY_ROWS, DEFAULT_PTY_ROWS)),
+        max_tasks=int(os.environ.get(ENV_MAX_TASKS, DEFAULT_MAX_TASKS)),
+        task_ttl=float(os.environ.get(ENV_TASK_TTL, DEFAULT_TASK_TTL)),
+    )
     init_service(service)
     
     logger.info("Service initialized, starting MCP server...")
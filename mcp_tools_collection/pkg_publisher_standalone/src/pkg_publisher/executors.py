@@ -4,6 +4,8 @@ Executors 模块 - 命令执行器
 提供不同模式的命令执行器，支持流式输出捕获。
 """
 
+import selectors
+import signal
 import subprocess
 import threading
 import time
@@ -13,6 +15,17 @@ from typing import Optional, Dict, Any
 
 from .streaming_buffer import StreamingBuffer
 
+# POSIX 平台使用标准库 pty 实现 PTY 模式
+try:
+    import fcntl
+    import pty
+    import struct
+    import termios
+
+    POSIX_PTY_AVAILABLE = os.name == "posix"
+except ImportError:
+    POSIX_PTY_AVAILABLE = False
+
 # 尝试导入 pywinpty（仅 Windows 平台可用）
 try:
     from winpty import PtyProcess
@@ -22,6 +35,24 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 管道读取模式
+READ_MODE_CHUNK = "chunk"  # 按块读取，不等待换行
+READ_MODE_LINE = "line"  # 逐行读取
+READ_MODES = (READ_MODE_CHUNK, READ_MODE_LINE)
+
+# 按块读取时复用的缓冲区大小：64KB（与 Linux 默认管道容量一致）
+DEFAULT_READ_CHUNK_SIZE = 64 * 1024
+
+# PTY 等待 EOF 期间检查进程是否存活的间隔（秒），仅用于 EOF 丢失时兜底
+PTY_LIVENESS_CHECK_INTERVAL = 0.5
+
+# POSIX PTY 默认窗口大小和终端类型
+DEFAULT_PTY_COLUMNS = 120
+DEFAULT_PTY_ROWS = 40
+DEFAULT_PTY_TERM = "xterm-256color"
+# POSIX PTY 读取输出时检查进程是否退出的间隔（秒）
+PTY_POLL_INTERVAL = 0.05
+
 
 class SubprocessExecutor:
     """
@@ -29,18 +60,42 @@ class SubprocessExecutor:
     
     使用 subprocess.Popen 执行命令，通过后台线程实时捕获
     stdout 和 stderr 输出到 StreamingBuffer。
+
+    支持两种管道读取模式：
+    - chunk（默认）：用可复用的缓冲区按块读取，每次系统调用读到的数据
+      一次性写入缓冲区，不等待换行，没有换行的进度条也能实时看到
+    - line：逐行读取，每行写入一次缓冲区
     """
     
-    def __init__(self, stdout_buffer: StreamingBuffer, stderr_buffer: StreamingBuffer):
+    def __init__(
+        self,
+        stdout_buffer: StreamingBuffer,
+        stderr_buffer: StreamingBuffer,
+        read_mode: str = READ_MODE_CHUNK,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+    ):
         """
         初始化执行器
         
         Args:
             stdout_buffer: stdout 输出缓冲区
             stderr_buffer: stderr 输出缓冲区
+            read_mode: 管道读取模式，"chunk" 或 "line"
+            read_chunk_size: chunk 模式下每次读取的最大字节数
+
+        Raises:
+            ValueError: read_mode 或 read_chunk_size 无效
         """
+        if read_mode not in READ_MODES:
+            raise ValueError(
+                f"Invalid read_mode: {read_mode!r}, expected one of {READ_MODES}"
+            )
+        if read_chunk_size <= 0:
+            raise ValueError(f"read_chunk_size must be positive, got {read_chunk_size}")
         self._stdout_buffer = stdout_buffer
         self._stderr_buffer = stderr_buffer
+        self._read_mode = read_mode
+        self._read_chunk_size = read_chunk_size
         self._process: Optional[subprocess.Popen] = None
         self._stdout_thread: Optional[threading.Thread] = None
         self._stderr_thread: Optional[threading.Thread] = None
@@ -73,22 +128,27 @@ class SubprocessExecutor:
         
         try:
             # 启动进程，配置管道捕获输出
+            # chunk 模式直接读取无缓冲的管道，避免数据在 BufferedReader 中多复制一次；
+            # line 模式需要 readline，使用默认缓冲区大小
+            chunked = self._read_mode == READ_MODE_CHUNK
             self._process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 cwd=working_directory,
                 env=env,
+                bufsize=0 if chunked else -1,
             )
             
             # 启动后台线程读取输出
+            reader = self._read_chunks if chunked else self._read_output
             self._stdout_thread = threading.Thread(
-                target=self._read_output,
+                target=reader,
                 args=(self._process.stdout, self._stdout_buffer),
                 daemon=True
             )
             self._stderr_thread = threading.Thread(
-                target=self._read_output,
+                target=reader,
                 args=(self._process.stderr, self._stderr_buffer),
                 daemon=True
             )
@@ -146,6 +206,35 @@ class SubprocessExecutor:
                 pipe.close()
             except Exception:
                 pass
+
+    def _read_chunks(self, pipe, buffer: StreamingBuffer) -> None:
+        """
+        后台线程：按块读取管道输出
+
+        每次 readinto 对应一次 read 系统调用，返回管道中当前可读的数据
+        （最多 read_chunk_size 字节），整块写入 StreamingBuffer。
+        读取缓冲区在整个过程中复用，StreamingBuffer.write 会复制数据。
+
+        Args:
+            pipe: 要读取的无缓冲管道 (stdout 或 stderr)
+            buffer: 目标缓冲区
+        """
+        chunk = bytearray(self._read_chunk_size)
+        view = memoryview(chunk)
+        try:
+            while True:
+                count = pipe.readinto(view)
+                if not count:
+                    break
+                buffer.write(view[:count])
+        except Exception:
+            # 忽略读取错误，可能是管道已关闭
+            pass
+        finally:
+            try:
+                pipe.close()
+            except Exception:
+                pass
     
     def terminate(self) -> None:
         """
@@ -199,6 +288,7 @@ class PtyExecutor:
         self._process: Optional[Any] = None
         self._reader_thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
+        self._eof_event = threading.Event()
         self._pty_available = PYWINPTY_AVAILABLE
     
     @property
@@ -289,6 +379,7 @@ class PtyExecutor:
             )
         
         self._stop_event.clear()
+        self._eof_event.clear()
         timeout_occurred = False
         start_time = time.time()
         
@@ -352,6 +443,9 @@ class PtyExecutor:
         """
         等待进程完成
         
+        读取线程读到 EOF 时设置 _eof_event，这里直接等待该事件，
+        命令结束后立即返回，不再按固定间隔轮询。
+
         Args:
             timeout: 超时时间（秒）
             start_time: 开始时间
@@ -359,71 +453,73 @@ class PtyExecutor:
         Returns:
             进程退出码，如果超时返回 None
         """
-        while True:
-            # 检查进程是否已结束
-            if self._process is not None and not self._process.isalive():
-                return self._process.exitstatus or 0
-            
-            # 检查超时
-            if timeout is not None:
-                elapsed = time.time() - start_time
-                if elapsed >= timeout:
+        deadline = start_time + timeout if timeout is not None else None
+
+        while not self._eof_event.is_set():
+            wait_time = PTY_LIVENESS_CHECK_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
                     return None
-            
-            # 短暂休眠，避免 CPU 空转
-            time.sleep(0.1)
+                wait_time = min(wait_time, remaining)
+            if self._eof_event.wait(wait_time):
+                break
+            # 兜底：进程已退出但迟迟没有 EOF（部分终端实现的已知问题）
+            if self._process is not None and not self._process.isalive():
+                self._eof_event.wait(PTY_LIVENESS_CHECK_INTERVAL)
+                break
+
+        # 输出结束时进程通常已经退出，否则以指数退避短暂等待其退出
+        delay = 0.001
+        while self._process is not None and self._process.isalive():
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return self._process.exitstatus or 0
     
     def _read_output(self) -> None:
         """
         后台线程：持续读取 PTY 输出
+
+        阻塞读取 PTY 输出直到 EOF，读到 EOF 或出错时设置 _eof_event
+        通知等待方。PTY 模式下 stdout 和 stderr 合并为单一输出流，
+        因此所有输出都写入 stdout_buffer。
         """
         try:
-            while not self._stop_event.is_set():
-                if self._process is None:
-                    break
-                    
+            while not self._stop_event.is_set() and self._process is not None:
                 try:
-                    if not self._process.isalive():
-                        # 读取剩余输出
-                        try:
-                            remaining = self._process.read()
-                            if remaining:
-                                self._stdout_buffer.write(remaining.encode('utf-8', errors='replace'))
-                        except Exception:
-                            pass
-                        break
-                    
-                    # 读取可用输出
-                    try:
-                        data = self._process.read(4096)
-                        if data:
-                            self._stdout_buffer.write(data.encode('utf-8', errors='replace'))
-                    except EOFError:
-                        break
-                    except Exception:
-                        time.sleep(0.01)
-                        
-                except Exception:
+                    # pywinpty 的 read 在没有数据时阻塞，PTY 关闭时抛出 EOFError
+                    data = self._process.read(4096)
+                except EOFError:
                     break
-                    
+                if data:
+                    # pywinpty 返回字符串，需要编码为字节
+                    self._stdout_buffer.write(data.encode("utf-8", errors="replace"))
         except Exception as e:
             logger.debug(f"PTY read thread error: {e}")
+        finally:
+            self._eof_event.set()
     
     def terminate(self) -> None:
         """
         终止执行
+
+        停止读取线程并终止 PTY 进程。
         """
         self._stop_event.set()
         
         if self._process is not None:
             try:
                 if self._process.isalive():
+                    # 尝试优雅终止，进程退出时 PTY 关闭，读取线程会设置 _eof_event
                     try:
                         self._process.terminate(force=False)
-                        time.sleep(0.5)
+                        self._eof_event.wait(0.5)
                     except Exception:
                         pass
                     
+                    # 如果还活着，强制终止
                     if self._process.isalive():
                         try:
                             self._process.terminate(force=True)
@@ -433,6 +529,228 @@ class PtyExecutor:
                 logger.debug(f"Error terminating PTY process: {e}")
 
 
+class PosixPtyExecutor:
+    """
+    POSIX PTY 模式命令执行器
+
+    使用 pty.openpty 创建伪终端，子进程的 stdin/stdout/stderr 都连接到从端，
+    isatty() 为真，进度条等终端交互程序的输出可以被正确捕获：
+    - 在调用线程中通过 selectors 非阻塞读取主端，不需要额外的读取线程
+    - 窗口大小通过 TIOCSWINSZ 设置，可在运行中调用 resize 调整
+    - 关闭输出的 \\n -> \\r\\n 转换，输出与管道模式一致使用 \\n 换行
+    - 子进程在新会话中运行且没有控制终端，读取 /dev/tty 的程序会直接失败而不是卡住；
+      超时时终止整个进程组
+
+    注意：PTY 模式下 stdout 和 stderr 合并为单一输出流。
+    """
+
+    def __init__(
+        self,
+        stdout_buffer: StreamingBuffer,
+        stderr_buffer: StreamingBuffer,
+        columns: int = DEFAULT_PTY_COLUMNS,
+        rows: int = DEFAULT_PTY_ROWS,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+    ):
+        """
+        初始化执行器
+
+        Args:
+            stdout_buffer: stdout 输出缓冲区（PTY 模式下所有输出写入此缓冲区）
+            stderr_buffer: stderr 输出缓冲区（PTY 模式下不使用，保持为空）
+            columns: 终端列数
+            rows: 终端行数
+            read_chunk_size: 每次读取的最大字节数
+        """
+        self._stdout_buffer = stdout_buffer
+        self._stderr_buffer = stderr_buffer
+        self._columns = columns
+        self._rows = rows
+        self._read_chunk_size = read_chunk_size
+        self._process: Optional[subprocess.Popen] = None
+        self._master_fd: Optional[int] = None
+
+    @property
+    def is_available(self) -> bool:
+        """检查 POSIX PTY 是否可用"""
+        return POSIX_PTY_AVAILABLE
+
+    def resize(self, columns: int, rows: int) -> None:
+        """
+        调整终端窗口大小，运行中的前台进程组会收到 SIGWINCH
+
+        Args:
+            columns: 终端列数
+            rows: 终端行数
+        """
+        self._columns = columns
+        self._rows = rows
+        if self._master_fd is not None:
+            _set_window_size(self._master_fd, columns, rows)
+
+    def execute(
+        self,
+        command: list,
+        working_directory: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        在 PTY 中执行命令
+
+        Args:
+            command: 要执行的命令列表
+            working_directory: 工作目录
+            env: 环境变量
+            timeout: 超时时间（秒）
+
+        Returns:
+            {
+                "exit_code": int,
+                "timeout_occurred": bool,
+                "pty_fallback": bool
+            }
+
+        Raises:
+            PtyInitializationError: PTY 创建或进程启动失败时抛出
+        """
+        if not POSIX_PTY_AVAILABLE:
+            raise PtyInitializationError("POSIX pty is not available on this platform")
+
+        deadline = time.time() + timeout if timeout is not None else None
+        try:
+            master_fd, slave_fd = pty.openpty()
+        except OSError as e:
+            raise PtyInitializationError(f"Failed to open pty: {e}")
+
+        try:
+            try:
+                _set_window_size(slave_fd, self._columns, self._rows)
+                attrs = termios.tcgetattr(slave_fd)
+                attrs[1] &= ~termios.ONLCR
+                termios.tcsetattr(slave_fd, termios.TCSANOW, attrs)
+
+                process_env = dict(os.environ if env is None else env)
+                process_env.setdefault("TERM", DEFAULT_PTY_TERM)
+                self._process = subprocess.Popen(
+                    command,
+                    stdin=slave_fd,
+                    stdout=slave_fd,
+                    stderr=slave_fd,
+                    cwd=working_directory,
+                    env=process_env,
+                    start_new_session=True,
+                )
+            except OSError as e:
+                raise PtyInitializationError(f"Failed to spawn PTY process: {e}")
+            finally:
+                os.close(slave_fd)
+
+            self._master_fd = master_fd
+            os.set_blocking(master_fd, False)
+            exit_code = self._read_until_exit(master_fd, deadline)
+
+            timeout_occurred = exit_code is None
+            if timeout_occurred:
+                self.terminate()
+                exit_code = -1
+
+            return {
+                "exit_code": exit_code,
+                "timeout_occurred": timeout_occurred,
+                "pty_fallback": False,
+            }
+        except PtyInitializationError:
+            raise
+        except Exception as e:
+            logger.error(f"PTY execution error: {e}")
+            self.terminate()
+            raise
+        finally:
+            self._master_fd = None
+            os.close(master_fd)
+
+    def _read_until_exit(
+        self, master_fd: int, deadline: Optional[float]
+    ) -> Optional[int]:
+        """
+        读取 PTY 输出直到所有从端关闭，并等待进程退出
+
+        Args:
+            master_fd: PTY 主端
+            deadline: 超时时刻（time.time()），None 表示不限制
+
+        Returns:
+            进程退出码，如果超时返回 None
+        """
+        chunk = bytearray(self._read_chunk_size)
+        view = memoryview(chunk)
+        exited_at: Optional[float] = None
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(master_fd, selectors.EVENT_READ)
+            while True:
+                now = time.time()
+                if exited_at is None and self._process.poll() is not None:
+                    exited_at = now
+                if exited_at is None:
+                    if deadline is not None and now >= deadline:
+                        return None
+                    # 从端关闭时主端立即可读，这里的间隔只影响后台子进程
+                    # 继续持有终端时发现进程退出的时间
+                    wait_time = PTY_POLL_INTERVAL
+                    if deadline is not None:
+                        wait_time = min(wait_time, deadline - now)
+                else:
+                    # 进程已退出，最多再等待 1 秒读取剩余输出
+                    wait_time = exited_at + 1.0 - now
+                    if wait_time <= 0:
+                        break
+
+                if not selector.select(wait_time):
+                    continue
+                try:
+                    count = os.readv(master_fd, [view])
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    # Linux 上所有从端关闭后读取主端返回 EIO
+                    count = 0
+                if not count:
+                    break
+                self._stdout_buffer.write(view[:count])
+
+        try:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            return self._process.wait(timeout=remaining)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def terminate(self) -> None:
+        """
+        终止执行
+
+        向子进程所在的进程组发送 SIGTERM，2 秒后仍未退出则 SIGKILL。
+        """
+        process = self._process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait(timeout=1.0)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug(f"Error terminating PTY process: {e}")
+
+
+def _set_window_size(fd: int, columns: int, rows: int) -> None:
+    """通过 TIOCSWINSZ 设置终端窗口大小"""
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, columns, 0, 0))
+
+
 def execute_with_pty_fallback(
     command: list,
     stdout_buffer: StreamingBuffer,
@@ -440,11 +758,17 @@ def execute_with_pty_fallback(
     use_pty: bool = True,
     working_directory: Optional[str] = None,
     env: Optional[Dict[str, str]] = None,
-    timeout: Optional[int] = None
+    timeout: Optional[int] = None,
+    read_mode: str = READ_MODE_CHUNK,
+    read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+    pty_columns: int = DEFAULT_PTY_COLUMNS,
+    pty_rows: int = DEFAULT_PTY_ROWS,
 ) -> Dict[str, Any]:
     """
     执行命令，支持 PTY 模式和自动降级
     
+    PTY 模式在 POSIX 平台上使用标准库 pty（PosixPtyExecutor），
+    在 Windows 上使用 pywinpty（PtyExecutor）。
     如果请求 PTY 模式但 PTY 初始化失败，将自动降级到 subprocess 模式。
     
     Args:
@@ -455,6 +779,10 @@ def execute_with_pty_fallback(
         working_directory: 工作目录
         env: 环境变量
         timeout: 超时时间（秒）
+        read_mode: subprocess 模式下的管道读取模式，"chunk" 或 "line"
+        read_chunk_size: chunk 模式下每次读取的最大字节数
+        pty_columns: POSIX PTY 模式的终端列数
+        pty_rows: POSIX PTY 模式的终端行数
         
     Returns:
         {
@@ -470,7 +798,16 @@ def execute_with_pty_fallback(
     
     if use_pty:
         try:
-            executor = PtyExecutor(stdout_buffer, stderr_buffer)
+            if POSIX_PTY_AVAILABLE:
+                executor = PosixPtyExecutor(
+                    stdout_buffer,
+                    stderr_buffer,
+                    columns=pty_columns,
+                    rows=pty_rows,
+                    read_chunk_size=read_chunk_size,
+                )
+            else:
+                executor = PtyExecutor(stdout_buffer, stderr_buffer)
             
             if not executor.is_available:
                 pty_fallback = True
@@ -502,7 +839,12 @@ def execute_with_pty_fallback(
             logger.warning(f"PTY execution failed: {e}. Falling back to subprocess.")
     
     # 使用 subprocess 模式
-    executor = SubprocessExecutor(stdout_buffer, stderr_buffer)
+    executor = SubprocessExecutor(
+        stdout_buffer,
+        stderr_buffer,
+        read_mode=read_mode,
+        read_chunk_size=read_chunk_size,
+    )
     result = executor.execute(
         command=command,
         working_directory=working_directory,
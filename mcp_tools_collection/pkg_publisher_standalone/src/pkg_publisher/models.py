@@ -0,0 +1,105 @@
+"""
+数据模型定义 - pkg-publisher
+
+每个任务的状态保存在一个 TaskRecord 中。TaskRecord 使用 __slots__，
+不为每个实例创建 __dict__，字段访问也比字典查找更快。
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .streaming_buffer import StreamingBuffer
+
+# to_dict 返回的状态字段，不包含输出缓冲区
+SNAPSHOT_FIELDS = (
+    "token",
+    "task_type",
+    "status",
+    "params",
+    "use_pty",
+    "exit_code",
+    "execution_time",
+    "result_data",
+    "pty_used",
+    "pty_fallback",
+    "fallback_reason",
+)
+
+
+class TaskRecord:
+    """
+    任务的执行状态
+
+    状态字段由服务锁保护。params 保存任务类型相关的提交参数（如 project_path、
+    repository），创建后不再改变。不使用 PTY 的任务（get_package_info）的
+    pty_used 为 None，查询结果中不包含 PTY 相关字段。
+    """
+
+    __slots__ = SNAPSHOT_FIELDS + (
+        "start_time",
+        "stdout_buffer",
+        "stderr_buffer",
+        "completed_at",
+    )
+
+    def __init__(
+        self,
+        token: str,
+        task_type: str,
+        params: Dict[str, Any],
+        stdout_buffer: StreamingBuffer,
+        stderr_buffer: StreamingBuffer,
+        use_pty: Optional[bool] = None,
+    ):
+        """
+        Args:
+            token: 任务的 token
+            task_type: 任务类型，如 "build_package"
+            params: 任务类型相关的提交参数
+            stdout_buffer: stdout 输出缓冲区
+            stderr_buffer: stderr 输出缓冲区
+            use_pty: 是否请求 PTY 模式，不使用 PTY 的任务为 None
+        """
+        self.token = token
+        self.task_type = task_type
+        self.status = "pending"
+        self.params = params
+        self.use_pty = use_pty
+        self.start_time = datetime.now()
+        self.stdout_buffer = stdout_buffer
+        self.stderr_buffer = stderr_buffer
+        self.exit_code: Optional[int] = None
+        self.execution_time: Optional[float] = None
+        self.result_data: Optional[Dict[str, Any]] = None
+        self.pty_used: Optional[bool] = None if use_pty is None else False
+        self.pty_fallback = False
+        self.fallback_reason = ""
+        # 保留策略使用的单调时钟时间
+        self.completed_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        状态字段的快照，不包含输出，调用方需持有服务锁以得到一致的结果
+
+        Returns:
+            SNAPSHOT_FIELDS 中各字段的值，以及 ISO 格式的 start_time
+        """
+        snapshot = {name: getattr(self, name) for name in SNAPSHOT_FIELDS}
+        snapshot["start_time"] = self.start_time.isoformat()
+        return snapshot
+
+    def freeze_buffers(self) -> None:
+        """冻结输出缓冲区"""
+        self.stdout_buffer.freeze()
+        self.stderr_buffer.freeze()
+
+    def close_buffers(self) -> None:
+        """关闭输出缓冲区，释放内存并删除临时文件"""
+        self.stdout_buffer.close()
+        self.stderr_buffer.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"TaskRecord(token={self.token!r}, task_type={self.task_type!r}, "
+            f"status={self.status!r})"
+        )
@@ -264,9 +264,41 @@ StderrOffsetInt = Annotated[
 ]
 
 
+MaxBytesInt = Annotated[
+    Optional[int],
+    Field(
+        description="每个输出流最多返回的字节数，用于分页读取大量输出（默认不限制）",
+        default=None,
+        ge=1,
+    ),
+]
+
+TailBytesInt = Annotated[
+    Optional[int],
+    Field(
+        description="尾部模式：每个输出流只返回最后 N 字节，忽略偏移量（默认不启用）",
+        default=None,
+        ge=1,
+    ),
+]
+
+TailLinesInt = Annotated[
+    Optional[int],
+    Field(
+        description="尾部模式：每个输出流只返回最后 N 行，忽略偏移量（默认不启用）",
+        default=None,
+        ge=1,
+    ),
+]
+
+
 @app.tool(
     name="query_task_status",
-    description="查询异步任务执行状态和结果。支持增量输出查询，通过偏移量获取新增输出。",
+    description=(
+        "查询异步任务执行状态和结果。支持增量输出查询，通过偏移量获取新增输出。"
+        "使用 max_bytes 分页读取，按 stdout_next_offset/stderr_next_offset 继续查询；"
+        "使用 tail_bytes/tail_lines 只查看最后 N 字节或 N 行。"
+    ),
     annotations={
         "title": "任务状态查询器",
         "readOnlyHint": True,
@@ -279,6 +311,9 @@ def query_task_status(
     token: str,
     stdout_offset: StdoutOffsetInt = 0,
     stderr_offset: StderrOffsetInt = 0,
+    max_bytes: MaxBytesInt = None,
+    tail_bytes: TailBytesInt = None,
+    tail_lines: TailLinesInt = None,
 ) -> Dict[str, Any]:
     """
     查询异步任务执行状态和结果
@@ -287,6 +322,9 @@ def query_task_status(
         token: 任务 token (GUID 字符串)
         stdout_offset: stdout 输出偏移量（默认 0，返回全部）
         stderr_offset: stderr 输出偏移量（默认 0，返回全部）
+        max_bytes: 每个输出流最多返回的字节数（默认不限制）
+        tail_bytes: 尾部模式，只返回最后 N 字节
+        tail_lines: 尾部模式，只返回最后 N 行
 
     Returns:
         包含任务状态和结果的字典，包括：
@@ -295,15 +333,28 @@ def query_task_status(
         - task_type: 任务类型
         - stdout: stdout 输出（从偏移量开始）
         - stderr: stderr 输出（从偏移量开始）
-        - stdout_length: stdout 总长度
-        - stderr_length: stderr 总长度
+        - stdout_length: stdout 累计字节数（绝对偏移量，可作为下次查询的偏移量）
+        - stderr_length: stderr 累计字节数（绝对偏移量，可作为下次查询的偏移量）
+        - stdout_start_offset: stdout 最早保留数据的绝对偏移量
+        - stderr_start_offset: stderr 最早保留数据的绝对偏移量
+        - stdout_next_offset: 下次查询 stdout 使用的偏移量
+        - stderr_next_offset: 下次查询 stderr 使用的偏移量
+        - stdout_has_more: stdout 是否还有未返回的输出
+        - stderr_has_more: stderr 是否还有未返回的输出
         - exit_code: 退出码（完成时）
         - execution_time: 执行时间（完成时）
         - pty_used: 是否使用了 PTY 模式
         - pty_fallback: 是否发生了 PTY 降级
     """
     try:
-        result = _svc().query_task_status(token, stdout_offset, stderr_offset)
+        result = _svc().query_task_status(
+            token,
+            stdout_offset,
+            stderr_offset,
+            max_bytes=max_bytes,
+            tail_bytes=tail_bytes,
+            tail_lines=tail_lines,
+        )
         return result
     except Exception as e:
         return {"error": str(e)}
@@ -13,21 +13,49 @@ import shutil
 import threading
 import uuid
 import time
-from datetime import datetime
+from collections import OrderedDict
 from typing import Dict, Optional, List, Any
 from pathlib import Path
 import requests
 
-from .streaming_buffer import StreamingBuffer
-from .executors import execute_with_pty_fallback
+from .models import TaskRecord
+from .streaming_buffer import (
+    DEFAULT_DISK_QUOTA,
+    DEFAULT_SPILL_MEMORY_SIZE,
+    SpillingStreamingBuffer,
+    StreamingBuffer,
+)
+from .executors import (
+    DEFAULT_PTY_COLUMNS,
+    DEFAULT_PTY_ROWS,
+    DEFAULT_READ_CHUNK_SIZE,
+    READ_MODE_CHUNK,
+    execute_with_pty_fallback,
+)
 
 __version__ = "0.1.6"
 
 ENV_PYTHON_PATH = "PKG_PUBLISHER_PYTHON_PATH"
+ENV_SPILL_TO_DISK = "PKG_PUBLISHER_SPILL_TO_DISK"
+ENV_SPILL_DIR = "PKG_PUBLISHER_SPILL_DIR"
+ENV_SPILL_DISK_QUOTA = "PKG_PUBLISHER_SPILL_DISK_QUOTA"
+ENV_READ_MODE = "PKG_PUBLISHER_READ_MODE"
+ENV_READ_CHUNK_SIZE = "PKG_PUBLISHER_READ_CHUNK_SIZE"
+ENV_PTY_COLUMNS = "PKG_PUBLISHER_PTY_COLUMNS"
+ENV_PTY_ROWS = "PKG_PUBLISHER_PTY_ROWS"
+ENV_MAX_TASKS = "PKG_PUBLISHER_MAX_TASKS"
+ENV_TASK_TTL = "PKG_PUBLISHER_TASK_TTL"
 
 # 默认最大缓冲区大小：10MB
 DEFAULT_MAX_BUFFER_SIZE = 10 * 1024 * 1024
 
+# 任务保留策略默认值，0 表示不限制
+DEFAULT_MAX_TASKS = 100
+# 任务完成后保留的时间（秒）
+DEFAULT_TASK_TTL = 3600
+# 后台清理线程的运行间隔（秒），0 表示不启动清理线程
+DEFAULT_REAP_INTERVAL = 60
+
 logger = logging.getLogger("pkg-publisher")
 
 
@@ -171,11 +199,159 @@ class PkgPublisherService:
     - 流式输出捕获到 StreamingBuffer
     - PTY 模式执行（解决 twine 进度条问题）
     - 增量输出查询（通过偏移量）
+    - 输出落盘模式（可选），保留完整构建日志而不占用内存
+    - 任务保留策略：完成后超过 TTL 或超过数量上限的任务按完成顺序清理，
+      同时关闭输出缓冲区并删除临时文件，运行中的任务不会被清理
     """
 
-    def __init__(self):
-        self.tasks: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        spill_to_disk: bool = False,
+        spill_dir: Optional[str] = None,
+        disk_quota: int = DEFAULT_DISK_QUOTA,
+        read_mode: str = READ_MODE_CHUNK,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        pty_columns: int = DEFAULT_PTY_COLUMNS,
+        pty_rows: int = DEFAULT_PTY_ROWS,
+        max_tasks: int = DEFAULT_MAX_TASKS,
+        task_ttl: float = DEFAULT_TASK_TTL,
+        reap_interval: float = DEFAULT_REAP_INTERVAL,
+    ):
+        """
+        Args:
+            spill_to_disk: 是否将任务输出写入临时文件
+            spill_dir: 临时文件所在目录，默认为系统临时目录
+            disk_quota: 每个输出流的磁盘配额（字节），默认 1GB
+            read_mode: subprocess 模式下的管道读取模式，"chunk"（默认）或 "line"
+            read_chunk_size: chunk 模式下每次读取的最大字节数，默认 64KB
+            pty_columns: POSIX PTY 模式的终端列数，默认 120
+            pty_rows: POSIX PTY 模式的终端行数，默认 40
+            max_tasks: 最多保留的任务数，超出时清理最早完成的任务，0 表示不限制
+            task_ttl: 任务完成后保留的时间（秒），默认 1 小时，0 表示不过期
+            reap_interval: 后台清理线程的运行间隔（秒），默认 60 秒，0 表示只在提交任务时清理
+        """
+        self.tasks: Dict[str, TaskRecord] = {}
+        # 已完成任务的 token 到完成时间的映射，按完成顺序排列
+        self._completed: "OrderedDict[str, float]" = OrderedDict()
         self.lock = threading.Lock()
+        self.spill_to_disk = spill_to_disk
+        self.spill_dir = spill_dir
+        self.disk_quota = disk_quota
+        self.read_mode = read_mode
+        self.read_chunk_size = read_chunk_size
+        self.pty_columns = pty_columns
+        self.pty_rows = pty_rows
+        self.max_tasks = max_tasks
+        self.task_ttl = task_ttl
+        self.reap_interval = reap_interval
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+
+    def _create_buffer(self, max_buffer_size: int) -> StreamingBuffer:
+        """
+        创建输出缓冲区
+
+        落盘模式下 max_buffer_size 作为内存尾部大小的上限，
+        完整输出写入临时文件，受 disk_quota 限制。
+        """
+        if self.spill_to_disk:
+            return SpillingStreamingBuffer(
+                memory_size=min(max_buffer_size, DEFAULT_SPILL_MEMORY_SIZE),
+                disk_quota=self.disk_quota,
+                directory=self.spill_dir,
+            )
+        return StreamingBuffer(max_size=max_buffer_size)
+
+    def _register_task(
+        self,
+        task_type: str,
+        params: Dict[str, Any],
+        stdout_buffer: StreamingBuffer,
+        stderr_buffer: StreamingBuffer,
+        use_pty: Optional[bool] = None,
+    ) -> str:
+        """
+        登记新任务
+
+        Returns:
+            任务执行的token
+        """
+        token = str(uuid.uuid4())
+        record = TaskRecord(
+            token, task_type, params, stdout_buffer, stderr_buffer, use_pty=use_pty
+        )
+        with self.lock:
+            self.tasks[token] = record
+            evicted = self._evict_locked(time.monotonic())
+            self._ensure_reaper()
+        for old in evicted:
+            old.close_buffers()
+        return token
+
+    def enforce_retention(self) -> int:
+        """
+        按保留策略清理已完成的任务
+
+        后台清理线程定期调用，也可以手动调用。
+
+        Returns:
+            被清理的任务数
+        """
+        with self.lock:
+            evicted = self._evict_locked(time.monotonic())
+        for record in evicted:
+            record.close_buffers()
+        return len(evicted)
+
+    def _evict_locked(self, now: float) -> List[TaskRecord]:
+        """
+        移除超出保留策略的已完成任务，调用方需持有锁
+
+        缓冲区由调用方在释放锁后关闭。
+
+        Returns:
+            被移除的任务
+        """
+        evicted = []
+        excess = len(self.tasks) - self.max_tasks if self.max_tasks else 0
+        while self._completed:
+            token, completed_at = next(iter(self._completed.items()))
+            expired = self.task_ttl and now - completed_at >= self.task_ttl
+            if not expired and excess <= 0:
+                break
+            del self._completed[token]
+            evicted.append(self.tasks.pop(token))
+            excess -= 1
+        return evicted
+
+    def _ensure_reaper(self) -> None:
+        """启动后台清理线程，调用方需持有锁"""
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+        self._reaper = threading.Thread(
+            target=self._reap_loop, name="pkg-publisher-reaper", daemon=True
+        )
+        self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while not self._reaper_stop.wait(self.reap_interval):
+            try:
+                evicted = self.enforce_retention()
+                if evicted:
+                    logger.debug(f"Evicted {evicted} finished tasks")
+            except Exception as e:
+                logger.error(f"Task reaper error: {e}")
+
+    def shutdown(self) -> None:
+        """
+        停止后台清理线程，并释放所有已完成任务的缓冲区和临时文件
+        """
+        self._reaper_stop.set()
+        with self.lock:
+            evicted = [self.tasks.pop(token) for token in self._completed]
+            self._completed.clear()
+        for record in evicted:
+            record.close_buffers()
 
     def build_package(
         self,
@@ -196,32 +372,13 @@ class PkgPublisherService:
         Returns:
             任务执行的token
         """
-        token = str(uuid.uuid4())
-        
-        stdout_buffer = StreamingBuffer(max_size=max_buffer_size)
-        stderr_buffer = StreamingBuffer(max_size=max_buffer_size)
-
-        task_info = {
-            "token": token,
-            "task_type": "build_package",
-            "project_path": project_path or os.getcwd(),
-            "clean": clean,
-            "use_pty": use_pty,
-            "status": "pending",
-            "start_time": datetime.now(),
-            "stdout_buffer": stdout_buffer,
-            "stderr_buffer": stderr_buffer,
-            "stdout": "",
-            "stderr": "",
-            "exit_code": None,
-            "execution_time": None,
-            "pty_used": False,
-            "pty_fallback": False,
-            "fallback_reason": "",
-        }
-
-        with self.lock:
-            self.tasks[token] = task_info
+        token = self._register_task(
+            "build_package",
+            {"project_path": project_path or os.getcwd(), "clean": clean},
+            self._create_buffer(max_buffer_size),
+            self._create_buffer(max_buffer_size),
+            use_pty=use_pty,
+        )
 
         thread = threading.Thread(
             target=self._execute_build_package,
@@ -255,34 +412,18 @@ class PkgPublisherService:
         Returns:
             任务执行的token
         """
-        token = str(uuid.uuid4())
-        
-        stdout_buffer = StreamingBuffer(max_size=max_buffer_size)
-        stderr_buffer = StreamingBuffer(max_size=max_buffer_size)
-
-        task_info = {
-            "token": token,
-            "task_type": "publish_package",
-            "package_path": package_path,
-            "repository": repository,
-            "skip_existing": skip_existing,
-            "project_path": project_path,
-            "use_pty": use_pty,
-            "status": "pending",
-            "start_time": datetime.now(),
-            "stdout_buffer": stdout_buffer,
-            "stderr_buffer": stderr_buffer,
-            "stdout": "",
-            "stderr": "",
-            "exit_code": None,
-            "execution_time": None,
-            "pty_used": False,
-            "pty_fallback": False,
-            "fallback_reason": "",
-        }
-
-        with self.lock:
-            self.tasks[token] = task_info
+        token = self._register_task(
+            "publish_package",
+            {
+                "package_path": package_path,
+                "repository": repository,
+                "skip_existing": skip_existing,
+                "project_path": project_path,
+            },
+            self._create_buffer(max_buffer_size),
+            self._create_buffer(max_buffer_size),
+            use_pty=use_pty,
+        )
 
         thread = threading.Thread(
             target=self._execute_publish_package,
@@ -310,31 +451,13 @@ class PkgPublisherService:
         Returns:
             任务执行的token
         """
-        token = str(uuid.uuid4())
-        
-        stdout_buffer = StreamingBuffer(max_size=max_buffer_size)
-        stderr_buffer = StreamingBuffer(max_size=max_buffer_size)
-
-        task_info = {
-            "token": token,
-            "task_type": "validate_package",
-            "package_path": package_path,
-            "use_pty": use_pty,
-            "status": "pending",
-            "start_time": datetime.now(),
-            "stdout_buffer": stdout_buffer,
-            "stderr_buffer": stderr_buffer,
-            "stdout": "",
-            "stderr": "",
-            "exit_code": None,
-            "execution_time": None,
-            "pty_used": False,
-            "pty_fallback": False,
-            "fallback_reason": "",
-        }
-
-        with self.lock:
-            self.tasks[token] = task_info
+        token = self._register_task(
+            "validate_package",
+            {"package_path": package_path},
+            self._create_buffer(max_buffer_size),
+            self._create_buffer(max_buffer_size),
+            use_pty=use_pty,
+        )
 
         thread = threading.Thread(
             target=self._execute_validate_package,
@@ -362,26 +485,16 @@ class PkgPublisherService:
         Returns:
             任务执行的token
         """
-        token = str(uuid.uuid4())
-
-        task_info = {
-            "token": token,
-            "task_type": "get_package_info",
-            "package_name": package_name,
-            "version": version,
-            "repository": repository,
-            "status": "pending",
-            "start_time": datetime.now(),
-            "stdout_buffer": StreamingBuffer(),
-            "stderr_buffer": StreamingBuffer(),
-            "stdout": "",
-            "stderr": "",
-            "exit_code": None,
-            "execution_time": None,
-        }
-
-        with self.lock:
-            self.tasks[token] = task_info
+        token = self._register_task(
+            "get_package_info",
+            {
+                "package_name": package_name,
+                "version": version,
+                "repository": repository,
+            },
+            StreamingBuffer(),
+            StreamingBuffer(),
+        )
 
         thread = threading.Thread(
             target=self._execute_get_package_info,
@@ -401,12 +514,12 @@ class PkgPublisherService:
 
         try:
             with self.lock:
-                if token in self.tasks:
-                    self.tasks[token]["status"] = "running"
-                    # 预设 pty_used 为 use_pty（实际值会在执行后更新）
-                    self.tasks[token]["pty_used"] = use_pty
-                    stdout_buffer = self.tasks[token]["stdout_buffer"]
-                    stderr_buffer = self.tasks[token]["stderr_buffer"]
+                record = self.tasks[token]
+                record.status = "running"
+                # 预设 pty_used 为 use_pty（实际值会在执行后更新）
+                record.pty_used = use_pty
+            stdout_buffer = record.stdout_buffer
+            stderr_buffer = record.stderr_buffer
 
             if project_path is None:
                 project_path = os.getcwd()
@@ -436,28 +549,26 @@ class PkgPublisherService:
                 working_directory=project_path,
                 env=env_vars,
                 timeout=600,  # 10分钟超时
+                read_mode=self.read_mode,
+                read_chunk_size=self.read_chunk_size,
+                pty_columns=self.pty_columns,
+                pty_rows=self.pty_rows,
             )
 
             execution_time = time.time() - start_time
             dist_files = _find_dist_files(project_path)
 
-            with self.lock:
-                if token in self.tasks:
-                    self.tasks[token].update({
-                        "status": "completed",
-                        "stdout": stdout_buffer.get_all(),
-                        "stderr": stderr_buffer.get_all(),
-                        "exit_code": result["exit_code"],
-                        "execution_time": execution_time,
-                        "pty_used": result["pty_used"],
-                        "pty_fallback": result["pty_fallback"],
-                        "fallback_reason": result.get("fallback_reason", ""),
-                        "result_data": {
-                            "success": result["exit_code"] == 0,
-                            "dist_files": dist_files,
-                            "project_path": project_path,
-                        },
-                    })
+            self._finish_task(
+                token,
+                result["exit_code"],
+                execution_time,
+                {
+                    "success": result["exit_code"] == 0,
+                    "dist_files": dist_files,
+                    "project_path": project_path,
+                },
+                result=result,
+            )
 
         except Exception as e:
             logger.error(f"Build failed with exception: {e}")
@@ -477,12 +588,12 @@ class PkgPublisherService:
 
         try:
             with self.lock:
-                if token in self.tasks:
-                    self.tasks[token]["status"] = "running"
-                    # 预设 pty_used 为 use_pty（实际值会在执行后更新）
-                    self.tasks[token]["pty_used"] = use_pty
-                    stdout_buffer = self.tasks[token]["stdout_buffer"]
-                    stderr_buffer = self.tasks[token]["stderr_buffer"]
+                record = self.tasks[token]
+                record.status = "running"
+                # 预设 pty_used 为 use_pty（实际值会在执行后更新）
+                record.pty_used = use_pty
+            stdout_buffer = record.stdout_buffer
+            stderr_buffer = record.stderr_buffer
 
             logger.info(f"Publishing to {repository}")
 
@@ -541,28 +652,26 @@ class PkgPublisherService:
                 working_directory=project_path,
                 env=env_vars,
                 timeout=300,  # 5分钟超时
+                read_mode=self.read_mode,
+                read_chunk_size=self.read_chunk_size,
+                pty_columns=self.pty_columns,
+                pty_rows=self.pty_rows,
             )
 
             execution_time = time.time() - start_time
             package_files = _get_package_files(package_path)
 
-            with self.lock:
-                if token in self.tasks:
-                    self.tasks[token].update({
-                        "status": "completed",
-                        "stdout": stdout_buffer.get_all(),
-                        "stderr": stderr_buffer.get_all(),
-                        "exit_code": result["exit_code"],
-                        "execution_time": execution_time,
-                        "pty_used": result["pty_used"],
-                        "pty_fallback": result["pty_fallback"],
-                        "fallback_reason": result.get("fallback_reason", ""),
-                        "result_data": {
-                            "success": result["exit_code"] == 0,
-                            "repository": repository,
-                            "package_files": package_files,
-                        },
-                    })
+            self._finish_task(
+                token,
+                result["exit_code"],
+                execution_time,
+                {
+                    "success": result["exit_code"] == 0,
+                    "repository": repository,
+                    "package_files": package_files,
+                },
+                result=result,
+            )
 
         except Exception as e:
             logger.error(f"Publish failed with exception: {e}")
@@ -574,12 +683,12 @@ class PkgPublisherService:
 
         try:
             with self.lock:
-                if token in self.tasks:
-                    self.tasks[token]["status"] = "running"
-                    # 预设 pty_used 为 use_pty（实际值会在执行后更新）
-                    self.tasks[token]["pty_used"] = use_pty
-                    stdout_buffer = self.tasks[token]["stdout_buffer"]
-                    stderr_buffer = self.tasks[token]["stderr_buffer"]
+                record = self.tasks[token]
+                record.status = "running"
+                # 预设 pty_used 为 use_pty（实际值会在执行后更新）
+                record.pty_used = use_pty
+            stdout_buffer = record.stdout_buffer
+            stderr_buffer = record.stderr_buffer
 
             logger.info(f"Validating package: {package_path}")
 
@@ -601,26 +710,24 @@ class PkgPublisherService:
                 use_pty=use_pty,
                 env=env_vars,
                 timeout=60,
+                read_mode=self.read_mode,
+                read_chunk_size=self.read_chunk_size,
+                pty_columns=self.pty_columns,
+                pty_rows=self.pty_rows,
             )
 
             execution_time = time.time() - start_time
 
-            with self.lock:
-                if token in self.tasks:
-                    self.tasks[token].update({
-                        "status": "completed",
-                        "stdout": stdout_buffer.get_all(),
-                        "stderr": stderr_buffer.get_all(),
-                        "exit_code": result["exit_code"],
-                        "execution_time": execution_time,
-                        "pty_used": result["pty_used"],
-                        "pty_fallback": result["pty_fallback"],
-                        "fallback_reason": result.get("fallback_reason", ""),
-                        "result_data": {
-                            "success": result["exit_code"] == 0,
-                            "package_path": package_path,
-                        },
-                    })
+            self._finish_task(
+                token,
+                result["exit_code"],
+                execution_time,
+                {
+                    "success": result["exit_code"] == 0,
+                    "package_path": package_path,
+                },
+                result=result,
+            )
 
         except Exception as e:
             logger.error(f"Validation failed with exception: {e}")
@@ -640,7 +747,7 @@ class PkgPublisherService:
         try:
             with self.lock:
                 if token in self.tasks:
-                    self.tasks[token]["status"] = "running"
+                    self.tasks[token].status = "running"
 
             logger.info(f"Getting package info: {package_name}")
 
@@ -660,21 +767,17 @@ class PkgPublisherService:
 
             execution_time = time.time() - start_time
 
-            with self.lock:
-                if token in self.tasks:
-                    self.tasks[token].update({
-                        "status": "completed",
-                        "stdout": "",
-                        "stderr": "",
-                        "exit_code": 0,
-                        "execution_time": execution_time,
-                        "result_data": {
-                            "success": True,
-                            "package_name": package_name,
-                            "version": version,
-                            "info": data,
-                        },
-                    })
+            self._finish_task(
+                token,
+                0,
+                execution_time,
+                {
+                    "success": True,
+                    "package_name": package_name,
+                    "version": version,
+                    "info": data,
+                },
+            )
 
         except requests.exceptions.RequestException as e:
             error_msg = f"Failed to get package info: {e}"
@@ -703,27 +806,63 @@ class PkgPublisherService:
         error_msg: str,
         result_data: Optional[Dict] = None,
     ):
-        """完成任务并更新状态"""
+        """完成任务并更新状态，错误信息追加到 stderr 缓冲区"""
         execution_time = time.time() - start_time
         with self.lock:
-            if token in self.tasks:
-                stdout_buffer = self.tasks[token].get("stdout_buffer")
-                stderr_buffer = self.tasks[token].get("stderr_buffer")
-                
-                self.tasks[token].update({
-                    "status": "completed",
-                    "stdout": stdout_buffer.get_all() if stdout_buffer else "",
-                    "stderr": (stderr_buffer.get_all() if stderr_buffer else "") + f"\n{error_msg}",
-                    "exit_code": exit_code,
-                    "execution_time": execution_time,
-                    "result_data": result_data or {"success": False, "error": error_msg},
-                })
+            record = self.tasks.get(token)
+        if record is not None:
+            record.stderr_buffer.write(f"\n{error_msg}".encode("utf-8"))
+        self._finish_task(
+            token,
+            exit_code,
+            execution_time,
+            result_data or {"success": False, "error": error_msg},
+        )
+
+    def _finish_task(
+        self,
+        token: str,
+        exit_code: int,
+        execution_time: float,
+        result_data: Dict[str, Any],
+        result: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        标记任务完成并冻结输出缓冲区
+
+        输出保留在缓冲区中按需解码，不复制为字符串；冻结在服务锁外进行。
+
+        Args:
+            token: 任务的token
+            exit_code: 退出码
+            execution_time: 执行时间（秒）
+            result_data: 任务结果
+            result: 执行器返回的结果，提供 PTY 相关字段
+        """
+        with self.lock:
+            record = self.tasks.get(token)
+            if record is None:
+                return
+            record.exit_code = exit_code
+            record.execution_time = execution_time
+            record.result_data = result_data
+            if result is not None:
+                record.pty_used = result["pty_used"]
+                record.pty_fallback = result["pty_fallback"]
+                record.fallback_reason = result.get("fallback_reason", "")
+            record.status = "completed"
+            record.completed_at = time.monotonic()
+            self._completed[token] = record.completed_at
+        record.freeze_buffers()
 
     def query_task_status(
         self,
         token: str,
         stdout_offset: int = 0,
         stderr_offset: int = 0,
+        max_bytes: Optional[int] = None,
+        tail_bytes: Optional[int] = None,
+        tail_lines: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         查询任务执行状态
@@ -732,68 +871,93 @@ class PkgPublisherService:
             token: 任务的token
             stdout_offset: stdout 输出偏移量（默认 0，返回全部）
             stderr_offset: stderr 输出偏移量（默认 0，返回全部）
+            max_bytes: 每个输出流最多返回的字节数（默认不限制）
+            tail_bytes: 尾部模式，每个输出流只返回最后 N 字节，忽略偏移量
+            tail_lines: 尾部模式，每个输出流只返回最后 N 行，忽略偏移量
 
         Returns:
             包含任务状态的字典
         """
+        # 服务锁只用于查找任务和取状态快照
         with self.lock:
-            if token not in self.tasks:
+            record = self.tasks.get(token)
+            if record is None:
                 return {
                     "token": token,
                     "status": "not_found",
                     "message": "Token not found",
                 }
+            state = record.to_dict()
 
-            task_info = self.tasks[token]
-            
-            # 获取缓冲区引用
-            stdout_buffer = task_info.get("stdout_buffer")
-            stderr_buffer = task_info.get("stderr_buffer")
-            
-            # 从缓冲区获取增量输出
-            if stdout_buffer is not None:
-                stdout_result = stdout_buffer.get_output(offset=stdout_offset)
-                stdout_data = stdout_result["data"]
-                stdout_length = stdout_result["length"]
-                stdout_truncated = stdout_result["truncated"]
-            else:
-                stdout_data = task_info.get("stdout", "")[stdout_offset:]
-                stdout_length = len(task_info.get("stdout", ""))
-                stdout_truncated = False
-            
-            if stderr_buffer is not None:
-                stderr_result = stderr_buffer.get_output(offset=stderr_offset)
-                stderr_data = stderr_result["data"]
-                stderr_length = stderr_result["length"]
-                stderr_truncated = stderr_result["truncated"]
-            else:
-                stderr_data = task_info.get("stderr", "")[stderr_offset:]
-                stderr_length = len(task_info.get("stderr", ""))
-                stderr_truncated = False
-
-            response = {
-                "token": task_info["token"],
-                "status": task_info["status"],
-                "task_type": task_info["task_type"],
-                "stdout": stdout_data,
-                "stderr": stderr_data,
-                "stdout_length": stdout_length,
-                "stderr_length": stderr_length,
-                "stdout_truncated": stdout_truncated,
-                "stderr_truncated": stderr_truncated,
-            }
-            
-            if task_info["status"] in ["completed", "pending"]:
-                response.update({
-                    "exit_code": task_info["exit_code"],
-                    "execution_time": task_info["execution_time"],
-                    "result_data": task_info.get("result_data"),
-                })
-            
-            # 添加 PTY 相关信息
-            if "pty_used" in task_info:
-                response["pty_used"] = task_info["pty_used"]
-                response["pty_fallback"] = task_info.get("pty_fallback", False)
-                response["fallback_reason"] = task_info.get("fallback_reason", "")
-            
-            return response
+        # 解码输出时不持有服务锁，不阻塞其他查询和任务状态更新
+        response = {
+            "token": state["token"],
+            "status": state["status"],
+            "task_type": state["task_type"],
+        }
+        for name, offset in (("stdout", stdout_offset), ("stderr", stderr_offset)):
+            response.update(
+                _stream_output(
+                    name,
+                    record,
+                    offset,
+                    max_bytes=max_bytes,
+                    tail_bytes=tail_bytes,
+                    tail_lines=tail_lines,
+                )
+            )
+
+        if state["status"] in ["completed", "pending"]:
+            response.update(
+                {
+                    "exit_code": state["exit_code"],
+                    "execution_time": state["execution_time"],
+                    "result_data": state["result_data"],
+                }
+            )
+
+        # 添加 PTY 相关信息
+        if state["pty_used"] is not None:
+            response["pty_used"] = state["pty_used"]
+            response["pty_fallback"] = state["pty_fallback"]
+            response["fallback_reason"] = state["fallback_reason"]
+
+        return response
+
+
+def _stream_output(
+    name: str,
+    record: TaskRecord,
+    offset: int,
+    max_bytes: Optional[int] = None,
+    tail_bytes: Optional[int] = None,
+    tail_lines: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    读取单个输出流（stdout 或 stderr），返回以流名称为前缀的响应字段
+
+    Args:
+        name: 输出流名称，"stdout" 或 "stderr"
+        record: 任务的执行状态
+        offset: 起始偏移量
+        max_bytes: 最多返回的字节数
+        tail_bytes: 尾部模式，只返回最后 N 字节
+        tail_lines: 尾部模式，只返回最后 N 行
+    """
+    buffer = record.stdout_buffer if name == "stdout" else record.stderr_buffer
+    result = buffer.get_output(
+        offset=offset,
+        max_bytes=max_bytes,
+        tail_bytes=tail_bytes,
+        tail_lines=tail_lines,
+    )
+
+    return {
+        name: result["data"],
+        f"{name}_length": result["length"],
+        f"{name}_truncated": result["truncated"],
+        f"{name}_start_offset": result["start_offset"],
+        f"{name}_offset": result["offset"],
+        f"{name}_next_offset": result["next_offset"],
+        f"{name}_has_more": result["has_more"],
+    }
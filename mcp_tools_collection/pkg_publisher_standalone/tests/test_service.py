@@ -0,0 +1,86 @@
+"""
+PkgPublisherService 的任务保留策略测试
+"""
+
+import os
+import time
+
+import pytest
+
+from pkg_publisher.service import PkgPublisherService
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = PkgPublisherService(
+        spill_to_disk=True, spill_dir=str(tmp_path), reap_interval=0
+    )
+    yield service
+    service.shutdown()
+
+
+def _register(service):
+    return service._register_task(
+        "build",
+        {},
+        service._create_buffer(1024),
+        service._create_buffer(1024),
+    )
+
+
+def _finish(service, token, output=b"built\n"):
+    service.tasks[token].stdout_buffer.write(output)
+    service._finish_task(token, 0, 0.1, {"success": True})
+
+
+def _status(service, token):
+    return service.query_task_status(token)["status"]
+
+
+def test_ttl_evicts_expired_tasks_and_removes_spill_files(service, tmp_path):
+    service.task_ttl = 0.2
+    old, new, running = [_register(service) for _ in range(3)]
+    # 输出超过内存尾部大小后才创建临时文件
+    _finish(service, old, b"x" * 4096)
+    time.sleep(0.3)
+    _finish(service, new, b"x" * 4096)
+    assert len(os.listdir(tmp_path)) == 2
+
+    assert service.enforce_retention() == 1
+    assert _status(service, old) == "not_found"
+    assert _status(service, new) == "completed"
+    assert _status(service, running) == "pending"
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_max_tasks_evicts_in_completion_order(service):
+    tokens = [_register(service) for _ in range(3)]
+    for token in reversed(tokens):
+        _finish(service, token)
+    running = _register(service)
+
+    service.max_tasks = 2
+    assert service.enforce_retention() == 2
+    assert _status(service, tokens[0]) == "completed"
+    assert _status(service, tokens[1]) == "not_found"
+    assert _status(service, tokens[2]) == "not_found"
+    assert _status(service, running) == "pending"
+
+
+def test_running_tasks_are_never_evicted(service):
+    service.max_tasks = 1
+    service.task_ttl = 0.01
+    tokens = [_register(service) for _ in range(3)]
+    time.sleep(0.05)
+
+    assert service.enforce_retention() == 0
+    assert all(_status(service, token) == "pending" for token in tokens)
+
+
+def test_completed_output_is_readable_until_evicted(service):
+    token = _register(service)
+    _finish(service, token, b"line 1\nline 2\n")
+
+    result = service.query_task_status(token, tail_lines=1)
+    assert result["stdout"] == "line 2\n"
+    assert result["result_data"] == {"success": True}
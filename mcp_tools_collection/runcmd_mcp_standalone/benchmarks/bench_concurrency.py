@@ -0,0 +1,235 @@
+"""
+并发查询基准测试 - 测量大量轮询方和运行中命令同时存在时的查询延迟
+
+- 启动 N 个命令，每个先输出若干 MB 再保持运行
+- heavy 轮询线程按固定间隔从随机偏移量读取大段输出（需要解码数 MB 数据），
+  两个版本的解码工作量相同
+- light 轮询线程只查询状态和最后几十字节，记录每次查询的延迟
+- 提交线程按固定间隔提交短命令，记录 run_command 的延迟（登记任务需要全局锁）
+- 报告 light 查询和提交的吞吐量、p50/p99/max 延迟，以及 heavy 查询的吞吐量
+- 结果写入JSON文件，可用 --baseline 与之前的结果对比
+
+用法:
+    python benchmarks/bench_concurrency.py [--commands 50] [--heavy 4] [--light 16] [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from runcmd_mcp.service import RunCmdService  # noqa: E402
+
+# 输出 size 字节后继续运行，保证测量期间命令都处于运行状态
+COMMAND = "head -c {size} /dev/zero | tr '\\0' x; sleep {sleep}"
+
+
+def _percentile(values, ratio: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def _latency_stats(prefix: str, samples, duration: float):
+    return {
+        f"{prefix}_per_second": round(len(samples) / duration, 1),
+        f"{prefix}_p50_ms": round(_percentile(samples, 0.5) * 1000, 3),
+        f"{prefix}_p99_ms": round(_percentile(samples, 0.99) * 1000, 3),
+        f"{prefix}_max_ms": round(max(samples, default=0) * 1000, 3),
+    }
+
+
+def run_case(
+    commands: int,
+    heavy: int,
+    light: int,
+    size_mb: int,
+    duration: float,
+    heavy_interval: float,
+    submit_interval: float,
+):
+    """在 duration 秒内并发查询和提交命令，返回延迟统计"""
+    size = size_mb * 1024 * 1024
+    # 不限制并发数，所有命令同时运行
+    service = RunCmdService(max_concurrent=0)
+    tokens = [
+        service.run_command(
+            COMMAND.format(size=size, sleep=duration + 5),
+            timeout=int(duration) + 60,
+            max_buffer_size=2 * size,
+        )
+        for _ in range(commands)
+    ]
+    # 等待所有命令输出完毕
+    while any(
+        service.query_command_status(token, tail_bytes=1)["stdout_length"] < size
+        for token in tokens
+    ):
+        time.sleep(0.05)
+
+    stop = threading.Event()
+    latencies = [[] for _ in range(light)]
+    heavy_counts = [0] * heavy
+    submit_latencies = []
+
+    def heavy_poller(index: int) -> None:
+        rng = random.Random(index)
+        while not stop.is_set():
+            # 随机偏移量避免命中解码缓存
+            service.query_command_status(
+                rng.choice(tokens), stdout_offset=rng.randrange(size // 2)
+            )
+            heavy_counts[index] += 1
+            stop.wait(heavy_interval)
+
+    def light_poller(index: int) -> None:
+        rng = random.Random(1000 + index)
+        while not stop.is_set():
+            start = time.perf_counter()
+            service.query_command_status(rng.choice(tokens), tail_bytes=64)
+            latencies[index].append(time.perf_counter() - start)
+
+    def submitter() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            service.run_command("true")
+            submit_latencies.append(time.perf_counter() - start)
+            stop.wait(submit_interval)
+
+    threads = [
+        threading.Thread(target=heavy_poller, args=(i,), daemon=True)
+        for i in range(heavy)
+    ] + [
+        threading.Thread(target=light_poller, args=(i,), daemon=True)
+        for i in range(light)
+    ]
+    threads.append(threading.Thread(target=submitter, daemon=True))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    samples = [value for values in latencies for value in values]
+    service.shutdown()
+    result = {
+        "commands": commands,
+        "heavy_pollers": heavy,
+        "light_pollers": light,
+        "output_mb": size_mb,
+        "heavy_queries_per_second": round(sum(heavy_counts) / duration, 1),
+    }
+    result.update(_latency_stats("light_queries", samples, duration))
+    result.update(_latency_stats("submit", submit_latencies, duration))
+    return result
+
+
+def case_id(result) -> str:
+    return "{commands}c/{heavy_pollers}h/{light_pollers}l".format(**result)
+
+
+def print_comparison(results, baseline_path: str) -> None:
+    """打印与基线结果的 light 查询吞吐量和延迟对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_id(r): r for r in json.load(f)["results"]}
+
+    keys = (
+        "light_queries_per_second",
+        "light_queries_p50_ms",
+        "light_queries_p99_ms",
+        "submit_p99_ms",
+        "submit_max_ms",
+    )
+    print(f"\ncompared with {baseline_path}:")
+    print(
+        f"{'case':<14} {'qps':>9} {'p50':>9} {'p99':>9} "
+        f"{'submit p99':>11} {'submit max':>11}"
+    )
+    for result in results:
+        old = baseline.get(case_id(result))
+        if old is None:
+            continue
+        ratios = [result[key] / old.get(key, 0) if old.get(key) else 0 for key in keys]
+        print(
+            f"{case_id(result):<14} {ratios[0]:>8.2f}x {ratios[1]:>8.2f}x "
+            f"{ratios[2]:>8.2f}x {ratios[3]:>10.2f}x {ratios[4]:>10.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runcmd 并发查询基准测试")
+    parser.add_argument(
+        "--commands", type=int, nargs="+", default=[50], help="运行中的命令数"
+    )
+    parser.add_argument("--heavy", type=int, default=4, help="读取大段输出的轮询线程数")
+    parser.add_argument(
+        "--heavy-interval", type=float, default=0.02, help="heavy 查询的间隔（秒）"
+    )
+    parser.add_argument(
+        "--submit-interval", type=float, default=0.01, help="提交短命令的间隔（秒）"
+    )
+    parser.add_argument("--light", type=int, default=16, help="只查询状态的轮询线程数")
+    parser.add_argument("--size", type=int, default=4, help="每个命令的输出大小（MB）")
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="每个用例的测量时间（秒）"
+    )
+    parser.add_argument(
+        "--output", default="bench_concurrency.json", help="结果JSON文件"
+    )
+    parser.add_argument("--baseline", default=None, help="用于对比的旧结果JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'case':<14} {'qps':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9} "
+        f"{'heavy qps':>10} {'submit p99':>11} {'submit max':>11}"
+    )
+    for commands in args.commands:
+        case = run_case(
+            commands,
+            args.heavy,
+            args.light,
+            args.size,
+            args.duration,
+            args.heavy_interval,
+            args.submit_interval,
+        )
+        results.append(case)
+        print(
+            f"{case_id(case):<14} {case['light_queries_per_second']:>9} "
+            f"{case['light_queries_p50_ms']:>9} {case['light_queries_p99_ms']:>9} "
+            f"{case['light_queries_max_ms']:>9} {case['heavy_queries_per_second']:>10} "
+            f"{case['submit_p99_ms']:>11} {case['submit_max_ms']:>11}"
+        )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "command": COMMAND,
+            "output_mb": args.size,
+            "duration": args.duration,
+            "heavy_interval": args.heavy_interval,
+            "submit_interval": args.submit_interval,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+I/O 模式基准测试 - 比较 thread、pump 和 asyncio 三种 I/O 模式在不同并发数下的开销
+
+- 同时提交 N 个持续输出的命令，记录峰值线程数、上下文切换次数、
+  服务进程的 CPU 时间和全部完成的耗时
+- 结果写入JSON文件，可用 --baseline 与之前的结果对比
+
+用法:
+    python benchmarks/bench_io_pump.py [--concurrency 10 50 200] [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from runcmd_mcp.io_pump import (  # noqa: E402
+    IO_MODE_ASYNCIO,
+    IO_MODE_PUMP,
+    IO_MODE_THREAD,
+)
+from runcmd_mcp.service import RunCmdService  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 每个命令输出 20 行，每行间隔 0.05 秒
+COMMAND = "for i in $(seq 1 20); do echo line $i; sleep 0.05; done"
+
+
+def _context_switches() -> int:
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_nvcsw + usage.ru_nivcsw
+
+
+async def _run_commands(service: RunCmdService, concurrency: int):
+    """在事件循环中提交命令并轮询到全部完成，返回状态列表和峰值线程数"""
+    tokens = [
+        await service.run_command_async(COMMAND, timeout=60) for _ in range(concurrency)
+    ]
+    peak_threads = threading.active_count()
+    while True:
+        peak_threads = max(peak_threads, threading.active_count())
+        statuses = [service.query_command_status(token) for token in tokens]
+        if all(status["status"] == "completed" for status in statuses):
+            return statuses, peak_threads
+        await asyncio.sleep(0.02)
+
+
+def run_case(io_mode: str, concurrency: int):
+    """提交 concurrency 个命令并等待全部完成"""
+    # 不限制并发数，所有命令同时运行
+    service = RunCmdService(io_mode=io_mode, max_concurrent=0)
+    switches_start = _context_switches()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+
+    # 与 MCP 服务一样通过事件循环提交，asyncio 模式的命令在此循环中执行
+    statuses, peak_threads = asyncio.run(_run_commands(service, concurrency))
+
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for status in statuses if status["exit_code"] != 0)
+    return {
+        "io_mode": io_mode,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "cpu_seconds": round(time.process_time() - cpu_start, 3),
+        "peak_threads": peak_threads,
+        "context_switches": _context_switches() - switches_start,
+        "failed": failed,
+    }
+
+
+def case_id(result) -> str:
+    return f"{result['io_mode']}/{result['concurrency']}"
+
+
+def print_comparison(results, baseline_path: str) -> None:
+    """打印与基线结果的CPU时间和上下文切换对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_id(r): r for r in json.load(f)["results"]}
+
+    print(f"\ncompared with {baseline_path}:")
+    print(f"{'case':<16} {'cpu':>10} {'switches':>10}")
+    for result in results:
+        old = baseline.get(case_id(result))
+        if old is None:
+            continue
+        cpu_ratio = (
+            result["cpu_seconds"] / old["cpu_seconds"] if old["cpu_seconds"] else 0
+        )
+        switch_ratio = (
+            result["context_switches"] / old["context_switches"]
+            if old["context_switches"]
+            else 0
+        )
+        print(f"{case_id(result):<16} {cpu_ratio:>9.2f}x {switch_ratio:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runcmd I/O 模式基准测试")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[10, 50, 200], help="并发命令数"
+    )
+    parser.add_argument("--output", default="bench_io_pump.json", help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="用于对比的旧结果JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'mode':<7} {'commands':>8} {'seconds':>8} {'cpu':>8} "
+        f"{'threads':>8} {'switches':>9} {'failed':>7}"
+    )
+    for concurrency in args.concurrency:
+        for io_mode in (IO_MODE_THREAD, IO_MODE_PUMP, IO_MODE_ASYNCIO):
+            case = run_case(io_mode, concurrency)
+            results.append(case)
+            print(
+                f"{io_mode:<7} {concurrency:>8} {case['seconds']:>8.3f} "
+                f"{case['cpu_seconds']:>8.3f} {case['peak_threads']:>8} "
+                f"{case['context_switches']:>9} {case['failed']:>7}"
+            )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "command": COMMAND,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+内存基准测试 - 测量已完成任务的常驻内存和执行过程中的峰值内存
+
+- 提交 N 个输出固定字节数的命令，等待全部完成后用 tracemalloc 统计
+  每个已完成任务保留的内存，以及从提交到完成期间的峰值内存
+- 同时记录服务统计（get_stats）报告的 resident_bytes，便于与实际分配对比
+- 结果写入JSON文件，可用 --baseline 与之前的结果对比
+
+用法:
+    python benchmarks/bench_memory.py [--tasks 20] [--sizes 1 8] [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from runcmd_mcp.service import RunCmdService  # noqa: E402
+
+# 输出 size 字节的 ASCII 文本，每行 64 字节
+COMMAND = (
+    "yes 0123456789abcdef0123456789abcdef0123456789abcdef0123456789a | head -c {size}"
+)
+
+
+def run_case(tasks: int, size_mb: int):
+    """提交 tasks 个输出 size_mb MB 的命令，返回每个任务的峰值和常驻内存"""
+    size = size_mb * 1024 * 1024
+    # 缓冲区足够大，保留全部输出
+    service = RunCmdService(max_tasks=0, max_total_bytes=0, reap_interval=0)
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+
+    tokens = [
+        service.run_command(
+            COMMAND.format(size=size), timeout=120, max_buffer_size=2 * size
+        )
+        for _ in range(tasks)
+    ]
+    while any(
+        service.query_command_status(token, tail_bytes=1)["status"] != "completed"
+        for token in tokens
+    ):
+        time.sleep(0.05)
+
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = service.get_stats()
+    lengths = [
+        service.query_command_status(t, tail_bytes=1)["stdout_length"] for t in tokens
+    ]
+    service.shutdown()
+    return {
+        "tasks": tasks,
+        "output_mb": size_mb,
+        "seconds": round(elapsed, 3),
+        "retained_bytes_per_task": (current - baseline) // tasks,
+        "peak_bytes_per_task": (peak - baseline) // tasks,
+        "reported_resident_bytes_per_task": stats["resident_bytes"] // tasks,
+        "output_bytes_per_task": sum(lengths) // tasks,
+    }
+
+
+def case_id(result) -> str:
+    return f"{result['tasks']}x{result['output_mb']}MB"
+
+
+def print_comparison(results, baseline_path: str) -> None:
+    """打印与基线结果的常驻内存和峰值内存对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_id(r): r for r in json.load(f)["results"]}
+
+    print(f"\ncompared with {baseline_path}:")
+    print(f"{'case':<12} {'retained':>10} {'peak':>10}")
+    for result in results:
+        old = baseline.get(case_id(result))
+        if old is None:
+            continue
+        ratios = []
+        for key in ("retained_bytes_per_task", "peak_bytes_per_task"):
+            ratios.append(result[key] / old[key] if old[key] else 0)
+        print(f"{case_id(result):<12} {ratios[0]:>9.2f}x {ratios[1]:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runcmd 已完成任务内存基准测试")
+    parser.add_argument("--tasks", type=int, default=20, help="每个用例的命令数")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 8], help="每个命令的输出大小（MB）"
+    )
+    parser.add_argument("--output", default="bench_memory.json", help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="用于对比的旧结果JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'case':<12} {'seconds':>8} {'output':>10} {'retained':>10} "
+        f"{'peak':>10} {'reported':>10}"
+    )
+    for size_mb in args.sizes:
+        case = run_case(args.tasks, size_mb)
+        results.append(case)
+        print(
+            f"{case_id(case):<12} {case['seconds']:>8.3f} "
+            f"{case['output_bytes_per_task']:>10} {case['retained_bytes_per_task']:>10} "
+            f"{case['peak_bytes_per_task']:>10} {case['reported_resident_bytes_per_task']:>10}"
+        )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "command": COMMAND,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+管道读取基准测试 - 比较 SubprocessExecutor 的 line 和 chunk 两种读取模式
+
+- many_short_lines: 大量短行输出，测量吞吐量和缓冲区写入次数
+- long_lines: 少量长行输出，测量吞吐量
+- progress_bar: 不带换行的进度条输出（\\r 刷新），测量第一次看到输出的延迟
+- chunk 模式分别测试多种读取块大小
+- 结果写入JSON文件，可用 --baseline 与之前的结果对比
+
+用法:
+    python benchmarks/bench_reader.py [--repeat N] [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from runcmd_mcp.executors import (  # noqa: E402
+    DEFAULT_READ_CHUNK_SIZE,
+    READ_MODE_CHUNK,
+    READ_MODE_LINE,
+    SubprocessExecutor,
+)
+from runcmd_mcp.streaming_buffer import StreamingBuffer  # noqa: E402
+
+CHUNK_SIZES = (4 * 1024, 64 * 1024, 256 * 1024)
+
+# 子进程脚本：预先生成一块数据反复写出，保证瓶颈在读取端
+_BLOCK_WRITER = """
+import sys
+line = b"x" * {line_length} + b"\\n"
+block = line * max(1, 65536 // len(line))
+out = sys.stdout.buffer
+for _ in range({total_bytes} // len(block)):
+    out.write(block)
+out.flush()
+"""
+
+_PROGRESS_WRITER = """
+import sys, time
+out = sys.stdout.buffer
+for i in range({steps}):
+    out.write(b"\\rprogress %3d%%" % i)
+    out.flush()
+    time.sleep({interval})
+out.write(b"\\n")
+"""
+
+SCENARIOS = {
+    "many_short_lines": _BLOCK_WRITER.format(
+        line_length=15, total_bytes=64 * 1024 * 1024
+    ),
+    "long_lines": _BLOCK_WRITER.format(line_length=4095, total_bytes=256 * 1024 * 1024),
+    "progress_bar": _PROGRESS_WRITER.format(steps=20, interval=0.05),
+}
+
+
+class CountingBuffer(StreamingBuffer):
+    """记录写入次数和第一次写入时间的缓冲区"""
+
+    def __init__(self):
+        super().__init__(max_size=16 * 1024 * 1024)
+        self.writes = 0
+        self.first_write = None
+
+    def write(self, data: bytes) -> None:
+        if self.first_write is None:
+            self.first_write = time.perf_counter()
+        self.writes += 1
+        super().write(data)
+
+
+def run_once(script_path: str, read_mode: str, chunk_size: int):
+    """运行一次子进程，返回耗时、CPU时间、写入次数和首次输出延迟"""
+    stdout_buffer = CountingBuffer()
+    stderr_buffer = CountingBuffer()
+    executor = SubprocessExecutor(
+        stdout_buffer,
+        stderr_buffer,
+        read_mode=read_mode,
+        read_chunk_size=chunk_size,
+    )
+    command = f'"{sys.executable}" "{script_path}"'
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    result = executor.execute(command, timeout=600)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    if result["exit_code"] != 0:
+        raise RuntimeError(stderr_buffer.get_all())
+
+    first_output = None
+    if stdout_buffer.first_write is not None:
+        first_output = stdout_buffer.first_write - start
+    return {
+        "seconds": elapsed,
+        "cpu_seconds": cpu,
+        "bytes": stdout_buffer.length,
+        "writes": stdout_buffer.writes,
+        "first_output_seconds": first_output,
+    }
+
+
+def run_case(
+    scenario: str, script_path: str, read_mode: str, chunk_size: int, repeat: int
+):
+    """运行单个用例，取多次运行中耗时最短的一次"""
+    best = None
+    for _ in range(repeat):
+        run = run_once(script_path, read_mode, chunk_size)
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    mb = best["bytes"] / (1024 * 1024)
+    return {
+        "scenario": scenario,
+        "read_mode": read_mode,
+        "chunk_size": chunk_size if read_mode == READ_MODE_CHUNK else None,
+        "seconds": round(best["seconds"], 4),
+        "cpu_seconds": round(best["cpu_seconds"], 4),
+        "throughput_mb_s": round(mb / best["seconds"], 2) if best["seconds"] else 0,
+        "bytes": best["bytes"],
+        "buffer_writes": best["writes"],
+        "first_output_ms": (
+            round(best["first_output_seconds"] * 1000, 2)
+            if best["first_output_seconds"] is not None
+            else None
+        ),
+    }
+
+
+def case_id(result) -> str:
+    return "/".join(
+        (result["scenario"], result["read_mode"], str(result["chunk_size"] or "-"))
+    )
+
+
+def print_comparison(results, baseline_path: str) -> None:
+    """打印与基线结果的耗时对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_id(r): r for r in json.load(f)["results"]}
+
+    print(f"\ncompared with {baseline_path}:")
+    print(f"{'case':<36} {'seconds':>10} {'cpu':>10}")
+    for result in results:
+        old = baseline.get(case_id(result))
+        if old is None:
+            continue
+        time_ratio = result["seconds"] / old["seconds"] if old["seconds"] else 0
+        cpu_ratio = (
+            result["cpu_seconds"] / old["cpu_seconds"] if old["cpu_seconds"] else 0
+        )
+        print(f"{case_id(result):<36} {time_ratio:>9.2f}x {cpu_ratio:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runcmd 管道读取基准测试")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_reader.json", help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="用于对比的旧结果JSON文件")
+    args = parser.parse_args()
+
+    cases = [(READ_MODE_LINE, DEFAULT_READ_CHUNK_SIZE)] + [
+        (READ_MODE_CHUNK, size) for size in CHUNK_SIZES
+    ]
+    results = []
+    print(
+        f"{'scenario':<18} {'mode':<6} {'chunk':>7} {'seconds':>8} {'cpu':>8} "
+        f"{'MB/s':>8} {'writes':>9} {'first(ms)':>10}"
+    )
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scenario, script in SCENARIOS.items():
+            # 子进程脚本写入文件执行，避免shell引号转义问题
+            script_path = os.path.join(work_dir, f"{scenario}.py")
+            with open(script_path, "w", encoding="utf-8") as f:
+                f.write(script)
+            for read_mode, chunk_size in cases:
+                case = run_case(
+                    scenario, script_path, read_mode, chunk_size, args.repeat
+                )
+                results.append(case)
+                first = case["first_output_ms"]
+                print(
+                    f"{scenario:<18} {read_mode:<6} {case['chunk_size'] or '-':>7} "
+                    f"{case['seconds']:>8.3f} {case['cpu_seconds']:>8.3f} "
+                    f"{case['throughput_mb_s']:>8.1f} {case['buffer_writes']:>9} "
+                    f"{first if first is not None else '-':>10}"
+                )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
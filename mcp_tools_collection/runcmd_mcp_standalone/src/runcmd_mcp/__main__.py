@@ -1,5 +1,37 @@
+import os
+
 from .server import app, init_service
-from .service import RunCmdService
+from .service import (
+    DEFAULT_MAX_TASKS,
+    DEFAULT_MAX_TOTAL_BYTES,
+    DEFAULT_REAP_INTERVAL,
+    DEFAULT_TASK_TTL,
+    RunCmdService,
+)
+from .executors import (
+    DEFAULT_PTY_COLUMNS,
+    DEFAULT_PTY_ROWS,
+    DEFAULT_READ_CHUNK_SIZE,
+    READ_MODE_CHUNK,
+)
+from .io_pump import DEFAULT_IO_MODE
+from .scheduler import DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_QUEUED
+from .streaming_buffer import DEFAULT_DISK_QUOTA
+
+# 环境变量名称
+ENV_SPILL_DIR = "RUNCMD_SPILL_DIR"
+ENV_SPILL_DISK_QUOTA = "RUNCMD_SPILL_DISK_QUOTA"
+ENV_READ_MODE = "RUNCMD_READ_MODE"
+ENV_READ_CHUNK_SIZE = "RUNCMD_READ_CHUNK_SIZE"
+ENV_IO_MODE = "RUNCMD_IO_MODE"
+ENV_PTY_COLUMNS = "RUNCMD_PTY_COLUMNS"
+ENV_PTY_ROWS = "RUNCMD_PTY_ROWS"
+ENV_MAX_TASKS = "RUNCMD_MAX_TASKS"
+ENV_MAX_TOTAL_BYTES = "RUNCMD_MAX_TOTAL_BYTES"
+ENV_TASK_TTL = "RUNCMD_TASK_TTL"
+ENV_REAP_INTERVAL = "RUNCMD_REAP_INTERVAL"
+ENV_MAX_CONCURRENT = "RUNCMD_MAX_CONCURRENT"
+ENV_MAX_QUEUED = "RUNCMD_MAX_QUEUED"
 
 
 def parse_args():
@@ -11,7 +43,25 @@ def parse_args():
 
 def main():
     # 初始化服务
-    service = RunCmdService()
+    service = RunCmdService(
+        spill_dir=os.environ.get(ENV_SPILL_DIR) or None,
+        disk_quota=int(os.environ.get(ENV_SPILL_DISK_QUOTA, DEFAULT_DISK_QUOTA)),
+        read_mode=os.environ.get(ENV_READ_MODE) or READ_MODE_CHUNK,
+        read_chunk_size=int(
+            os.environ.get(ENV_READ_CHUNK_SIZE, DEFAULT_READ_CHUNK_SIZE)
+        ),
+        io_mode=os.environ.get(ENV_IO_MODE) or DEFAULT_IO_MODE,
+        pty_columns=int(os.environ.get(ENV_PTY_COLUMNS, DEFAULT_PTY_COLUMNS)),
+        pty_rows=int(os.environ.get(ENV_PTY_ROWS, DEFAULT_PTY_ROWS)),
+        max_tasks=int(os.environ.get(ENV_MAX_TASKS, DEFAULT_MAX_TASKS)),
+        max_total_bytes=int(
+            os.environ.get(ENV_MAX_TOTAL_BYTES, DEFAULT_MAX_TOTAL_BYTES)
+        ),
+        task_ttl=float(os.environ.get(ENV_TASK_TTL, DEFAULT_TASK_TTL)),
+        reap_interval=float(os.environ.get(ENV_REAP_INTERVAL, DEFAULT_REAP_INTERVAL)),
+        max_concurrent=int(os.environ.get(ENV_MAX_CONCURRENT, DEFAULT_MAX_CONCURRENT)),
+        max_queued=int(os.environ.get(ENV_MAX_QUEUED, DEFAULT_MAX_QUEUED)),
+    )
     init_service(service)
 
     # 运行服务器
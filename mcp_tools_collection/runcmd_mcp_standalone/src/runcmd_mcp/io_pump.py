@@ -0,0 +1,402 @@
+"""
+I/O 泵模块 - 在单个线程中读取所有运行中命令的输出
+
+线程模式下每个命令占用一个服务线程和两个读取线程，并发 200 个命令就是 600 个线程。
+IoPump 使用 selectors（Linux 上为 epoll）在一个线程中同时监听所有进程的
+stdout/stderr 管道，并负责检测子进程退出和超时，线程数不随并发命令数增长。
+
+- 子进程退出：优先使用 pidfd（Linux 5.3+，Python 3.9+）注册到同一个 selector，
+  不支持时定期调用 poll() 检查
+- 每个命令在新会话中运行，超时时向整个进程组先发送 SIGTERM，2 秒后仍未退出则
+  SIGKILL，shell 启动的子进程也会被终止，不阻塞泵线程
+- 进程退出后最多再等待 1 秒读取管道中剩余的输出（后台子进程可能继续持有管道）
+
+仅支持 POSIX 平台，Windows 上 selectors 不支持管道，服务会回退到线程模式。
+"""
+
+import logging
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .executors import DEFAULT_READ_CHUNK_SIZE
+from .streaming_buffer import StreamingBuffer
+
+logger = logging.getLogger(__name__)
+
+# I/O 模式
+IO_MODE_PUMP = "pump"  # 所有命令共享一个 I/O 泵线程
+IO_MODE_THREAD = "thread"  # 每个命令使用独立的执行线程和读取线程
+IO_MODE_ASYNCIO = "asyncio"  # 在 MCP 服务的事件循环中用 asyncio 子进程执行
+IO_MODES = (IO_MODE_PUMP, IO_MODE_THREAD, IO_MODE_ASYNCIO)
+
+PUMP_SUPPORTED = os.name == "posix"
+DEFAULT_IO_MODE = IO_MODE_PUMP if PUMP_SUPPORTED else IO_MODE_THREAD
+
+# 不支持 pidfd 时检查子进程退出的间隔（秒）
+DEFAULT_POLL_INTERVAL = 0.05
+# 超时后从 SIGTERM 到 SIGKILL 的等待时间（秒）
+TERMINATE_GRACE_PERIOD = 2.0
+# 进程退出后等待管道关闭的最长时间（秒）
+DRAIN_TIMEOUT = 1.0
+
+_STDOUT = "stdout"
+_STDERR = "stderr"
+_EXIT = "exit"
+_WAKE = "wake"
+
+
+class _PumpJob:
+    """
+    I/O 泵中的一个子进程及其输出管道，只在泵线程中访问
+    """
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        buffers: Dict[str, StreamingBuffer],
+        timeout: Optional[float],
+        on_complete: Callable[[Dict[str, Any]], None],
+    ):
+        self.process = process
+        self.buffers = buffers
+        self.pipes: Dict[str, Any] = {
+            _STDOUT: process.stdout,
+            _STDERR: process.stderr,
+        }
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.on_complete = on_complete
+        self.pidfd: Optional[int] = None
+        self.exit_code: Optional[int] = None
+        self.exited_at: Optional[float] = None
+        self.kill_at: Optional[float] = None
+        self.timeout_occurred = False
+
+
+class IoPump:
+    """
+    单线程 I/O 泵
+
+    start_process 在调用线程中启动子进程，之后的输出读取、退出检测和超时处理
+    都在泵线程中完成，结束时在泵线程中调用 on_complete 回调。
+    泵线程在第一次启动进程时创建，没有运行中的进程时阻塞等待，不占用 CPU。
+    """
+
+    def __init__(
+        self,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        """
+        Args:
+            read_chunk_size: 每次从管道读取的最大字节数
+            poll_interval: 不支持 pidfd 时检查子进程退出的间隔（秒）
+
+        Raises:
+            RuntimeError: 当前平台不支持 I/O 泵
+        """
+        if not PUMP_SUPPORTED:
+            raise RuntimeError("IoPump requires a POSIX platform")
+        self._read_chunk_size = read_chunk_size
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._pending: List[_PumpJob] = []
+        self._jobs: List[_PumpJob] = []
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def active_count(self) -> int:
+        """运行中（含等待泵线程接收）的进程数"""
+        with self._lock:
+            return len(self._jobs) + len(self._pending)
+
+    def start_process(
+        self,
+        command: str,
+        stdout_buffer: StreamingBuffer,
+        stderr_buffer: StreamingBuffer,
+        on_complete: Callable[[Dict[str, Any]], None],
+        working_directory: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        启动命令并交给泵线程处理输出
+
+        Args:
+            command: 要执行的命令（通过 shell 执行）
+            stdout_buffer: stdout 输出缓冲区
+            stderr_buffer: stderr 输出缓冲区
+            on_complete: 命令结束且输出读取完毕后调用，参数为
+                {"exit_code": int, "timeout_occurred": bool}
+            working_directory: 工作目录
+            env: 环境变量
+            timeout: 超时时间（秒）
+
+        Raises:
+            OSError: 进程启动失败
+            RuntimeError: I/O 泵已停止
+        """
+        if self._stopping:
+            raise RuntimeError("IoPump has been shut down")
+        # 在新会话中运行，超时时可以终止 shell 启动的整个进程组
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=working_directory,
+            env=env,
+            bufsize=0,
+            start_new_session=True,
+        )
+        os.set_blocking(process.stdout.fileno(), False)
+        os.set_blocking(process.stderr.fileno(), False)
+        job = _PumpJob(
+            process,
+            {_STDOUT: stdout_buffer, _STDERR: stderr_buffer},
+            timeout,
+            on_complete,
+        )
+
+        with self._lock:
+            stopping = self._stopping
+            if not stopping:
+                self._ensure_started()
+                self._pending.append(job)
+                # 在锁内唤醒，泵线程停止时在锁内关闭唤醒管道
+                self._wake()
+        if stopping:
+            _kill_group(process, signal.SIGKILL)
+            process.wait()
+            process.stdout.close()
+            process.stderr.close()
+            raise RuntimeError("IoPump has been shut down")
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        停止泵线程
+
+        运行中的命令的进程组收到 SIGKILL，之后以 exit_code -1 调用 on_complete，
+        已读取的输出保留在缓冲区中。停止后 start_process 抛出 RuntimeError。
+
+        Args:
+            timeout: 等待泵线程退出的最长时间（秒），None 表示一直等待
+        """
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            thread = self._thread
+            if thread is None:
+                return
+            self._wake()
+        thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        """创建 selector 和泵线程，调用方需持有锁"""
+        if self._thread is not None:
+            return
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, (_WAKE, None))
+        self._thread = threading.Thread(
+            target=self._run, name="runcmd-io-pump", daemon=True
+        )
+        self._thread.start()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            # 唤醒管道已满，泵线程必然会被唤醒
+            pass
+
+    def _run(self) -> None:
+        """泵线程主循环"""
+        chunk = bytearray(self._read_chunk_size)
+        view = memoryview(chunk)
+        while not self._stopping:
+            try:
+                events = self._selector.select(self._next_timeout())
+                for key, _mask in events:
+                    kind, job = key.data
+                    if kind == _WAKE:
+                        self._accept_pending()
+                    elif kind == _EXIT:
+                        self._reap(job)
+                    else:
+                        self._read(job, kind, view)
+                self._check_jobs()
+            except Exception as e:
+                logger.error(f"I/O pump error: {e}")
+        self._stop_jobs()
+
+    def _stop_jobs(self) -> None:
+        """泵线程退出前终止所有运行中的命令并释放 selector"""
+        self._accept_pending()
+        for job in list(self._jobs):
+            if job.exit_code is None:
+                _kill_group(job.process, signal.SIGKILL)
+                job.process.wait()
+                job.exit_code = -1
+                job.exited_at = time.monotonic()
+            if job.pidfd is not None:
+                self._selector.unregister(job.pidfd)
+                os.close(job.pidfd)
+                job.pidfd = None
+            self._finish(job)
+        with self._lock:
+            self._selector.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+
+    def _accept_pending(self) -> None:
+        """注册新启动的进程"""
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._jobs.extend(pending)
+
+        for job in pending:
+            for name, pipe in job.pipes.items():
+                self._selector.register(pipe, selectors.EVENT_READ, (name, job))
+            job.pidfd = _open_pidfd(job.process.pid)
+            if job.pidfd is not None:
+                self._selector.register(job.pidfd, selectors.EVENT_READ, (_EXIT, job))
+
+    def _read(self, job: _PumpJob, name: str, view: memoryview) -> None:
+        """读取一次管道输出，读到 EOF 时注销管道"""
+        pipe = job.pipes[name]
+        try:
+            count = os.readv(pipe.fileno(), [view])
+        except BlockingIOError:
+            return
+        except OSError:
+            count = 0
+        if count:
+            job.buffers[name].write(view[:count])
+        else:
+            self._close_pipe(job, name)
+
+    def _close_pipe(self, job: _PumpJob, name: str) -> None:
+        pipe = job.pipes.pop(name)
+        try:
+            self._selector.unregister(pipe)
+        except (KeyError, ValueError):
+            pass
+        try:
+            pipe.close()
+        except Exception:
+            pass
+
+    def _reap(self, job: _PumpJob) -> None:
+        """回收已退出的子进程"""
+        exit_code = job.process.poll()
+        if exit_code is None:
+            return
+        job.exit_code = exit_code
+        job.exited_at = time.monotonic()
+        job.kill_at = None
+        if job.timeout_occurred:
+            # shell 已在 SIGTERM 后退出，终止进程组中剩余的子进程，使管道关闭
+            _kill_group(job.process, signal.SIGKILL)
+        if job.pidfd is not None:
+            self._selector.unregister(job.pidfd)
+            os.close(job.pidfd)
+            job.pidfd = None
+
+    def _check_jobs(self) -> None:
+        """处理超时、轮询子进程退出，并结束输出已读完的任务"""
+        now = time.monotonic()
+        for job in list(self._jobs):
+            if job.exit_code is None:
+                if job.pidfd is None:
+                    self._reap(job)
+                    if job.exit_code is not None:
+                        now = time.monotonic()
+            if job.exit_code is None:
+                if job.deadline is not None and now >= job.deadline:
+                    if not job.timeout_occurred:
+                        job.timeout_occurred = True
+                        job.kill_at = now + TERMINATE_GRACE_PERIOD
+                        _kill_group(job.process, signal.SIGTERM)
+                    elif job.kill_at is not None and now >= job.kill_at:
+                        job.kill_at = None
+                        _kill_group(job.process, signal.SIGKILL)
+                continue
+
+            if not job.pipes or now >= job.exited_at + DRAIN_TIMEOUT:
+                self._finish(job)
+
+    def _finish(self, job: _PumpJob) -> None:
+        for name in list(job.pipes):
+            self._close_pipe(job, name)
+        with self._lock:
+            self._jobs.remove(job)
+        result = {
+            "exit_code": -1 if job.timeout_occurred else job.exit_code,
+            "timeout_occurred": job.timeout_occurred,
+        }
+        try:
+            job.on_complete(result)
+        except Exception as e:
+            logger.error(f"I/O pump completion callback error: {e}")
+
+    def _next_timeout(self) -> Optional[float]:
+        """计算 select 的超时时间，没有需要定时处理的任务时无限等待"""
+        now = time.monotonic()
+        timeout: Optional[float] = None
+
+        def earliest(when: float) -> None:
+            nonlocal timeout
+            remaining = max(0.0, when - now)
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+
+        for job in self._jobs:
+            if job.exit_code is not None:
+                earliest(job.exited_at + DRAIN_TIMEOUT)
+                continue
+            if job.pidfd is None:
+                earliest(now + self._poll_interval)
+            if job.kill_at is not None:
+                earliest(job.kill_at)
+            elif job.deadline is not None and not job.timeout_occurred:
+                earliest(job.deadline)
+        return timeout
+
+
+def _open_pidfd(pid: int) -> Optional[int]:
+    """打开子进程的 pidfd，不支持时返回 None"""
+    pidfd_open = getattr(os, "pidfd_open", None)
+    if pidfd_open is None:
+        return None
+    try:
+        return pidfd_open(pid)
+    except OSError:
+        return None
+
+
+def _kill_group(process: subprocess.Popen, sig: int) -> None:
+    """向子进程所在的进程组（会话）发送信号"""
+    try:
+        os.killpg(process.pid, sig)
+    except OSError:
+        # 进程组中的进程已经全部退出
+        pass
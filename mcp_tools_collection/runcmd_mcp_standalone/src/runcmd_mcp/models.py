@@ -0,0 +1,130 @@
+"""
+数据模型定义 - runcmd-mcp
+
+每个命令的状态保存在一个 TaskRecord 中。TaskRecord 使用 __slots__，
+不为每个实例创建 __dict__，字段访问也比字典查找更快。
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .streaming_buffer import StreamingBuffer
+
+# to_dict 返回的状态字段，不包含输出缓冲区和锁
+SNAPSHOT_FIELDS = (
+    "token",
+    "command",
+    "status",
+    "timeout",
+    "working_directory",
+    "use_pty",
+    "max_buffer_size",
+    "spill_to_disk",
+    "exit_code",
+    "execution_time",
+    "timeout_occurred",
+    "pty_used",
+    "pty_fallback",
+    "fallback_reason",
+)
+
+
+class TaskRecord:
+    """
+    命令的执行状态
+
+    状态字段（status、exit_code 等）由 lock 保护；token、command 等提交参数和
+    输出缓冲区在创建后不再改变，可以不加锁读取。
+    """
+
+    __slots__ = SNAPSHOT_FIELDS + (
+        "lock",
+        "start_time",
+        "stdout_buffer",
+        "stderr_buffer",
+        "last_access",
+        "completed_at",
+    )
+
+    def __init__(
+        self,
+        token: str,
+        command: str,
+        stdout_buffer: StreamingBuffer,
+        stderr_buffer: StreamingBuffer,
+        timeout: int = 30,
+        working_directory: Optional[str] = None,
+        use_pty: bool = False,
+        max_buffer_size: int = 0,
+        spill_to_disk: bool = False,
+    ):
+        """
+        Args:
+            token: 命令的 token
+            command: 要执行的命令
+            stdout_buffer: stdout 输出缓冲区
+            stderr_buffer: stderr 输出缓冲区
+            timeout: 超时时间（秒）
+            working_directory: 工作目录
+            use_pty: 是否请求 PTY 模式
+            max_buffer_size: 最大输出缓冲区大小
+            spill_to_disk: 是否将输出写入临时文件
+        """
+        # 保护本任务的状态字段
+        self.lock = threading.Lock()
+        self.token = token
+        self.command = command
+        self.status = "pending"
+        self.start_time = datetime.now()
+        self.timeout = timeout
+        self.working_directory = working_directory
+        self.use_pty = use_pty
+        self.max_buffer_size = max_buffer_size
+        self.spill_to_disk = spill_to_disk
+        self.stdout_buffer = stdout_buffer
+        self.stderr_buffer = stderr_buffer
+        self.exit_code: Optional[int] = None
+        self.execution_time: Optional[float] = None
+        self.timeout_occurred = False
+        self.pty_used = False
+        self.pty_fallback = False
+        self.fallback_reason = ""
+        # 保留策略使用的单调时钟时间
+        self.last_access = time.monotonic()
+        self.completed_at: Optional[float] = None
+
+    @property
+    def resident_bytes(self) -> int:
+        """输出占用的内存（字节）"""
+        return self.stdout_buffer.memory_bytes + self.stderr_buffer.memory_bytes
+
+    @property
+    def disk_bytes(self) -> int:
+        """落盘模式临时文件占用的磁盘空间（字节）"""
+        return self.stdout_buffer.disk_bytes + self.stderr_buffer.disk_bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        状态字段的快照，不包含输出，调用方需持有 lock 以得到一致的结果
+
+        Returns:
+            SNAPSHOT_FIELDS 中各字段的值，以及 ISO 格式的 start_time
+        """
+        snapshot = {name: getattr(self, name) for name in SNAPSHOT_FIELDS}
+        snapshot["start_time"] = self.start_time.isoformat()
+        return snapshot
+
+    def freeze_buffers(self) -> None:
+        """冻结输出缓冲区，同时唤醒长轮询的等待方"""
+        self.stdout_buffer.freeze()
+        self.stderr_buffer.freeze()
+
+    def close_buffers(self) -> None:
+        """关闭输出缓冲区，释放内存并删除临时文件"""
+        self.stdout_buffer.close()
+        self.stderr_buffer.close()
+
+    def __repr__(self) -> str:
+        return f"TaskRecord(token={self.token!r}, status={self.status!r})"
@@ -0,0 +1,204 @@
+"""
+调度器模块 - 限制同时运行的命令数，其余命令在队列中等待
+
+提交的命令超过并发上限时进入优先级队列，优先级高的先启动，同优先级按提交顺序（FIFO）。
+命令结束时释放运行槽位，队列中的下一个命令交给启动线程启动。队列已满时拒绝提交（背压）。
+"""
+
+import heapq
+import itertools
+import logging
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认最多同时运行的命令数
+DEFAULT_MAX_CONCURRENT = 32
+# 默认最多排队的命令数
+DEFAULT_MAX_QUEUED = 1000
+
+
+class QueueFullError(RuntimeError):
+    """排队的命令数已达上限，拒绝提交"""
+
+
+class CommandScheduler:
+    """
+    命令调度器
+
+    submit 提交的启动函数在有空闲槽位时立即在调用线程中执行，否则进入队列；
+    finish 释放槽位后，队列中的下一个命令交给专用的启动线程启动。finish 通常在
+    I/O 泵线程或命令的执行线程中调用，启动新进程（fork/exec）不会阻塞这些线程。
+    启动函数在调度器的锁外执行，可以再次调用 finish（例如启动失败时）。
+
+    命令获得运行槽位时（启动之前）调用 on_admit(token)，调用方可以在此时
+    将命令标记为运行中，避免已出队但尚未启动的命令没有状态可查。
+    启动函数抛出异常时调用 on_start_failed(token, error)，调用方可以在此时
+    记录失败结果，之后调度器释放该命令的槽位。
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        on_admit: Optional[Callable[[str], None]] = None,
+        on_start_failed: Optional[Callable[[str, Exception], None]] = None,
+    ):
+        """
+        Args:
+            max_concurrent: 最多同时运行的命令数，0 表示不限制
+            max_queued: 最多排队的命令数，0 表示不限制
+            on_admit: 命令获得运行槽位时的回调，在调度器的锁外调用
+            on_start_failed: 启动函数抛出异常时的回调，在调度器的锁外调用
+
+        Raises:
+            ValueError: 参数为负数
+        """
+        if max_concurrent < 0 or max_queued < 0:
+            raise ValueError("max_concurrent and max_queued must not be negative")
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+        # (-优先级, 提交序号, token)，堆顶为下一个启动的命令
+        self._queue: List[Tuple[int, int, str]] = []
+        self._starters: Dict[str, Callable[[], None]] = {}
+        self._sequence = itertools.count()
+        self._on_admit = on_admit
+        self._on_start_failed = on_start_failed
+        # 出队的命令交给启动线程，第一次出队时创建
+        self._launch_queue: (
+            "queue.SimpleQueue[Optional[Tuple[str, Callable[[], None]]]]"
+        ) = queue.SimpleQueue()
+        self._launcher: Optional[threading.Thread] = None
+
+    @property
+    def running_count(self) -> int:
+        """正在运行的命令数"""
+        with self._lock:
+            return len(self._running)
+
+    @property
+    def queued_count(self) -> int:
+        """排队中的命令数"""
+        with self._lock:
+            return len(self._queue)
+
+    def submit(self, token: str, start: Callable[[], None], priority: int = 0) -> bool:
+        """
+        提交命令
+
+        Args:
+            token: 命令的 token
+            start: 启动命令的函数，命令结束时必须调用 finish(token)
+            priority: 优先级，数值越大越先启动，默认 0
+
+        Returns:
+            立即启动时返回 True，进入队列时返回 False
+
+        Raises:
+            QueueFullError: 没有空闲槽位且队列已满
+        """
+        with self._lock:
+            if not self.max_concurrent or len(self._running) < self.max_concurrent:
+                self._running.add(token)
+                queued = False
+            elif self.max_queued and len(self._queue) >= self.max_queued:
+                raise QueueFullError(
+                    f"Command queue is full ({len(self._queue)} queued, "
+                    f"{len(self._running)} running)"
+                )
+            else:
+                heapq.heappush(self._queue, (-priority, next(self._sequence), token))
+                self._starters[token] = start
+                queued = True
+
+        if queued:
+            return False
+        self._admit(token)
+        self._start(token, start)
+        return True
+
+    def finish(self, token: str) -> None:
+        """
+        命令结束，释放槽位并将队列中的命令交给启动线程
+
+        重复调用或对排队中的命令调用时，排队的命令被移出队列。
+        """
+        with self._lock:
+            if token in self._starters:
+                del self._starters[token]
+                self._queue = [entry for entry in self._queue if entry[2] != token]
+                heapq.heapify(self._queue)
+                return
+            if token not in self._running:
+                return
+            self._running.discard(token)
+            admitted = []
+            while self._queue and (
+                not self.max_concurrent or len(self._running) < self.max_concurrent
+            ):
+                _priority, _seq, next_token = heapq.heappop(self._queue)
+                self._running.add(next_token)
+                admitted.append((next_token, self._starters.pop(next_token)))
+            if admitted and self._launcher is None:
+                self._launcher = threading.Thread(
+                    target=self._launch_loop, name="runcmd-launcher", daemon=True
+                )
+                self._launcher.start()
+
+        for next_token, start in admitted:
+            self._admit(next_token)
+            self._launch_queue.put((next_token, start))
+
+    def position(self, token: str) -> Optional[int]:
+        """
+        命令在队列中的位置
+
+        Returns:
+            从 1 开始的位置（1 表示下一个启动），不在队列中时返回 None
+        """
+        with self._lock:
+            if token not in self._starters:
+                return None
+            key = next(entry for entry in self._queue if entry[2] == token)
+            return 1 + sum(1 for entry in self._queue if entry < key)
+
+    def shutdown(self) -> None:
+        """停止启动线程，已交给启动线程的命令仍会启动"""
+        with self._lock:
+            launcher, self._launcher = self._launcher, None
+        if launcher is not None:
+            self._launch_queue.put(None)
+
+    def _launch_loop(self) -> None:
+        while True:
+            item = self._launch_queue.get()
+            if item is None:
+                return
+            self._start(*item)
+
+    def _admit(self, token: str) -> None:
+        if self._on_admit is None:
+            return
+        try:
+            self._on_admit(token)
+        except Exception as e:
+            logger.error(f"Admission callback failed for command {token}: {e}")
+
+    def _start(self, token: str, start: Callable[[], None]) -> None:
+        try:
+            start()
+        except Exception as e:
+            logger.error(f"Failed to start command {token}: {e}")
+            if self._on_start_failed is not None:
+                try:
+                    self._on_start_failed(token, e)
+                except Exception as callback_error:
+                    logger.error(
+                        f"Start failure callback failed for command {token}: "
+                        f"{callback_error}"
+                    )
+            self.finish(token)
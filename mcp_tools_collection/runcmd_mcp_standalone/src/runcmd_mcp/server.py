@@ -51,6 +51,24 @@ MaxBufferSizeInt = Annotated[
     ),
 ]
 
+SpillToDiskBool = Annotated[
+    bool,
+    Field(
+        description="是否将输出写入临时文件。启用后保留完整输出（受服务端磁盘配额限制），内存中只保留最新的一小部分。默认 False",
+        default=False,
+    ),
+]
+
+PriorityInt = Annotated[
+    int,
+    Field(
+        description="排队优先级 (-100-100)。同时运行的命令数达到上限时，优先级高的命令先启动，同优先级按提交顺序。默认 0",
+        ge=-100,
+        le=100,
+        default=0,
+    ),
+]
+
 StdoutOffsetInt = Annotated[
     int,
     Field(
@@ -69,6 +87,52 @@ StderrOffsetInt = Annotated[
     ),
 ]
 
+MaxBytesInt = Annotated[
+    Optional[int],
+    Field(
+        description="每个输出流最多返回的字节数，用于分页读取大量输出。未返回的部分可使用响应中的 stdout_next_offset/stderr_next_offset 继续查询。默认不限制",
+        ge=1,
+        default=None,
+    ),
+]
+
+TailBytesInt = Annotated[
+    Optional[int],
+    Field(
+        description="尾部模式：每个输出流只返回最后 N 字节，忽略偏移量参数。默认不启用",
+        ge=1,
+        default=None,
+    ),
+]
+
+TailLinesInt = Annotated[
+    Optional[int],
+    Field(
+        description="尾部模式：每个输出流只返回最后 N 行，忽略偏移量参数。与 tail_bytes 或 max_bytes 同时指定时取较短者。默认不启用",
+        ge=1,
+        default=None,
+    ),
+]
+
+WaitMsInt = Annotated[
+    Optional[int],
+    Field(
+        description="长轮询：命令未完成时最多等待的毫秒数，直到偏移量之后出现新输出或命令结束再返回，可代替频繁轮询。默认不等待，最大 60000",
+        ge=0,
+        le=60000,
+        default=None,
+    ),
+]
+
+MinNewBytesInt = Annotated[
+    int,
+    Field(
+        description="长轮询时需要等到的新输出字节数（stdout 和 stderr 合计），默认 1",
+        ge=1,
+        default=1,
+    ),
+]
+
 # FastMCP app
 app = FastMCP("runcmd-mcp")
 
@@ -100,7 +164,9 @@ def _svc() -> RunCmdService:
         "支持实时输出流功能：\n"
         "- 命令执行过程中可随时查询已产生的输出\n"
         "- 支持 PTY 模式，正确捕获进度条等终端交互程序的输出\n"
-        "- 支持增量查询，只获取新增的输出内容"
+        "- 支持增量查询，只获取新增的输出内容\n\n"
+        "同时运行的命令数达到服务端上限时，命令以 pending 状态排队，可通过 priority 调整启动顺序；"
+        "队列已满时拒绝提交并返回 error"
     ),
     annotations={
         "title": "异步命令执行器",
@@ -110,12 +176,14 @@ def _svc() -> RunCmdService:
         "openWorldHint": True,
     },
 )
-def run_command(
+async def run_command(
     command: CommandStr,
     timeout: TimeoutInt = 30,
     working_directory: WorkingDirectoryStr = None,
     use_pty: UsePtyBool = False,
     max_buffer_size: MaxBufferSizeInt = 10485760,
+    spill_to_disk: SpillToDiskBool = False,
+    priority: PriorityInt = 0,
 ) -> Dict[str, Any]:
     """
     异步执行系统命令
@@ -126,17 +194,21 @@ def run_command(
         working_directory: 工作目录（可选，默认为当前目录）
         use_pty: 是否使用 PTY 模式（默认 False）
         max_buffer_size: 最大输出缓冲区大小（默认 10MB）
+        spill_to_disk: 是否将输出写入临时文件（默认 False）
+        priority: 排队优先级，数值越大越先启动（默认 0）
 
     Returns:
         包含token和状态信息的字典
     """
     try:
-        token = _svc().run_command(
+        token = await _svc().run_command_async(
             command,
             timeout,
             working_directory,
             use_pty=use_pty,
             max_buffer_size=max_buffer_size,
+            spill_to_disk=spill_to_disk,
+            priority=priority,
         )
         return {"token": token, "status": "pending", "message": "submitted"}
     except Exception as e:
@@ -149,8 +221,15 @@ def run_command(
         "查询命令执行状态和结果。返回命令的当前状态、退出码、输出等信息。\n\n"
         "支持增量输出查询：\n"
         "- 使用 stdout_offset/stderr_offset 参数只获取新增的输出\n"
-        "- 响应中包含 stdout_length/stderr_length 表示当前总长度，可作为下次查询的偏移量\n"
-        "- 响应中包含 stdout_truncated/stderr_truncated 表示输出是否因超过缓冲区大小而被截断"
+        "- 响应中包含 stdout_length/stderr_length 表示累计输出字节数，可作为下次查询的偏移量\n"
+        "- 偏移量为绝对偏移量，旧数据被截断后仍然有效\n"
+        "- 响应中包含 stdout_truncated/stderr_truncated 表示输出是否因超过缓冲区大小而被截断，"
+        "stdout_start_offset/stderr_start_offset 表示最早保留数据的偏移量\n"
+        "- 使用 max_bytes 限制每次返回的数据量，按 stdout_next_offset/stderr_next_offset 分页读取，"
+        "stdout_has_more/stderr_has_more 表示是否还有未读取的输出\n"
+        "- 使用 tail_bytes/tail_lines 只查看最后 N 字节或 N 行\n"
+        "- status 为 pending 时表示命令在排队，queue_position 为排队位置\n"
+        "- 使用 wait_ms 长轮询：命令未完成时等待新输出（至少 min_new_bytes 字节）或命令结束后再返回"
     ),
     annotations={
         "title": "命令状态查询器",
@@ -160,10 +239,15 @@ def run_command(
         "openWorldHint": False,
     },
 )
-def query_command_status(
+async def query_command_status(
     token: str,
     stdout_offset: StdoutOffsetInt = 0,
     stderr_offset: StderrOffsetInt = 0,
+    max_bytes: MaxBytesInt = None,
+    tail_bytes: TailBytesInt = None,
+    tail_lines: TailLinesInt = None,
+    wait_ms: WaitMsInt = None,
+    min_new_bytes: MinNewBytesInt = 1,
 ) -> Dict[str, Any]:
     """
     查询命令执行状态和结果
@@ -172,27 +256,75 @@ def query_command_status(
         token: 任务 token (GUID 字符串)
         stdout_offset: stdout 输出偏移量（默认 0，返回全部）
         stderr_offset: stderr 输出偏移量（默认 0，返回全部）
+        max_bytes: 每个输出流最多返回的字节数（默认不限制）
+        tail_bytes: 尾部模式，只返回最后 N 字节
+        tail_lines: 尾部模式，只返回最后 N 行
+        wait_ms: 长轮询最多等待的毫秒数（默认不等待）
+        min_new_bytes: 长轮询需要等到的新输出字节数（默认 1）
 
     Returns:
         包含命令状态和结果的字典：
         - token: 命令 token
-        - status: 状态 (pending/running/completed/not_found)
+        - status: 状态 (pending 排队中/running/completed/not_found)
+        - queue_position: 排队位置，1 表示下一个启动（仅 pending 时）
         - exit_code: 退出码（完成时）
         - stdout: stdout 输出（从偏移量开始）
         - stderr: stderr 输出（从偏移量开始）
-        - stdout_length: stdout 总长度（可作为下次查询的偏移量）
-        - stderr_length: stderr 总长度（可作为下次查询的偏移量）
+        - stdout_length: stdout 累计字节数（可作为下次查询的偏移量）
+        - stderr_length: stderr 累计字节数（可作为下次查询的偏移量）
         - stdout_truncated: stdout 是否被截断
         - stderr_truncated: stderr 是否被截断
+        - stdout_start_offset: stdout 最早保留数据的绝对偏移量
+        - stderr_start_offset: stderr 最早保留数据的绝对偏移量
+        - stdout_next_offset: 下次查询 stdout 使用的偏移量
+        - stderr_next_offset: 下次查询 stderr 使用的偏移量
+        - stdout_has_more: stdout 是否还有未返回的输出
+        - stderr_has_more: stderr 是否还有未返回的输出
         - execution_time: 执行时间（完成时）
         - timeout_occurred: 是否超时
     """
     try:
-        result = _svc().query_command_status(
+        result = await _svc().query_command_status_async(
             token,
             stdout_offset=stdout_offset,
             stderr_offset=stderr_offset,
+            max_bytes=max_bytes,
+            tail_bytes=tail_bytes,
+            tail_lines=tail_lines,
+            wait_ms=wait_ms,
+            min_new_bytes=min_new_bytes,
         )
         return result
     except Exception as e:
         return {"error": str(e)}
+
+
+@app.tool(
+    name="get_service_stats",
+    description=(
+        "查询服务的任务数和内存占用统计。\n\n"
+        "- 返回任务总数、排队中、运行中和已完成的任务数、所有任务输出占用的内存和磁盘空间、累计被清理的任务数\n"
+        "- tasks 列出每个任务占用的内存（resident_bytes）和磁盘空间，按最近最少访问的顺序排列，"
+        "排在前面的已完成任务会先被清理\n"
+        "- limits 为当前的保留策略（最大任务数、最大内存占用、任务完成后的保留时间）"
+        "和调度限制（最大并发数、最大排队数）"
+    ),
+    annotations={
+        "title": "服务统计",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False,
+    },
+)
+async def get_service_stats() -> Dict[str, Any]:
+    """
+    查询任务数和内存占用统计
+
+    Returns:
+        统计信息字典，见 RunCmdService.get_stats
+    """
+    try:
+        return await _svc().get_stats_async()
+    except Exception as e:
+        return {"error": str(e)}
@@ -5,19 +5,56 @@ runcmd服务模块 - 异步执行系统命令服务
 - 流式输出捕获
 - PTY 模式支持
 - 增量输出查询
+- 单线程 I/O 泵（POSIX），线程数不随并发命令数增长
+- 长轮询查询，等待新输出或命令结束后再返回
+- 已完成任务的保留策略（数量、内存、TTL），由后台线程按 LRU 清理
+- 每个任务有独立的锁，全局锁只保护任务索引，查询输出时不持有任何服务锁
+- 限制同时运行的命令数，其余命令按优先级排队，队列满时拒绝提交
 """
 
+import asyncio
+import functools
 import subprocess
 import threading
 import uuid
 import time
 import os
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 
-from .streaming_buffer import StreamingBuffer
-from .executors import execute_with_pty_fallback
+from .models import TaskRecord
+from .streaming_buffer import (
+    DEFAULT_DISK_QUOTA,
+    DEFAULT_SPILL_MEMORY_SIZE,
+    SpillingStreamingBuffer,
+    StreamingBuffer,
+    wait_for_output,
+)
+from .executors import (
+    DEFAULT_PTY_COLUMNS,
+    DEFAULT_PTY_ROWS,
+    DEFAULT_READ_CHUNK_SIZE,
+    READ_MODE_CHUNK,
+    AsyncSubprocessExecutor,
+    execute_with_pty_fallback,
+)
+from .io_pump import (
+    DEFAULT_IO_MODE,
+    IO_MODE_ASYNCIO,
+    IO_MODE_PUMP,
+    IO_MODES,
+    PUMP_SUPPORTED,
+    IoPump,
+)
+from .scheduler import (
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_QUEUED,
+    CommandScheduler,
+    QueueFullError,
+)
 
 # 环境变量名称
 ENV_PYTHON_PATH = "RUNCMD_PYTHON_PATH"
@@ -25,6 +62,19 @@ ENV_PYTHON_PATH = "RUNCMD_PYTHON_PATH"
 # 默认最大缓冲区大小：10MB
 DEFAULT_MAX_BUFFER_SIZE = 10 * 1024 * 1024
 
+# 长轮询最长等待时间（毫秒）
+MAX_WAIT_MS = 60 * 1000
+# 异步长轮询同时等待的最大请求数，超出的请求排队
+MAX_CONCURRENT_WAITS = 32
+
+# 任务保留策略默认值，0 表示不限制
+DEFAULT_MAX_TASKS = 1000
+DEFAULT_MAX_TOTAL_BYTES = 512 * 1024 * 1024
+# 任务完成后保留的时间（秒）
+DEFAULT_TASK_TTL = 3600
+# 后台清理线程的运行间隔（秒），0 表示不启动清理线程
+DEFAULT_REAP_INTERVAL = 30
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,11 +86,122 @@ class RunCmdService:
     - 流式输出捕获到 StreamingBuffer
     - PTY 模式执行（可选）
     - 增量输出查询（通过偏移量）
+    - 输出落盘模式（可选），保留完整输出而不占用内存
+    - 任务保留策略：超过数量或内存上限、完成后超过 TTL 的任务按最近最少访问的顺序清理，
+      运行中的任务不会被清理
+    - 调度：同时运行的命令数超过 max_concurrent 时，新命令以 pending 状态排队，
+      优先级高的先启动，同优先级按提交顺序；排队数超过 max_queued 时拒绝提交
+
+    锁的使用：self.lock 只保护 commands 索引（查找、插入、调整访问顺序、清理），
+    每个任务的状态字段由 TaskRecord.lock 保护，输出缓冲区有各自的锁。
+    需要同时持有时总是先取 self.lock 再取任务锁，解码输出时不持有这两个锁。
     """
 
-    def __init__(self):
-        self.commands: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        disk_quota: int = DEFAULT_DISK_QUOTA,
+        read_mode: str = READ_MODE_CHUNK,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        io_mode: str = DEFAULT_IO_MODE,
+        pty_columns: int = DEFAULT_PTY_COLUMNS,
+        pty_rows: int = DEFAULT_PTY_ROWS,
+        max_tasks: int = DEFAULT_MAX_TASKS,
+        max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+        task_ttl: float = DEFAULT_TASK_TTL,
+        reap_interval: float = DEFAULT_REAP_INTERVAL,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        """
+        Args:
+            spill_dir: 落盘模式临时文件所在目录，默认为系统临时目录
+            disk_quota: 落盘模式下每个输出流的磁盘配额（字节），默认 1GB
+            read_mode: 线程模式下的管道读取模式，"chunk"（默认）或 "line"
+            read_chunk_size: 每次从管道读取的最大字节数，默认 64KB
+            io_mode: "pump"（POSIX 默认）在单个 I/O 泵线程中处理所有非 PTY 命令的输出，
+                "thread" 为每个命令使用独立的执行线程和读取线程，
+                "asyncio" 在调用 run_command_async 的事件循环中执行非 PTY 命令
+            pty_columns: POSIX PTY 模式的终端列数，默认 120
+            pty_rows: POSIX PTY 模式的终端行数，默认 40
+            max_tasks: 最多保留的任务数，超出时清理最近最少访问的已完成任务，0 表示不限制
+            max_total_bytes: 已完成任务的输出占用内存的上限（字节），默认 512MB，0 表示不限制
+            task_ttl: 任务完成后保留的时间（秒），默认 1 小时，0 表示不过期
+            reap_interval: 后台清理线程的运行间隔（秒），默认 30 秒，0 表示只在提交命令时清理
+            max_concurrent: 最多同时运行的命令数，默认 32，0 表示不限制
+            max_queued: 最多排队的命令数，默认 1000，0 表示不限制
+
+        Raises:
+            ValueError: io_mode 无效，或 max_concurrent/max_queued 为负数
+        """
+        if io_mode not in IO_MODES:
+            raise ValueError(
+                f"Invalid io_mode: {io_mode!r}, expected one of {IO_MODES}"
+            )
+        # 按最近访问顺序排列，最早访问的在前
+        self.commands: "OrderedDict[str, TaskRecord]" = OrderedDict()
+        # 只保护 commands 索引，任务状态由各自的锁保护
         self.lock = threading.Lock()
+        self.spill_dir = spill_dir
+        self.disk_quota = disk_quota
+        self.read_mode = read_mode
+        self.read_chunk_size = read_chunk_size
+        self.io_mode = io_mode
+        self.pty_columns = pty_columns
+        self.pty_rows = pty_rows
+        self.max_tasks = max_tasks
+        self.max_total_bytes = max_total_bytes
+        self.task_ttl = task_ttl
+        self.reap_interval = reap_interval
+        self._evicted_count = 0
+        # 已完成任务的索引，由 self.lock 保护，清理时不需要遍历所有任务或获取任务锁：
+        # 按完成顺序排列的 token -> 完成时间（TTL），
+        # 按最近访问顺序排列的 token -> 冻结后占用的内存（数量和内存上限）
+        self._completed_by_time: "OrderedDict[str, float]" = OrderedDict()
+        self._completed_lru: "OrderedDict[str, int]" = OrderedDict()
+        self._completed_bytes = 0
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+        self._scheduler = CommandScheduler(
+            max_concurrent,
+            max_queued,
+            on_admit=self._mark_running,
+            on_start_failed=self._fail_start,
+        )
+        self._pump: Optional[IoPump] = None
+        # asyncio 模式下运行中的任务，保持引用避免被垃圾回收
+        self._async_tasks: Set["asyncio.Task"] = set()
+        # 异步长轮询使用的等待线程池，第一次长轮询时创建
+        self._wait_executor: Optional[ThreadPoolExecutor] = None
+        if io_mode == IO_MODE_PUMP:
+            if PUMP_SUPPORTED:
+                self._pump = IoPump(read_chunk_size=read_chunk_size)
+            else:
+                logger.warning(
+                    "I/O pump is not supported on this platform, using thread mode"
+                )
+
+    def _create_buffer(
+        self,
+        max_buffer_size: int,
+        spill_to_disk: bool,
+        condition: Optional[threading.Condition] = None,
+    ) -> StreamingBuffer:
+        """
+        创建输出缓冲区
+
+        落盘模式下 max_buffer_size 作为内存尾部大小的上限，
+        完整输出写入临时文件，受 disk_quota 限制。
+        同一命令的两个缓冲区共享 condition，长轮询时可以同时等待。
+        """
+        if spill_to_disk:
+            return SpillingStreamingBuffer(
+                memory_size=min(max_buffer_size, DEFAULT_SPILL_MEMORY_SIZE),
+                disk_quota=self.disk_quota,
+                directory=self.spill_dir,
+                condition=condition,
+            )
+        return StreamingBuffer(max_size=max_buffer_size, condition=condition)
 
     def run_command(
         self,
@@ -49,56 +210,121 @@ class RunCmdService:
         working_directory: Optional[str] = None,
         use_pty: bool = False,
         max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE,
+        spill_to_disk: bool = False,
+        priority: int = 0,
     ) -> str:
         """
         异步运行命令
 
+        没有空闲的运行槽位时命令进入队列，状态为 pending，超时从命令实际启动时开始计算。
+
         Args:
             command: 要执行的命令
             timeout: 超时时间（秒）
             working_directory: 工作目录
             use_pty: 是否使用 PTY 模式（默认 False）
             max_buffer_size: 最大输出缓冲区大小（默认 10MB）
+            spill_to_disk: 是否将输出写入临时文件以保留完整输出（默认 False）
+            priority: 排队时的优先级，数值越大越先启动（默认 0）
 
         Returns:
             命令执行的token
+
+        Raises:
+            QueueFullError: 排队的命令数已达上限
         """
-        token = str(uuid.uuid4())
-        
-        # 创建 StreamingBuffer 实例
-        stdout_buffer = StreamingBuffer(max_size=max_buffer_size)
-        stderr_buffer = StreamingBuffer(max_size=max_buffer_size)
-
-        # 创建命令信息字典
-        cmd_info = {
-            "token": token,
-            "command": command,
-            "status": "pending",
-            "start_time": datetime.now(),
-            "timeout": timeout,
-            "working_directory": working_directory,
-            "use_pty": use_pty,
-            "max_buffer_size": max_buffer_size,
-            # 使用 StreamingBuffer 替代字符串
-            "stdout_buffer": stdout_buffer,
-            "stderr_buffer": stderr_buffer,
-            # 保留旧字段用于向后兼容
-            "stdout": "",
-            "stderr": "",
-            "exit_code": None,
-            "execution_time": None,
-            "timeout_occurred": False,
-            # 新增字段
-            "pty_used": False,
-            "pty_fallback": False,
-            "fallback_reason": "",
-        }
+        token = self._register_command(
+            command,
+            timeout,
+            working_directory,
+            use_pty,
+            max_buffer_size,
+            spill_to_disk,
+        )
 
-        # 存储命令信息
-        with self.lock:
-            self.commands[token] = cmd_info
+        # 非 PTY 命令交给 I/O 泵，不创建额外线程
+        if self._pump is not None and not use_pty:
+            start = functools.partial(
+                self._start_in_pump, token, command, timeout, working_directory
+            )
+        else:
+            start = functools.partial(
+                self._start_thread, token, command, timeout, working_directory, use_pty
+            )
+        self._submit(token, start, priority)
+        return token
+
+    async def run_command_async(
+        self,
+        command: str,
+        timeout: int = 30,
+        working_directory: Optional[str] = None,
+        use_pty: bool = False,
+        max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE,
+        spill_to_disk: bool = False,
+        priority: int = 0,
+    ) -> str:
+        """
+        异步运行命令，供异步工具处理函数调用
+
+        asyncio 模式下非 PTY 命令作为任务在当前事件循环中执行，不创建线程；
+        其他情况与 run_command 相同。参数和返回值同 run_command。
+        """
+        if self.io_mode != IO_MODE_ASYNCIO or use_pty:
+            return self.run_command(
+                command,
+                timeout,
+                working_directory,
+                use_pty=use_pty,
+                max_buffer_size=max_buffer_size,
+                spill_to_disk=spill_to_disk,
+                priority=priority,
+            )
+
+        token = self._register_command(
+            command,
+            timeout,
+            working_directory,
+            use_pty,
+            max_buffer_size,
+            spill_to_disk,
+        )
+        # 排队的命令可能由其他线程启动，总是通过 call_soon_threadsafe 回到事件循环
+        loop = asyncio.get_running_loop()
+        start = functools.partial(
+            loop.call_soon_threadsafe,
+            self._start_async_task,
+            token,
+            command,
+            timeout,
+            working_directory,
+        )
+        self._submit(token, start, priority)
+        return token
 
-        # 在新线程中执行命令
+    def _start_async_task(
+        self,
+        token: str,
+        command: str,
+        timeout: int,
+        working_directory: Optional[str],
+    ) -> None:
+        """在事件循环中创建执行命令的任务"""
+        task = asyncio.ensure_future(
+            self._execute_command_async(token, command, timeout, working_directory)
+        )
+        self._async_tasks.add(task)
+        task.add_done_callback(self._async_tasks.discard)
+
+    def _start_thread(
+        self,
+        token: str,
+        command: str,
+        timeout: int,
+        working_directory: Optional[str],
+        use_pty: bool,
+    ) -> None:
+        """在新线程中执行命令"""
         thread = threading.Thread(
             target=self._execute_command,
             args=(token, command, timeout, working_directory, use_pty),
@@ -106,8 +332,172 @@ class RunCmdService:
         thread.daemon = True
         thread.start()
 
+    def _mark_running(self, token: str) -> None:
+        """
+        命令获得运行槽位时标记为运行中
+
+        命令可能稍后才在启动线程或事件循环中真正启动，期间查询返回 running，
+        pending 只表示仍在队列中。
+        """
+        record = self._get_command(token)
+        if record is None:
+            return
+        with record.lock:
+            if record.status == "pending":
+                record.status = "running"
+
+    def _fail_start(self, token: str, error: Exception) -> None:
+        """
+        启动函数抛出异常时记录失败结果
+
+        on_admit 已将命令标记为运行中，这里将其标记为完成并加入已完成任务索引，
+        否则命令会一直停留在 running 状态，也不会被保留策略清理。
+        """
+        record = self._get_command(token)
+        if record is not None:
+            with record.lock:
+                if record.status == "completed":
+                    return
+        self._fail_command(token, error, 0)
+
+    def _submit(self, token: str, start, priority: int) -> None:
+        """
+        将命令交给调度器，队列已满时撤销登记并抛出 QueueFullError
+        """
+        try:
+            self._scheduler.submit(token, start, priority)
+        except QueueFullError:
+            with self.lock:
+                record = self.commands.pop(token, None)
+            if record is not None:
+                record.close_buffers()
+            raise
+
+    def _register_command(
+        self,
+        command: str,
+        timeout: int,
+        working_directory: Optional[str],
+        use_pty: bool,
+        max_buffer_size: int,
+        spill_to_disk: bool,
+    ) -> str:
+        """
+        创建输出缓冲区并登记命令信息
+
+        Returns:
+            命令执行的token
+        """
+        token = str(uuid.uuid4())
+
+        # 创建 StreamingBuffer 实例，共享一个条件变量供长轮询等待
+        condition = threading.Condition(threading.Lock())
+        stdout_buffer = self._create_buffer(max_buffer_size, spill_to_disk, condition)
+        stderr_buffer = self._create_buffer(max_buffer_size, spill_to_disk, condition)
+
+        record = TaskRecord(
+            token,
+            command,
+            stdout_buffer,
+            stderr_buffer,
+            timeout=timeout,
+            working_directory=working_directory,
+            use_pty=use_pty,
+            max_buffer_size=max_buffer_size,
+            spill_to_disk=spill_to_disk,
+        )
+
+        # 存储命令信息，同时清理超出保留策略的任务
+        with self.lock:
+            self.commands[token] = record
+            evicted = self._evict_locked(time.monotonic())
+            self._ensure_reaper()
+        _close_buffers(evicted)
+
         return token
 
+    def _start_in_pump(
+        self,
+        token: str,
+        command: str,
+        timeout: int,
+        working_directory: Optional[str],
+    ):
+        """
+        启动命令并交给 I/O 泵读取输出，命令结束时由泵线程更新结果
+
+        Args:
+            token: 命令的 token
+            command: 要执行的命令
+            timeout: 超时时间（秒）
+            working_directory: 工作目录
+        """
+        start_time = time.time()
+        record = self._get_command(token)
+        with record.lock:
+            record.status = "running"
+        stdout_buffer = record.stdout_buffer
+        stderr_buffer = record.stderr_buffer
+
+        def on_complete(result: Dict[str, Any]) -> None:
+            result.update(pty_used=False, pty_fallback=False, fallback_reason="")
+            self._complete_command(token, result, time.time() - start_time)
+
+        try:
+            self._pump.start_process(
+                command,
+                stdout_buffer,
+                stderr_buffer,
+                on_complete,
+                working_directory=working_directory,
+                env=_command_env(),
+                timeout=timeout,
+            )
+        except Exception as e:
+            logger.error(f"Command execution error: {e}")
+            self._fail_command(token, e, time.time() - start_time)
+
+    async def _execute_command_async(
+        self,
+        token: str,
+        command: str,
+        timeout: int,
+        working_directory: Optional[str],
+    ):
+        """
+        在事件循环中执行命令（asyncio 模式）
+
+        Args:
+            token: 命令的 token
+            command: 要执行的命令
+            timeout: 超时时间（秒）
+            working_directory: 工作目录
+        """
+        start_time = time.time()
+        record = self._get_command(token)
+        with record.lock:
+            record.status = "running"
+        stdout_buffer = record.stdout_buffer
+        stderr_buffer = record.stderr_buffer
+
+        try:
+            executor = AsyncSubprocessExecutor(
+                stdout_buffer,
+                stderr_buffer,
+                read_chunk_size=self.read_chunk_size,
+            )
+            result = await executor.execute(
+                command,
+                working_directory=working_directory,
+                env=_command_env(),
+                timeout=timeout,
+            )
+            result.update(pty_used=False, pty_fallback=False, fallback_reason="")
+            self._complete_command(token, result, time.time() - start_time)
+        except Exception as e:
+            logger.error(f"Command execution error: {e}")
+            self._fail_command(token, e, time.time() - start_time)
+
     def _execute_command(
         self,
         token: str,
@@ -132,25 +522,17 @@ class RunCmdService:
         try:
             start_time = time.time()
 
-            # 更新状态为运行中
-            with self.lock:
-                if token in self.commands:
-                    self.commands[token]["status"] = "running"
-
-            # 获取缓冲区引用
-            with self.lock:
-                if token not in self.commands:
-                    return
-                stdout_buffer = self.commands[token]["stdout_buffer"]
-                stderr_buffer = self.commands[token]["stderr_buffer"]
+            # 更新状态为运行中，并获取缓冲区引用
+            record = self._get_command(token)
+            if record is None:
+                self._scheduler.finish(token)
+                return
+            with record.lock:
+                record.status = "running"
+            stdout_buffer = record.stdout_buffer
+            stderr_buffer = record.stderr_buffer
 
-            # 处理 Python 路径环境变量
-            env = None
-            python_path = os.environ.get(ENV_PYTHON_PATH)
-            if python_path and os.path.isfile(python_path):
-                env = os.environ.copy()
-                python_dir = os.path.dirname(python_path)
-                env["PATH"] = f"{python_dir}{os.pathsep}{env.get('PATH', '')}"
+            env = _command_env()
 
             # 使用新的执行器执行命令（支持 PTY 降级）
             result = execute_with_pty_fallback(
@@ -161,63 +543,103 @@ class RunCmdService:
                 working_directory=working_directory,
                 env=env,
                 timeout=timeout,
+                read_mode=self.read_mode,
+                read_chunk_size=self.read_chunk_size,
+                pty_columns=self.pty_columns,
+                pty_rows=self.pty_rows,
             )
 
-            execution_time = time.time() - start_time
-
-            # 更新命令结果
-            with self.lock:
-                if token in self.commands:
-                    # 从缓冲区获取最终输出（用于向后兼容）
-                    final_stdout = stdout_buffer.get_all()
-                    final_stderr = stderr_buffer.get_all()
-                    
-                    self.commands[token].update(
-                        {
-                            "status": "completed",
-                            "stdout": final_stdout,
-                            "stderr": final_stderr,
-                            "exit_code": result["exit_code"],
-                            "execution_time": execution_time,
-                            "timeout_occurred": result["timeout_occurred"],
-                            "pty_used": result["pty_used"],
-                            "pty_fallback": result["pty_fallback"],
-                            "fallback_reason": result.get("fallback_reason", ""),
-                        }
-                    )
+            self._complete_command(token, result, time.time() - start_time)
 
         except Exception as e:
             # 处理其他异常
             logger.error(f"Command execution error: {e}")
-            execution_time = time.time() - start_time
-            with self.lock:
-                if token in self.commands:
-                    # 尝试从缓冲区获取已捕获的输出
-                    try:
-                        stdout_buffer = self.commands[token]["stdout_buffer"]
-                        stderr_buffer = self.commands[token]["stderr_buffer"]
-                        partial_stdout = stdout_buffer.get_all()
-                        partial_stderr = stderr_buffer.get_all()
-                    except Exception:
-                        partial_stdout = ""
-                        partial_stderr = ""
-                    
-                    self.commands[token].update(
-                        {
-                            "status": "completed",
-                            "stdout": partial_stdout,
-                            "stderr": partial_stderr + f"\nError: {str(e)}",
-                            "exit_code": -1,
-                            "execution_time": execution_time,
-                            "timeout_occurred": False,
-                        }
-                    )
+            self._fail_command(token, e, time.time() - start_time)
+
+    def _complete_command(
+        self, token: str, result: Dict[str, Any], execution_time: float
+    ) -> None:
+        """
+        记录命令执行结果
+
+        输出保留在缓冲区中，冻结为只读后按需解码，不再复制为字符串。
+
+        Args:
+            token: 命令的 token
+            result: 执行器返回的结果
+            execution_time: 执行时间（秒）
+        """
+        record = self._get_command(token)
+        if record is None:
+            self._scheduler.finish(token)
+            return
+        with record.lock:
+            record.status = "completed"
+            record.exit_code = result["exit_code"]
+            record.execution_time = execution_time
+            record.timeout_occurred = result["timeout_occurred"]
+            record.pty_used = result["pty_used"]
+            record.pty_fallback = result["pty_fallback"]
+            record.fallback_reason = result.get("fallback_reason", "")
+            record.completed_at = time.monotonic()
+        # 在任务锁外冻结缓冲区，同时唤醒长轮询的等待方
+        record.freeze_buffers()
+        self._index_completed(record)
+        # 释放运行槽位，启动排队的命令
+        self._scheduler.finish(token)
+
+    def _fail_command(
+        self, token: str, error: Exception, execution_time: float
+    ) -> None:
+        """
+        记录命令执行异常，保留已捕获的输出
+
+        异常信息追加到 stderr 缓冲区。
+
+        Args:
+            token: 命令的 token
+            error: 执行过程中的异常
+            execution_time: 执行时间（秒）
+        """
+        record = self._get_command(token)
+        if record is None:
+            self._scheduler.finish(token)
+            return
+        record.stderr_buffer.write(f"\nError: {str(error)}".encode("utf-8"))
+        with record.lock:
+            record.status = "completed"
+            record.exit_code = -1
+            record.execution_time = execution_time
+            record.timeout_occurred = False
+            record.completed_at = time.monotonic()
+        record.freeze_buffers()
+        self._index_completed(record)
+        self._scheduler.finish(token)
+
+    def _index_completed(self, record: TaskRecord) -> None:
+        """
+        将冻结后的任务加入已完成任务索引，之后可以被保留策略清理
+
+        冻结后缓冲区大小不再变化，在获取全局锁之前计算占用的内存。
+        """
+        resident = record.resident_bytes
+        with self.lock:
+            if self.commands.get(record.token) is not record:
+                return
+            self._completed_by_time[record.token] = record.completed_at
+            self._completed_lru[record.token] = resident
+            self._completed_bytes += resident
 
     def query_command_status(
         self,
         token: str,
         stdout_offset: int = 0,
         stderr_offset: int = 0,
+        max_bytes: Optional[int] = None,
+        tail_bytes: Optional[int] = None,
+        tail_lines: Optional[int] = None,
+        wait_ms: Optional[int] = None,
+        min_new_bytes: int = 1,
     ) -> Dict[str, Any]:
         """
         查询命令执行状态
@@ -226,76 +648,394 @@ class RunCmdService:
             token: 命令的token
             stdout_offset: stdout 输出偏移量（默认 0，返回全部）
             stderr_offset: stderr 输出偏移量（默认 0，返回全部）
+            max_bytes: 每个输出流最多返回的字节数（默认不限制）
+            tail_bytes: 尾部模式，每个输出流只返回最后 N 字节，忽略偏移量
+            tail_lines: 尾部模式，每个输出流只返回最后 N 行，忽略偏移量
+            wait_ms: 长轮询，命令未完成时最多等待的毫秒数（不超过 60000），
+                直到偏移量之后出现新输出或命令结束。默认不等待
+            min_new_bytes: 长轮询时需要等到的新输出字节数（stdout 和 stderr 合计），默认 1
 
         Returns:
             包含命令状态的字典，包括：
             - token: 命令 token
-            - status: 状态 (pending/running/completed/not_found)
+            - status: 状态 (pending 排队中/running/completed/not_found)
+            - queue_position: 排队位置，1 表示下一个启动（仅 pending 时）
             - exit_code: 退出码（完成时）
             - stdout: stdout 输出（从偏移量开始）
             - stderr: stderr 输出（从偏移量开始）
-            - stdout_length: stdout 总长度
-            - stderr_length: stderr 总长度
+            - stdout_length: stdout 累计字节数（绝对偏移量）
+            - stderr_length: stderr 累计字节数（绝对偏移量）
             - stdout_truncated: stdout 是否被截断
             - stderr_truncated: stderr 是否被截断
+            - stdout_start_offset: stdout 最早保留数据的绝对偏移量
+            - stderr_start_offset: stderr 最早保留数据的绝对偏移量
+            - stdout_offset: 返回的 stdout 数据的起始偏移量
+            - stderr_offset: 返回的 stderr 数据的起始偏移量
+            - stdout_next_offset: 下次查询 stdout 使用的偏移量
+            - stderr_next_offset: 下次查询 stderr 使用的偏移量
+            - stdout_has_more: stdout 是否还有未返回的输出
+            - stderr_has_more: stderr 是否还有未返回的输出
             - execution_time: 执行时间（完成时）
             - timeout_occurred: 是否超时
         """
+        if wait_ms:
+            self._wait_for_output(
+                token, stdout_offset, stderr_offset, wait_ms, min_new_bytes
+            )
+
+        # 全局锁只用于查找任务和调整访问顺序
         with self.lock:
-            if token not in self.commands:
+            record = self.commands.get(token)
+            if record is None:
                 return {
                     "token": token,
                     "status": "not_found",
                     "message": "Token not found",
                 }
+            self.commands.move_to_end(token)
+            if token in self._completed_lru:
+                self._completed_lru.move_to_end(token)
 
-            cmd_info = self.commands[token]
-            
-            # 获取缓冲区引用
-            stdout_buffer = cmd_info.get("stdout_buffer")
-            stderr_buffer = cmd_info.get("stderr_buffer")
-            
-            # 从缓冲区获取增量输出
-            if stdout_buffer is not None:
-                stdout_result = stdout_buffer.get_output(offset=stdout_offset)
-                stdout_data = stdout_result["data"]
-                stdout_length = stdout_result["length"]
-                stdout_truncated = stdout_result["truncated"]
-            else:
-                # 向后兼容：如果没有缓冲区，使用旧的字符串字段
-                stdout_data = cmd_info.get("stdout", "")[stdout_offset:]
-                stdout_length = len(cmd_info.get("stdout", ""))
-                stdout_truncated = False
-            
-            if stderr_buffer is not None:
-                stderr_result = stderr_buffer.get_output(offset=stderr_offset)
-                stderr_data = stderr_result["data"]
-                stderr_length = stderr_result["length"]
-                stderr_truncated = stderr_result["truncated"]
-            else:
-                # 向后兼容：如果没有缓冲区，使用旧的字符串字段
-                stderr_data = cmd_info.get("stderr", "")[stderr_offset:]
-                stderr_length = len(cmd_info.get("stderr", ""))
-                stderr_truncated = False
-
-            # 构建响应
-            response = {
-                "token": cmd_info["token"],
-                "status": cmd_info["status"],
-                "stdout": stdout_data,
-                "stderr": stderr_data,
-                "stdout_length": stdout_length,
-                "stderr_length": stderr_length,
-                "stdout_truncated": stdout_truncated,
-                "stderr_truncated": stderr_truncated,
-            }
-            
-            # 添加完成状态的额外字段
-            if cmd_info["status"] in ["completed", "pending"]:
-                response.update({
-                    "exit_code": cmd_info["exit_code"],
-                    "execution_time": cmd_info["execution_time"],
-                    "timeout_occurred": cmd_info["timeout_occurred"],
-                })
-            
-            return response
+        # 先在任务锁内取状态快照，再读取输出：缓冲区在状态变为 completed 之前
+        # 已写完，因此返回 completed 时输出一定是完整的
+        with record.lock:
+            record.last_access = time.monotonic()
+            state = record.to_dict()
+        status = state["status"]
+        queue_position = None
+        if status == "pending":
+            queue_position = self._scheduler.position(token)
+            if queue_position is None:
+                # 取快照之后刚刚出队
+                status = "running"
+
+        # 构建响应，解码输出时不持有服务锁和任务锁
+        response = {
+            "token": record.token,
+            "status": status,
+        }
+        if queue_position is not None:
+            response["queue_position"] = queue_position
+        for name, offset in (("stdout", stdout_offset), ("stderr", stderr_offset)):
+            response.update(
+                _stream_output(
+                    name,
+                    record,
+                    offset,
+                    max_bytes=max_bytes,
+                    tail_bytes=tail_bytes,
+                    tail_lines=tail_lines,
+                )
+            )
+
+        # 添加完成状态的额外字段
+        if status in ["completed", "pending"]:
+            response.update(
+                {
+                    "exit_code": state["exit_code"],
+                    "execution_time": state["execution_time"],
+                    "timeout_occurred": state["timeout_occurred"],
+                }
+            )
+
+        return response
+
+    async def query_command_status_async(
+        self,
+        token: str,
+        stdout_offset: int = 0,
+        stderr_offset: int = 0,
+        max_bytes: Optional[int] = None,
+        tail_bytes: Optional[int] = None,
+        tail_lines: Optional[int] = None,
+        wait_ms: Optional[int] = None,
+        min_new_bytes: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        在事件循环中查询命令执行状态
+
+        参数和返回值与 query_command_status 相同。长轮询的等待在专用线程池中进行，
+        读取状态和解码输出在默认线程池中进行，都不阻塞事件循环，其他请求可以同时处理。
+        """
+        loop = asyncio.get_running_loop()
+        if wait_ms:
+            await loop.run_in_executor(
+                self._get_wait_executor(),
+                functools.partial(
+                    self._wait_for_output,
+                    token,
+                    stdout_offset,
+                    stderr_offset,
+                    wait_ms,
+                    min_new_bytes,
+                ),
+            )
+        # 解码数 MB 的输出可能耗时较长，不在事件循环线程中进行
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                self.query_command_status,
+                token,
+                stdout_offset=stdout_offset,
+                stderr_offset=stderr_offset,
+                max_bytes=max_bytes,
+                tail_bytes=tail_bytes,
+                tail_lines=tail_lines,
+            ),
+        )
+
+    def _get_command(self, token: str) -> Optional[TaskRecord]:
+        """在索引中查找任务，只在查找期间持有全局锁"""
+        with self.lock:
+            return self.commands.get(token)
+
+    def _get_wait_executor(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self._wait_executor is None:
+                self._wait_executor = ThreadPoolExecutor(
+                    max_workers=MAX_CONCURRENT_WAITS, thread_name_prefix="runcmd-wait"
+                )
+            return self._wait_executor
+
+    def _wait_for_output(
+        self,
+        token: str,
+        stdout_offset: int,
+        stderr_offset: int,
+        wait_ms: int,
+        min_new_bytes: int,
+    ) -> None:
+        """
+        等待命令产生新输出或结束，最多等待 wait_ms 毫秒
+
+        等待期间不持有服务锁，只在缓冲区的条件变量上阻塞。
+        """
+        record = self._get_command(token)
+        if record is None:
+            return
+        with record.lock:
+            if record.status == "completed":
+                return
+        stdout_buffer = record.stdout_buffer
+        stderr_buffer = record.stderr_buffer
+
+        timeout = min(wait_ms, MAX_WAIT_MS) / 1000
+        wait_for_output(
+            [(stdout_buffer, stdout_offset), (stderr_buffer, stderr_offset)],
+            min_new_bytes=max(1, min_new_bytes),
+            timeout=timeout,
+        )
+
+    def enforce_retention(self) -> int:
+        """
+        按保留策略清理已完成的任务
+
+        后台清理线程定期调用，也可以手动调用。
+
+        Returns:
+            被清理的任务数
+        """
+        with self.lock:
+            evicted = self._evict_locked(time.monotonic())
+        _close_buffers(evicted)
+        return len(evicted)
+
+    def _evict_locked(self, now: float) -> List[TaskRecord]:
+        """
+        从 commands 中移除超出保留策略的已完成任务，调用方需持有锁
+
+        依次应用 TTL、任务数上限和内存上限，后两者按最近最少访问的顺序清理。
+        只访问已完成任务索引的头部，耗时与被清理的任务数成正比。
+        内存上限只统计已完成任务冻结后的输出，运行中的任务受各自的 max_buffer_size 限制。
+        缓冲区由调用方在释放锁后关闭。
+
+        Returns:
+            被移除的任务
+        """
+        doomed: List[str] = []
+        if self.task_ttl:
+            for token, completed_at in self._completed_by_time.items():
+                if now - completed_at < self.task_ttl:
+                    break
+                doomed.append(token)
+        evicted = [self._remove_completed_locked(token) for token in doomed]
+
+        while self._completed_lru and (
+            (self.max_tasks and len(self.commands) > self.max_tasks)
+            or (self.max_total_bytes and self._completed_bytes > self.max_total_bytes)
+        ):
+            token = next(iter(self._completed_lru))
+            evicted.append(self._remove_completed_locked(token))
+
+        self._evicted_count += len(evicted)
+        return evicted
+
+    def _remove_completed_locked(self, token: str) -> TaskRecord:
+        """从任务索引和已完成任务索引中移除任务，调用方需持有锁"""
+        del self._completed_by_time[token]
+        self._completed_bytes -= self._completed_lru.pop(token)
+        return self.commands.pop(token)
+
+    def _ensure_reaper(self) -> None:
+        """启动后台清理线程，调用方需持有锁"""
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+        self._reaper = threading.Thread(
+            target=self._reap_loop, name="runcmd-reaper", daemon=True
+        )
+        self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while not self._reaper_stop.wait(self.reap_interval):
+            try:
+                evicted = self.enforce_retention()
+                if evicted:
+                    logger.debug(f"Evicted {evicted} finished commands")
+            except Exception as e:
+                logger.error(f"Command reaper error: {e}")
+
+    def shutdown(self) -> None:
+        """
+        停止后台清理线程、启动线程、I/O 泵和长轮询线程池，并释放所有已完成任务的缓冲区
+
+        I/O 泵中运行的命令被终止，记录为已完成后一并释放。
+        """
+        self._reaper_stop.set()
+        self._scheduler.shutdown()
+        if self._pump is not None:
+            self._pump.shutdown()
+        with self.lock:
+            evicted = [
+                self._remove_completed_locked(token)
+                for token in list(self._completed_lru)
+            ]
+            executor, self._wait_executor = self._wait_executor, None
+        _close_buffers(evicted)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    async def get_stats_async(self) -> Dict[str, Any]:
+        """
+        在默认线程池中获取统计信息，供异步工具处理函数调用
+
+        get_stats 需要遍历所有任务的缓冲区，不在事件循环线程中进行。返回值同 get_stats。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_stats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取任务和内存统计信息
+
+        Returns:
+            统计信息字典，包括：
+            - task_count / queued_count / running_count / completed_count: 任务数
+            - resident_bytes: 所有任务输出占用的内存（字节）
+            - disk_bytes: 落盘模式临时文件占用的磁盘空间（字节）
+            - evicted_count: 累计被清理的任务数
+            - limits: 当前的保留策略
+            - tasks: 每个任务的统计，按最近最少访问的顺序排列（最先被清理的在前），
+              包括 token、status、command、resident_bytes、disk_bytes、
+              age_seconds（提交后经过的时间）和 idle_seconds（上次查询后经过的时间）
+        """
+        with self.lock:
+            records = list(self.commands.values())
+            evicted_count = self._evicted_count
+
+        now = time.monotonic()
+        tasks = []
+        for record in records:
+            with record.lock:
+                status = record.status
+                last_access = record.last_access
+            tasks.append(
+                {
+                    "token": record.token,
+                    "status": status,
+                    "command": record.command,
+                    "resident_bytes": record.resident_bytes,
+                    "disk_bytes": record.disk_bytes,
+                    "age_seconds": round(
+                        (datetime.now() - record.start_time).total_seconds(), 3
+                    ),
+                    "idle_seconds": round(now - last_access, 3),
+                }
+            )
+
+        counts = {"pending": 0, "running": 0, "completed": 0}
+        for task in tasks:
+            counts[task["status"]] += 1
+        return {
+            "task_count": len(tasks),
+            "queued_count": counts["pending"],
+            "running_count": counts["running"],
+            "completed_count": counts["completed"],
+            "resident_bytes": sum(task["resident_bytes"] for task in tasks),
+            "disk_bytes": sum(task["disk_bytes"] for task in tasks),
+            "evicted_count": evicted_count,
+            "limits": {
+                "max_tasks": self.max_tasks,
+                "max_total_bytes": self.max_total_bytes,
+                "task_ttl": self.task_ttl,
+                "max_concurrent": self._scheduler.max_concurrent,
+                "max_queued": self._scheduler.max_queued,
+            },
+            "tasks": tasks,
+        }
+
+
+def _close_buffers(records: List[TaskRecord]) -> None:
+    """关闭被清理任务的缓冲区，释放内存并删除临时文件"""
+    for record in records:
+        record.close_buffers()
+
+
+def _command_env() -> Optional[Dict[str, str]]:
+    """
+    处理 Python 路径环境变量，未设置时返回 None（继承当前环境）
+    """
+    python_path = os.environ.get(ENV_PYTHON_PATH)
+    if python_path and os.path.isfile(python_path):
+        env = os.environ.copy()
+        python_dir = os.path.dirname(python_path)
+        env["PATH"] = f"{python_dir}{os.pathsep}{env.get('PATH', '')}"
+        return env
+    return None
+
+
+def _stream_output(
+    name: str,
+    record: TaskRecord,
+    offset: int,
+    max_bytes: Optional[int] = None,
+    tail_bytes: Optional[int] = None,
+    tail_lines: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    读取单个输出流（stdout 或 stderr），返回以流名称为前缀的响应字段
+
+    Args:
+        name: 输出流名称，"stdout" 或 "stderr"
+        record: 命令的执行状态
+        offset: 起始偏移量
+        max_bytes: 最多返回的字节数
+        tail_bytes: 尾部模式，只返回最后 N 字节
+        tail_lines: 尾部模式，只返回最后 N 行
+    """
+    buffer = record.stdout_buffer if name == "stdout" else record.stderr_buffer
+    result = buffer.get_output(
+        offset=offset,
+        max_bytes=max_bytes,
+        tail_bytes=tail_bytes,
+        tail_lines=tail_lines,
+    )
+
+    return {
+        name: result["data"],
+        f"{name}_length": result["length"],
+        f"{name}_truncated": result["truncated"],
+        f"{name}_start_offset": result["start_offset"],
+        f"{name}_offset": result["offset"],
+        f"{name}_next_offset": result["next_offset"],
+        f"{name}_has_more": result["has_more"],
+    }
@@ -4,139 +4,767 @@ StreamingBuffer 模块 - 线程安全的流式输出缓冲区
 用于在命令执行过程中实时捕获和管理输出数据。
 """
 
+import mmap
+import os
+import tempfile
 import threading
-from typing import Dict, Any
+import weakref
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Any, Optional, Sequence, Tuple, Union
+
+# 每个分段的目标大小，小块写入会合并到最后一个分段中
+SEGMENT_SIZE = 64 * 1024
+
+# 落盘模式默认的内存尾部大小：1MB
+DEFAULT_SPILL_MEMORY_SIZE = 1024 * 1024
+# 落盘模式默认的磁盘配额：1GB
+DEFAULT_DISK_QUOTA = 1024 * 1024 * 1024
+
+# 压缩临时文件时每次复制的字节数
+_COPY_CHUNK_SIZE = 1024 * 1024
+# 尾部模式向前查找换行符时每次读取的字节数
+_TAIL_SCAN_CHUNK_SIZE = 64 * 1024
+# 每个缓冲区缓存的已解码文本：最多条目数和总字符数。缓存只用于运行中命令的
+# 增量查询，保持在一个分段左右，避免在原始字节旁边再保留一份完整输出的字符串副本
+_TEXT_CACHE_ENTRIES = 4
+_TEXT_CACHE_MAX_CHARS = SEGMENT_SIZE
 
 
 class StreamingBuffer:
     """
     线程安全的流式输出缓冲区
-    
+
     用于存储命令执行过程中产生的实时输出，支持：
     - 线程安全的数据写入
     - 偏移量查询（增量获取）
     - 缓冲区大小限制和自动截断
+
+    数据按分段存放在双端队列中，超过最大大小时整段丢弃最旧的数据，
+    截断的开销与缓冲区大小无关。
+
+    所有偏移量都是绝对偏移量，即从开始写入起累计的字节位置，
+    截断旧数据后已有的偏移量仍然指向同一位置。
+
+    返回的数据总是在 UTF-8 字符边界上开始和结束，不会拆开多字节字符；
+    运行中最近的较短解码结果会被缓存，重复或递增的查询只解码新增的字节。
+    锁内只复制需要的字节，解码在锁外进行，大段查询不会阻塞写入方。
+
+    缓冲区的锁是一个条件变量，每次写入和 finish() 时通知等待方，
+    配合 wait_for_output 实现长轮询。
+
+    命令结束后调用 freeze() 将缓冲区冻结为只读并清空解码缓存，查询时按需解码，
+    不保留任何输出的字符串副本。
     """
-    
-    def __init__(self, max_size: int = 10 * 1024 * 1024):
+
+    def __init__(
+        self,
+        max_size: int = 10 * 1024 * 1024,
+        condition: Optional[threading.Condition] = None,
+    ):
         """
         初始化缓冲区
-        
+
         Args:
             max_size: 最大缓冲区大小（字节），默认 10MB
+            condition: 用作缓冲区锁的条件变量。同一命令的 stdout 和 stderr
+                缓冲区共享一个条件变量时，可以用 wait_for_output 同时等待两者
         """
-        self._buffer: bytearray = bytearray()
-        self._lock: threading.Lock = threading.Lock()
+        # (分段起始的绝对偏移量, 分段数据)，冻结后分段数据为 bytes
+        self._segments: Deque[Tuple[int, Union[bytearray, bytes]]] = deque()
+        self._lock: threading.Condition = (
+            condition
+            if condition is not None
+            else threading.Condition(threading.Lock())
+        )
         self._max_size: int = max_size
-        self._truncated: bool = False
-        self._truncated_bytes: int = 0
-    
+        # 保留数据的起始绝对偏移量（即被截断的字节数）
+        self._start: int = 0
+        # 累计写入的字节数（即下一个字节的绝对偏移量）
+        self._end: int = 0
+        # 已解码文本缓存：起始偏移量 -> (结束偏移量, 文本)，两端都在字符边界上
+        self._text_cache: "OrderedDict[int, Tuple[int, str]]" = OrderedDict()
+        self._text_cache_chars: int = 0
+        # 每次清空缓存时递增，锁外解码完成后据此判断结果是否还能缓存
+        self._text_cache_generation: int = 0
+        # 写入方已结束，不会再有新数据
+        self._finished: bool = False
+        # 已冻结为只读，之后的写入将被忽略
+        self._frozen: bool = False
+
     def write(self, data: bytes) -> None:
         """
         写入数据到缓冲区
-        
+
         线程安全地将数据追加到缓冲区。如果追加后超过最大大小，
         将截断旧数据，保留最新数据。
-        
+
         Args:
             data: 要写入的字节数据
         """
         if not data:
             return
-            
+
         with self._lock:
-            self._buffer.extend(data)
-            
+            if self._frozen:
+                return
+            if (
+                self._segments
+                and len(self._segments[-1][1]) + len(data) <= SEGMENT_SIZE
+            ):
+                self._segments[-1][1].extend(data)
+            else:
+                self._segments.append((self._end, bytearray(data)))
+            self._end += len(data)
+
             # 检查是否超过最大大小，需要截断
-            if len(self._buffer) > self._max_size:
-                overflow = len(self._buffer) - self._max_size
-                # 截断旧数据，保留最新的 max_size 字节
-                del self._buffer[:overflow]
-                self._truncated = True
-                self._truncated_bytes += overflow
-    
-    def get_output(self, offset: int = 0) -> Dict[str, Any]:
+            overflow = self._end - self._start - self._max_size
+            if overflow > 0:
+                self._drop(overflow)
+            self._lock.notify_all()
+
+    def _drop(self, count: int) -> None:
+        """
+        丢弃最旧的 count 字节，调用方需持有锁
+
+        完全落在截断位置之前的分段整段出队；截断位置所在的分段
+        保持不变，读取时从截断位置开始切片。
+        """
+        self._start += count
+        while self._segments:
+            seg_start, segment = self._segments[0]
+            if seg_start + len(segment) > self._start:
+                break
+            self._segments.popleft()
+
+        if self._segments:
+            seg_start, segment = self._segments[0]
+            skipped = self._start - seg_start
+            if skipped > SEGMENT_SIZE:
+                # 单次写入超过分段大小时，释放该分段中已截断的部分
+                del segment[:skipped]
+                self._segments[0] = (self._start, segment)
+
+    def _read(self, offset: int, end: Optional[int] = None) -> bytes:
+        """
+        读取绝对偏移量 [offset, end) 范围的数据，end 默认为末尾，调用方需持有锁
+
+        增量查询通常只读取最新的少量数据，因此从最后一个分段向前查找。
+        """
+        offset = max(offset, self._start)
+        end = self._end if end is None else min(end, self._end)
+        if offset >= end:
+            return b""
+
+        parts = []
+        for seg_start, segment in reversed(self._segments):
+            if seg_start >= end:
+                continue
+            parts.append(segment[max(0, offset - seg_start) : end - seg_start])
+            if seg_start <= offset:
+                break
+        parts.reverse()
+        return b"".join(parts)
+
+    def _tail_lines_start(self, lines: int) -> int:
+        """
+        返回最后 lines 行的起始绝对偏移量，调用方需持有锁
+
+        从末尾按块向前查找换行符，末尾的换行符不计为新的一行。
+        """
+        pos = self._end
+        remaining = lines
+        while pos > self._start:
+            chunk_start = max(self._start, pos - _TAIL_SCAN_CHUNK_SIZE)
+            chunk = self._read(chunk_start, pos)
+            index = len(chunk)
+            while True:
+                index = chunk.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+                if chunk_start + index == self._end - 1:
+                    continue
+                remaining -= 1
+                if remaining == 0:
+                    return chunk_start + index + 1
+            pos = chunk_start
+        return self._start
+
+    def get_output(
+        self,
+        offset: int = 0,
+        max_bytes: Optional[int] = None,
+        tail_bytes: Optional[int] = None,
+        tail_lines: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
         获取从指定偏移量开始的输出
-        
+
         Args:
-            offset: 起始偏移量，默认为 0（返回全部）
-            
+            offset: 起始绝对偏移量，默认为 0（返回全部保留的输出）。
+                如果该位置的数据已被截断，则从最早保留的数据开始返回
+            max_bytes: 最多返回的字节数，默认不限制。未返回的部分可从 next_offset 继续读取
+            tail_bytes: 尾部模式，只返回最后 N 字节，忽略 offset
+            tail_lines: 尾部模式，只返回最后 N 行，忽略 offset。
+                与 tail_bytes 或 max_bytes 同时指定时取较短者
+
         Returns:
             包含以下字段的字典：
             - data: str - 输出内容（UTF-8 解码，错误时替换）
-            - length: int - 当前缓冲区总长度
+            - offset: int - 返回数据的起始绝对偏移量
+            - next_offset: int - 返回数据之后的绝对偏移量，可作为下次查询的偏移量
+            - has_more: bool - next_offset 之后是否还有已产生的输出
+            - length: int - 累计写入的字节数
+            - start_offset: int - 最早保留数据的绝对偏移量
             - truncated: bool - 是否发生过截断
             - truncated_bytes: int - 被截断的字节数
         """
         with self._lock:
-            current_length = len(self._buffer)
-            
-            # 如果偏移量超过当前长度，返回空数据
-            if offset >= current_length:
-                data = ""
+            total_end = self._readable_end()
+            end = total_end
+            if tail_bytes is not None or tail_lines is not None:
+                start = self._start
+                if tail_bytes is not None:
+                    start = max(start, end - tail_bytes)
+                if tail_lines is not None:
+                    start = max(start, self._tail_lines_start(tail_lines))
+                if max_bytes is not None:
+                    start = max(start, end - max_bytes)
+                start = self._align_start(start)
             else:
-                # 确保偏移量非负
-                safe_offset = max(0, offset)
-                data = self._buffer[safe_offset:].decode('utf-8', errors='replace')
-            
-            return {
-                "data": data,
-                "length": current_length,
-                "truncated": self._truncated,
-                "truncated_bytes": self._truncated_bytes
+                start = self._align_start(max(offset, self._start))
+                if max_bytes is not None and start + max_bytes < end:
+                    end = self._align_end(start + max_bytes)
+                    if end <= start:
+                        # max_bytes 小于一个字符的长度时，至少返回一个完整字符
+                        end = min(total_end, self._align_start(start + 1))
+            start = min(start, end)
+
+            cached_text, raw = self._prepare_decode(start, end)
+            generation = self._text_cache_generation
+            result = {
+                "offset": start,
+                "next_offset": end,
+                "has_more": end < total_end,
+                "length": self._end,
+                "start_offset": self._start,
+                "truncated": self._start > 0,
+                "truncated_bytes": self._start,
             }
-    
+
+        result["data"] = self._finish_decode(start, end, cached_text, raw, generation)
+        return result
+
+    def _readable_end(self) -> int:
+        """
+        可以返回给查询方的数据末尾，调用方需持有锁
+
+        末尾不完整的多字节字符留到下次查询，等其余字节写入后再返回；
+        输出结束后不会再有后续字节，全部返回（不完整的字符解码为替换字符）。
+        """
+        if self._finished:
+            return self._end
+        return self._align_end(self._end)
+
+    def _align_start(self, pos: int) -> int:
+        """
+        将偏移量向后移动到 UTF-8 字符边界（跳过最多 3 个后续字节），调用方需持有锁
+        """
+        head = self._read(pos, pos + 3)
+        skip = 0
+        while skip < len(head) and 0x80 <= head[skip] < 0xC0:
+            skip += 1
+        return pos + skip
+
+    def _align_end(self, pos: int) -> int:
+        """
+        如果 pos 之前是不完整的 UTF-8 多字节字符，返回该字符的起始偏移量，调用方需持有锁
+        """
+        tail = self._read(max(self._start, pos - 3), pos)
+        for i in range(len(tail) - 1, -1, -1):
+            byte = tail[i]
+            if byte < 0x80:
+                return pos
+            if byte >= 0xC0:
+                needed = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+                if len(tail) - i < needed:
+                    return pos - (len(tail) - i)
+                return pos
+        return pos
+
+    def _prepare_decode(self, start: int, end: int) -> Tuple[str, Optional[bytes]]:
+        """
+        准备解码 [start, end) 范围的数据，调用方需持有锁
+
+        两端都必须在字符边界上。返回 (已缓存的文本, 需要解码的字节)：
+        如果缓存中有从 start 开始、到 end 之前结束的文本，只复制新增的字节；
+        缓存完全命中时需要解码的字节为 None。
+        """
+        entry = self._text_cache.get(start)
+        if entry is not None and entry[0] <= end:
+            cached_end, cached_text = entry
+            if cached_end == end:
+                self._text_cache.move_to_end(start)
+                return cached_text, None
+            return cached_text, self._read(cached_end, end)
+        return "", self._read(start, end)
+
+    def _finish_decode(
+        self,
+        start: int,
+        end: int,
+        cached_text: str,
+        raw: Optional[bytes],
+        generation: int,
+    ) -> str:
+        """
+        在锁外解码 _prepare_decode 复制出的字节，再短暂持有锁写入缓存
+
+        解码期间缓冲区被清空或冻结过（generation 变化）、或已冻结时不写入缓存。
+        """
+        if raw is None:
+            return cached_text
+        text = cached_text + raw.decode("utf-8", errors="replace")
+        with self._lock:
+            if generation == self._text_cache_generation and not self._frozen:
+                self._cache_text(start, end, text)
+        return text
+
+    def _cache_text(self, start: int, end: int, text: str) -> None:
+        """将解码结果加入缓存，超出条目数或总字符数时按LRU淘汰，调用方需持有锁"""
+        old = self._text_cache.pop(start, None)
+        if old is not None:
+            self._text_cache_chars -= len(old[1])
+        if not text or len(text) > _TEXT_CACHE_MAX_CHARS:
+            return
+        self._text_cache[start] = (end, text)
+        self._text_cache_chars += len(text)
+        while (
+            len(self._text_cache) > _TEXT_CACHE_ENTRIES
+            or self._text_cache_chars > _TEXT_CACHE_MAX_CHARS
+        ):
+            _start, (_end, evicted) = self._text_cache.popitem(last=False)
+            self._text_cache_chars -= len(evicted)
+
+    def _reset_text_cache(self) -> None:
+        self._text_cache.clear()
+        self._text_cache_chars = 0
+        self._text_cache_generation += 1
+
     def get_all(self) -> str:
         """
         获取全部输出内容
-        
+
         Returns:
-            缓冲区中的全部内容（UTF-8 解码）
+            缓冲区中保留的全部内容（UTF-8 解码）
         """
         with self._lock:
-            return self._buffer.decode('utf-8', errors='replace')
-    
+            start = self._align_start(self._start)
+            data = self._read(start)
+        return data.decode("utf-8", errors="replace")
+
     @property
     def length(self) -> int:
         """
-        当前缓冲区长度
-        
+        累计写入的字节数
+
         Returns:
-            缓冲区中的字节数
+            从开始写入起的总字节数（包括已被截断的部分），
+            即下一个字节的绝对偏移量
         """
         with self._lock:
-            return len(self._buffer)
-    
+            return self._end
+
+    @property
+    def size(self) -> int:
+        """
+        当前缓冲区中保留的字节数
+
+        Returns:
+            未被截断的字节数
+        """
+        with self._lock:
+            return self._end - self._start
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        缓冲区占用的内存（字节），包括保留的输出和解码缓存
+
+        解码缓存按字符数估算，用于内存统计和任务清理
+        """
+        with self._lock:
+            return self._end - self._start + self._text_cache_chars
+
+    @property
+    def disk_bytes(self) -> int:
+        """
+        临时文件占用的字节数，内存缓冲区总是 0
+        """
+        return 0
+
+    @property
+    def start_offset(self) -> int:
+        """
+        最早保留数据的绝对偏移量
+
+        Returns:
+            小于该值的偏移量对应的数据已被截断
+        """
+        with self._lock:
+            return self._start
+
     @property
     def truncated(self) -> bool:
         """
         是否发生过截断
-        
+
         Returns:
             如果缓冲区曾经因超过最大大小而截断，返回 True
         """
         with self._lock:
-            return self._truncated
-    
+            return self._start > 0
+
     @property
     def truncated_bytes(self) -> int:
         """
         被截断的字节数
-        
+
         Returns:
             累计被截断的字节数
         """
         with self._lock:
-            return self._truncated_bytes
-    
+            return self._start
+
+    @property
+    def finished(self) -> bool:
+        """
+        写入方是否已结束
+        """
+        with self._lock:
+            return self._finished
+
+    def finish(self) -> None:
+        """
+        标记写入已结束（命令执行完毕），唤醒所有等待新数据的调用方
+        """
+        with self._lock:
+            self._finished = True
+            self._lock.notify_all()
+
+    def freeze(self) -> None:
+        """
+        冻结缓冲区，命令结束后调用，之后的写入将被忽略
+
+        分段转换为不可变的 bytes 并去掉已截断的部分，释放 bytearray 预留的空间，
+        逐段转换，额外占用的内存不超过一个分段。解码缓存被清空，冻结后只保留原始字节。
+        同时唤醒所有等待新数据的调用方。
+        """
+        with self._lock:
+            if not self._frozen:
+                self._frozen = True
+                self._compact_segments()
+                self._reset_text_cache()
+            self._finished = True
+            self._lock.notify_all()
+
+    def _compact_segments(self) -> None:
+        """将分段转换为只包含保留数据的 bytes，调用方需持有锁"""
+        segments: Deque[Tuple[int, Union[bytearray, bytes]]] = deque()
+        while self._segments:
+            seg_start, segment = self._segments.popleft()
+            skipped = max(0, self._start - seg_start)
+            segments.append((seg_start + skipped, bytes(memoryview(segment)[skipped:])))
+        self._segments = segments
+
+    def _pending_bytes(self, offset: int) -> int:
+        """
+        offset 之后可以返回的字节数，调用方需持有锁
+
+        不计入末尾不完整的多字节字符，与 get_output 返回的数据一致，
+        避免长轮询在只写入了半个字符时立即返回空数据。
+        """
+        return max(0, self._readable_end() - max(offset, self._start))
+
+    def clear(self) -> None:
+        """
+        清空缓冲区
+
+        重置缓冲区内容、偏移量和截断状态。
+        """
+        with self._lock:
+            self._segments.clear()
+            self._start = 0
+            self._end = 0
+            self._reset_text_cache()
+
+    def close(self) -> None:
+        """
+        释放缓冲区占用的资源
+
+        任务被清理时调用，之后不应再读写该缓冲区。
+        """
+        self.clear()
+        self.finish()
+
+
+class _SpillFile:
+    """
+    落盘模式使用的临时文件，只追加写入，通过 mmap 按需读取切片
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        fd, self.path = tempfile.mkstemp(
+            prefix="streaming-", suffix=".log", dir=directory
+        )
+        self.file = os.fdopen(fd, "w+b")
+        self.size = 0
+        self._mmap: Optional[mmap.mmap] = None
+
+    def append(self, data: bytes) -> None:
+        self.file.write(data)
+        self.size += len(data)
+
+    def read(self, start: int, end: int) -> bytes:
+        """读取文件中 [start, end) 范围的数据，只复制这一段"""
+        if start >= end:
+            return b""
+        if self._mmap is None or len(self._mmap) < end:
+            # 文件在上次映射后有追加，重新映射到当前大小
+            self.file.flush()
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[start:end]
+
+    def close(self) -> None:
+        """关闭映射和文件并删除临时文件，可重复调用"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if not self.file.closed:
+            self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class SpillingStreamingBuffer(StreamingBuffer):
+    """
+    落盘模式的流式输出缓冲区
+
+    最新的 memory_size 字节总是保留在内存尾部，更早的输出分批追加到临时文件。
+    增量查询和长轮询读取的最新数据直接从内存返回；读取文件中更早的数据时
+    通过 mmap 只取出请求的范围，不会复制全部历史输出，文件增长超过已映射的
+    长度时才重新映射。
+
+    临时文件大小不超过 disk_quota。即将超出时，丢弃文件中较旧的一半数据，
+    将其余数据复制到新的临时文件（每个字节平均只复制一次），
+    因此配额用满后保留的历史输出在 disk_quota 的一半到全部之间。
+
+    偏移量语义与 StreamingBuffer 相同。缓冲区被回收或调用 close() 时删除临时文件。
+    """
+
+    def __init__(
+        self,
+        memory_size: int = DEFAULT_SPILL_MEMORY_SIZE,
+        disk_quota: int = DEFAULT_DISK_QUOTA,
+        directory: Optional[str] = None,
+        condition: Optional[threading.Condition] = None,
+    ):
+        """
+        初始化缓冲区
+
+        Args:
+            memory_size: 内存尾部的最大大小（字节），默认 1MB
+            disk_quota: 临时文件的最大大小（字节），默认 1GB
+            directory: 临时文件所在目录，默认为系统临时目录
+            condition: 用作缓冲区锁的条件变量，见 StreamingBuffer
+        """
+        super().__init__(max_size=disk_quota, condition=condition)
+        self._memory_size: int = min(memory_size, disk_quota)
+        # 内存尾部超过 memory_size 这么多字节后才写入文件，避免每次写入都写文件
+        self._flush_size: int = max(1, min(self._memory_size, SEGMENT_SIZE))
+        self._disk_quota: int = disk_quota
+        self._directory: Optional[str] = directory
+        # 尚未落盘的最新数据，写入文件后仍保留最新的 memory_size 字节
+        self._tail: bytearray = bytearray()
+        self._spill: Optional[_SpillFile] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        # 临时文件第一个字节的绝对偏移量
+        self._file_base: int = 0
+        self._closed: bool = False
+
+    def write(self, data: bytes) -> None:
+        """
+        写入数据到缓冲区
+
+        数据先追加到内存尾部，尾部超过 memory_size 后将较旧的部分写入临时文件。
+
+        Args:
+            data: 要写入的字节数据
+        """
+        if not data:
+            return
+
+        with self._lock:
+            if self._closed or self._frozen:
+                return
+            self._tail.extend(data)
+            self._end += len(data)
+            if len(self._tail) >= self._memory_size + self._flush_size:
+                self._flush_tail()
+            self._lock.notify_all()
+
+    def _flush_tail(self) -> None:
+        """
+        将内存尾部中超出 memory_size 的较旧部分写入临时文件，调用方需持有锁
+        """
+        count = len(self._tail) - self._memory_size
+        if count > self._disk_quota:
+            # 单次写入超过磁盘配额，只保留最新部分
+            del self._tail[: count - self._disk_quota]
+            count = self._disk_quota
+            self._start = self._end - len(self._tail)
+
+        if self._spill is None:
+            self._open_spill(self._end - len(self._tail))
+        elif (
+            self._spill.size + count > self._disk_quota
+            or self._file_base + self._spill.size < self._start
+        ):
+            self._compact(count)
+
+        self._spill.append(self._tail[:count])
+        del self._tail[:count]
+
+    def _open_spill(self, base: int) -> _SpillFile:
+        """创建新的临时文件，其第一个字节的绝对偏移量为 base，调用方需持有锁"""
+        spill = _SpillFile(self._directory)
+        self._spill = spill
+        self._finalizer = weakref.finalize(self, spill.close)
+        self._file_base = base
+        return spill
+
+    def _compact(self, incoming: int) -> None:
+        """
+        丢弃临时文件中较旧的数据，为 incoming 字节腾出空间，调用方需持有锁
+
+        保留的数据复制到新的临时文件，旧文件随即删除。
+        """
+        old = self._spill
+        old_finalizer = self._finalizer
+        file_end = self._file_base + old.size
+        keep = max(0, min(self._disk_quota // 2, self._disk_quota - incoming))
+        new_base = max(file_end - keep, self._start)
+        self._start = new_base
+
+        spill = self._open_spill(new_base)
+        for pos in range(new_base - (file_end - old.size), old.size, _COPY_CHUNK_SIZE):
+            spill.append(old.read(pos, min(pos + _COPY_CHUNK_SIZE, old.size)))
+        old_finalizer()
+
+    def _drop(self, count: int) -> None:
+        # 截断由磁盘配额控制，见 _compact
+        pass
+
+    def _read(self, offset: int, end: Optional[int] = None) -> bytes:
+        """
+        读取绝对偏移量 [offset, end) 范围的数据，end 默认为末尾，调用方需持有锁
+        """
+        offset = max(offset, self._start)
+        end = self._end if end is None else min(end, self._end)
+        if offset >= end:
+            return b""
+
+        file_end = self._end - len(self._tail)
+        parts = []
+        if offset < file_end and self._spill is not None:
+            parts.append(
+                self._spill.read(
+                    offset - self._file_base, min(end, file_end) - self._file_base
+                )
+            )
+        if end > file_end:
+            parts.append(bytes(self._tail[max(0, offset - file_end) : end - file_end]))
+        return b"".join(parts)
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        内存尾部和解码缓存占用的内存（字节），不包括临时文件
+        """
+        with self._lock:
+            return len(self._tail) + self._text_cache_chars
+
+    @property
+    def disk_bytes(self) -> int:
+        """
+        临时文件当前占用的字节数
+        """
+        with self._lock:
+            return self._spill.size if self._spill is not None else 0
+
     def clear(self) -> None:
         """
         清空缓冲区
-        
-        重置缓冲区内容和截断状态。
+
+        删除临时文件并重置缓冲区内容、偏移量和截断状态。
+        """
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+            self._spill = None
+            self._finalizer = None
+            self._tail.clear()
+            self._file_base = 0
+            self._start = 0
+            self._end = 0
+            self._reset_text_cache()
+
+    def close(self) -> None:
+        """
+        删除临时文件并释放内存，之后的写入将被忽略
         """
+        self.clear()
         with self._lock:
-            self._buffer.clear()
-            self._truncated = False
-            self._truncated_bytes = 0
+            self._closed = True
+        self.finish()
+
+
+def wait_for_output(
+    streams: Sequence[Tuple[StreamingBuffer, int]],
+    min_new_bytes: int = 1,
+    timeout: Optional[float] = None,
+) -> bool:
+    """
+    等待新输出（长轮询）
+
+    阻塞直到各缓冲区在给定偏移量之后累计写入了至少 min_new_bytes 字节、
+    任一缓冲区被标记为结束，或等待超时。所有缓冲区必须共享同一个条件变量。
+
+    Args:
+        streams: (缓冲区, 绝对偏移量) 列表
+        min_new_bytes: 需要等待的新字节数（所有缓冲区合计）
+        timeout: 最长等待时间（秒），None 表示一直等待
+
+    Returns:
+        等到新输出或结束时返回 True，超时返回 False
+
+    Raises:
+        ValueError: 缓冲区没有共享同一个条件变量
+    """
+    condition = streams[0][0]._lock
+    if any(buffer._lock is not condition for buffer, _offset in streams):
+        raise ValueError(
+            "buffers must share the same condition to be waited on together"
+        )
+
+    def ready() -> bool:
+        if any(buffer._finished for buffer, _offset in streams):
+            return True
+        pending = sum(buffer._pending_bytes(offset) for buffer, offset in streams)
+        return pending >= min_new_bytes
+
+    with condition:
+        return condition.wait_for(ready, timeout)
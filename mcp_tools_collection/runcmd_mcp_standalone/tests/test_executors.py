@@ -0,0 +1,57 @@
+"""
+execute_with_pty_fallback 的降级测试
+"""
+
+import pytest
+
+from runcmd_mcp import executors
+from runcmd_mcp.executors import PosixPtyExecutor, execute_with_pty_fallback
+from runcmd_mcp.streaming_buffer import StreamingBuffer
+
+pytestmark = pytest.mark.skipif(
+    not executors.POSIX_PTY_AVAILABLE, reason="requires POSIX pty"
+)
+
+
+def _run(command):
+    return execute_with_pty_fallback(
+        command, StreamingBuffer(), StreamingBuffer(), use_pty=True, timeout=10
+    )
+
+
+def test_error_after_start_is_not_retried(tmp_path, monkeypatch):
+    marker = tmp_path / "runs"
+
+    def fail_after_exit(self, master_fd, deadline):
+        self._process.wait()
+        raise RuntimeError("read failed")
+
+    monkeypatch.setattr(PosixPtyExecutor, "_read_until_exit", fail_after_exit)
+    with pytest.raises(RuntimeError, match="read failed"):
+        _run(f"echo run >> {marker}")
+    assert marker.read_text().splitlines() == ["run"]
+
+
+def test_init_error_falls_back_to_subprocess(tmp_path, monkeypatch):
+    marker = tmp_path / "runs"
+
+    def no_pty():
+        raise OSError("out of pty devices")
+
+    monkeypatch.setattr(executors.pty, "openpty", no_pty)
+    result = _run(f"echo run >> {marker}")
+    assert result["exit_code"] == 0
+    assert not result["pty_used"]
+    assert result["pty_fallback"]
+    assert "out of pty devices" in result["fallback_reason"]
+    assert marker.read_text().splitlines() == ["run"]
+
+
+def test_pty_output_is_a_tty():
+    stdout = StreamingBuffer()
+    result = execute_with_pty_fallback(
+        "test -t 1 && echo tty", stdout, StreamingBuffer(), use_pty=True
+    )
+    assert result["pty_used"]
+    assert result["exit_code"] == 0
+    assert stdout.get_output()["data"] == "tty\n"
@@ -0,0 +1,72 @@
+"""
+IoPump 的超时和停止测试
+"""
+
+import threading
+
+import pytest
+
+from runcmd_mcp.io_pump import PUMP_SUPPORTED, IoPump
+from runcmd_mcp.streaming_buffer import StreamingBuffer
+
+pytestmark = pytest.mark.skipif(not PUMP_SUPPORTED, reason="requires POSIX")
+
+
+def _is_alive(pid):
+    # 容器中孤儿进程可能不会被回收，僵尸进程视为已退出
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def _start(pump, command, timeout=None):
+    stdout = StreamingBuffer()
+    done = threading.Event()
+    results = []
+
+    def on_complete(result):
+        results.append(result)
+        done.set()
+
+    pump.start_process(command, stdout, StreamingBuffer(), on_complete, timeout=timeout)
+    return stdout, done, results
+
+
+@pytest.fixture
+def pump():
+    pump = IoPump()
+    yield pump
+    pump.shutdown()
+
+
+def test_timeout_kills_whole_process_group(pump):
+    stdout, done, results = _start(pump, "sleep 30 & echo $!; wait", timeout=0.3)
+    assert done.wait(5)
+
+    assert results == [{"exit_code": -1, "timeout_occurred": True}]
+    child = int(stdout.get_output()["data"])
+    assert not _is_alive(child)
+
+
+def test_output_and_exit_code(pump):
+    stdout, done, results = _start(pump, "printf 'a\\nb'; exit 3")
+    assert done.wait(5)
+
+    assert results == [{"exit_code": 3, "timeout_occurred": False}]
+    assert stdout.get_output()["data"] == "a\nb"
+
+
+def test_shutdown_stops_thread_and_running_commands():
+    pump = IoPump()
+    _stdout, done, results = _start(pump, "sleep 30")
+    thread = pump._thread
+
+    pump.shutdown(timeout=5)
+    assert not thread.is_alive()
+    assert done.is_set()
+    assert results[0]["exit_code"] == -1
+    assert pump.active_count == 0
+    with pytest.raises(RuntimeError):
+        _start(pump, "true")
@@ -0,0 +1,147 @@
+"""
+CommandScheduler 的排队、优先级和槽位释放测试
+"""
+
+import threading
+
+import pytest
+
+from runcmd_mcp.scheduler import CommandScheduler, QueueFullError
+
+
+class _Recorder:
+    """记录启动顺序，启动函数可能在启动线程中执行"""
+
+    def __init__(self):
+        self.started = []
+        self.admitted = []
+        self._cond = threading.Condition()
+
+    def starter(self, token):
+        def start():
+            with self._cond:
+                self.started.append(token)
+                self._cond.notify_all()
+
+        return start
+
+    def on_admit(self, token):
+        self.admitted.append(token)
+
+    def wait_started(self, count, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.started) >= count, timeout)
+
+
+@pytest.fixture
+def recorder():
+    return _Recorder()
+
+
+@pytest.fixture
+def scheduler(recorder):
+    scheduler = CommandScheduler(
+        max_concurrent=1, max_queued=3, on_admit=recorder.on_admit
+    )
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_submit_queues_when_full(scheduler, recorder):
+    assert scheduler.submit("a", recorder.starter("a"))
+    assert not scheduler.submit("b", recorder.starter("b"))
+
+    assert recorder.started == ["a"]
+    assert recorder.admitted == ["a"]
+    assert scheduler.running_count == 1
+    assert scheduler.queued_count == 1
+
+
+def test_submit_rejects_when_queue_full(scheduler, recorder):
+    for token in "abcd":
+        scheduler.submit(token, recorder.starter(token))
+
+    with pytest.raises(QueueFullError):
+        scheduler.submit("e", recorder.starter("e"))
+    assert scheduler.queued_count == 3
+
+
+def test_priority_then_fifo_order(scheduler, recorder):
+    scheduler.submit("running", recorder.starter("running"))
+    scheduler.submit("low", recorder.starter("low"), priority=-1)
+    scheduler.submit("first", recorder.starter("first"))
+    scheduler.submit("second", recorder.starter("second"))
+
+    assert scheduler.position("first") == 1
+    assert scheduler.position("second") == 2
+    assert scheduler.position("low") == 3
+    assert scheduler.position("running") is None
+
+    scheduler.max_queued = 0
+    scheduler.submit("urgent", recorder.starter("urgent"), priority=5)
+    assert scheduler.position("urgent") == 1
+
+    for count, token in enumerate(["urgent", "first", "second", "low"], start=2):
+        scheduler.finish(recorder.started[-1])
+        recorder.wait_started(count)
+        assert recorder.started[-1] == token
+    assert recorder.admitted == recorder.started
+
+
+def test_finish_admits_next_on_launcher_thread(scheduler):
+    threads = []
+    done = threading.Event()
+
+    def start():
+        threads.append(threading.current_thread())
+        done.set()
+
+    scheduler.submit("a", lambda: None)
+    scheduler.submit("b", start)
+    scheduler.finish("a")
+
+    assert done.wait(5)
+    assert threads[0] is not threading.current_thread()
+    assert threads[0].name == "runcmd-launcher"
+    assert scheduler.running_count == 1
+    assert scheduler.queued_count == 0
+
+
+def test_finish_removes_queued_command(scheduler, recorder):
+    scheduler.submit("a", recorder.starter("a"))
+    scheduler.submit("b", recorder.starter("b"))
+    scheduler.submit("c", recorder.starter("c"))
+
+    scheduler.finish("b")
+    assert scheduler.position("b") is None
+    assert scheduler.position("c") == 1
+
+    # 重复调用不影响其他命令
+    scheduler.finish("b")
+    scheduler.finish("a")
+    recorder.wait_started(2)
+    assert recorder.started == ["a", "c"]
+
+
+def test_start_failure_releases_slot():
+    failures = []
+    scheduler = CommandScheduler(
+        max_concurrent=1, on_start_failed=lambda token, e: failures.append((token, e))
+    )
+
+    def fail():
+        raise OSError("fork failed")
+
+    scheduler.submit("a", fail)
+    assert [(token, str(e)) for token, e in failures] == [("a", "fork failed")]
+    assert scheduler.running_count == 0
+    assert scheduler.submit("b", lambda: None)
+
+
+def test_unlimited_concurrency():
+    scheduler = CommandScheduler(max_concurrent=0)
+    assert all(scheduler.submit(str(i), lambda: None) for i in range(100))
+    assert scheduler.running_count == 100
+
+    with pytest.raises(ValueError):
+        CommandScheduler(max_concurrent=-1)
@@ -0,0 +1,177 @@
+"""
+RunCmdService 的调度和任务状态测试
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from runcmd_mcp.service import RunCmdService
+
+
+@pytest.fixture
+def service():
+    service = RunCmdService(io_mode="thread", reap_interval=0, max_concurrent=1)
+    yield service
+    service.shutdown()
+
+
+def _wait_completed(service, token, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = service.query_command_status(token)
+        if result["status"] == "completed":
+            return result
+        time.sleep(0.01)
+    raise AssertionError(f"command {token} did not complete")
+
+
+def test_start_failure_completes_command(service, monkeypatch):
+    def fail_start(*args):
+        raise RuntimeError("can't start new thread")
+
+    monkeypatch.setattr(service, "_start_thread", fail_start)
+    token = service.run_command("echo hi")
+
+    result = _wait_completed(service, token)
+    assert result["exit_code"] == -1
+    assert "can't start new thread" in result["stderr"]
+    assert token in service._completed_lru
+    assert service._scheduler.running_count == 0
+
+
+def test_queued_start_failure_completes_command(service, monkeypatch):
+    started = []
+
+    def start(token, *args):
+        if started:
+            raise RuntimeError("event loop is closed")
+        started.append(token)
+
+    monkeypatch.setattr(service, "_start_thread", start)
+    first = service.run_command("echo first")
+    second = service.run_command("echo second")
+    assert service.query_command_status(second)["status"] == "pending"
+
+    # 释放第一个命令的槽位，第二个命令在启动线程中启动失败
+    service._scheduler.finish(first)
+    result = _wait_completed(service, second)
+    assert result["exit_code"] == -1
+    assert second in service._completed_lru
+
+    service.max_tasks = 1
+    service._complete_command(
+        first,
+        {
+            "exit_code": 0,
+            "timeout_occurred": False,
+            "pty_used": False,
+            "pty_fallback": False,
+        },
+        0,
+    )
+    assert service.enforce_retention() == 1
+    assert service.query_command_status(second)["status"] == "not_found"
+
+
+def test_asyncio_mode_runs_and_queries_on_running_loop():
+    service = RunCmdService(io_mode="asyncio", reap_interval=0)
+
+    async def main():
+        token = await service.run_command_async("echo hi")
+        result = await service.query_command_status_async(token, wait_ms=5000)
+        while result["status"] != "completed":
+            result = await service.query_command_status_async(token, wait_ms=5000)
+        stats = await service.get_stats_async()
+        return result, stats
+
+    try:
+        result, stats = asyncio.run(main())
+    finally:
+        service.shutdown()
+    assert result["exit_code"] == 0
+    assert result["stdout"] == "hi\n"
+    assert stats["completed_count"] == 1
+
+
+_RESULT = {
+    "exit_code": 0,
+    "timeout_occurred": False,
+    "pty_used": False,
+    "pty_fallback": False,
+}
+
+
+@pytest.fixture
+def idle_service(monkeypatch):
+    # 命令不真正启动，由测试调用 _complete_command 结束
+    service = RunCmdService(io_mode="thread", reap_interval=0, max_concurrent=0)
+    monkeypatch.setattr(service, "_start_thread", lambda *args: None)
+    yield service
+    service.shutdown()
+
+
+def _complete(service, token, output=b""):
+    service.commands[token].stdout_buffer.write(output)
+    service._complete_command(token, _RESULT, 0)
+
+
+def _status(service, token):
+    return service.query_command_status(token)["status"]
+
+
+def test_ttl_evicts_only_expired_completed_tasks(idle_service):
+    idle_service.task_ttl = 0.2
+    old, new, running = [
+        idle_service.run_command(f"echo {name}") for name in ("old", "new", "running")
+    ]
+    _complete(idle_service, old)
+    time.sleep(0.3)
+    _complete(idle_service, new)
+
+    assert idle_service.enforce_retention() == 1
+    assert _status(idle_service, old) == "not_found"
+    assert _status(idle_service, new) == "completed"
+    assert _status(idle_service, running) == "running"
+    assert idle_service.get_stats()["evicted_count"] == 1
+
+
+def test_max_tasks_evicts_least_recently_queried(idle_service):
+    tokens = [idle_service.run_command(f"echo {i}") for i in range(3)]
+    for token in tokens:
+        _complete(idle_service, token)
+    running = idle_service.run_command("echo running")
+
+    # 查询使第一个任务变为最近访问
+    _status(idle_service, tokens[0])
+    idle_service.max_tasks = 2
+    assert idle_service.enforce_retention() == 2
+    assert _status(idle_service, tokens[0]) == "completed"
+    assert _status(idle_service, tokens[1]) == "not_found"
+    assert _status(idle_service, tokens[2]) == "not_found"
+    assert _status(idle_service, running) == "running"
+
+
+def test_running_tasks_are_never_evicted(idle_service):
+    idle_service.max_tasks = 1
+    idle_service.task_ttl = 0.01
+    tokens = [idle_service.run_command(f"echo {i}") for i in range(3)]
+    time.sleep(0.05)
+
+    assert idle_service.enforce_retention() == 0
+    assert all(_status(idle_service, token) == "running" for token in tokens)
+
+
+def test_max_total_bytes_evicts_oldest_output(idle_service):
+    tokens = [idle_service.run_command(f"echo {i}") for i in range(3)]
+    for token in tokens:
+        _complete(idle_service, token, b"x" * 1000)
+    assert idle_service.get_stats()["resident_bytes"] >= 3000
+
+    idle_service.max_total_bytes = 2500
+    assert idle_service.enforce_retention() == 1
+    assert _status(idle_service, tokens[0]) == "not_found"
+    stats = idle_service.get_stats()
+    assert stats["resident_bytes"] <= 2500
+    assert stats["evicted_count"] == 1
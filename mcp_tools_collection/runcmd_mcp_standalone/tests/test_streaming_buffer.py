@@ -0,0 +1,246 @@
+"""
+StreamingBuffer 和 SpillingStreamingBuffer 测试
+"""
+
+import mmap
+import threading
+import time
+
+from runcmd_mcp import streaming_buffer
+from runcmd_mcp.streaming_buffer import (
+    SpillingStreamingBuffer,
+    StreamingBuffer,
+    wait_for_output,
+)
+
+
+def test_partial_character_held_back_while_running():
+    buffer = StreamingBuffer()
+    buffer.write(b"x\xe4")
+
+    result = buffer.get_output()
+    assert result["data"] == "x"
+    assert result["next_offset"] == 1
+    assert result["length"] == 2
+
+
+def test_partial_tail_returned_after_finish():
+    buffer = StreamingBuffer()
+    buffer.write(b"x\xe4")
+    buffer.get_output()
+    buffer.freeze()
+
+    result = buffer.get_output()
+    assert result["data"] == "x\ufffd"
+    assert result["next_offset"] == result["length"] == 2
+    assert not result["has_more"]
+
+
+def test_wait_ignores_partial_character():
+    # "中" 的 UTF-8 编码为 e4 b8 ad，只写入前两个字节
+    buffer = StreamingBuffer()
+    buffer.write(b"a" + "中".encode("utf-8")[:2])
+
+    start = time.monotonic()
+    assert not wait_for_output([(buffer, 1)], timeout=0.2)
+    assert time.monotonic() - start >= 0.15
+    assert buffer.get_output(offset=1)["data"] == ""
+
+    timer = threading.Timer(0.05, buffer.write, args=("中".encode("utf-8")[2:],))
+    timer.start()
+    assert wait_for_output([(buffer, 1)], timeout=5)
+    timer.join()
+    assert buffer.get_output(offset=1)["data"] == "中"
+
+
+def test_text_cache_is_bounded_and_dropped_on_freeze():
+    buffer = StreamingBuffer()
+    buffer.write(b"x" * (1024 * 1024))
+
+    # 大段查询不缓存完整输出的字符串副本
+    assert len(buffer.get_output()["data"]) == 1024 * 1024
+    assert buffer.memory_bytes == 1024 * 1024
+
+    buffer.write(b"y" * 10)
+    buffer.get_output(offset=1024 * 1024)
+    assert buffer.memory_bytes == 1024 * 1024 + 20
+
+    buffer.freeze()
+    assert buffer.memory_bytes == 1024 * 1024 + 10
+    buffer.get_output(offset=1024 * 1024)
+    assert buffer.memory_bytes == 1024 * 1024 + 10
+
+
+def test_spill_keeps_recent_output_in_memory(tmp_path, monkeypatch):
+    maps = []
+    real_mmap = mmap.mmap
+
+    def counting_mmap(*args, **kwargs):
+        maps.append(args)
+        return real_mmap(*args, **kwargs)
+
+    monkeypatch.setattr(streaming_buffer.mmap, "mmap", counting_mmap)
+    buffer = SpillingStreamingBuffer(memory_size=1024, directory=str(tmp_path))
+    data = bytes(range(256)) * 64
+    buffer.write(data)
+    assert buffer.disk_bytes == len(data) - 1024
+    assert buffer.memory_bytes == 1024
+
+    # 增量查询最新的数据不访问临时文件
+    offset = len(data)
+    for i in range(100):
+        buffer.write(b"line %d\n" % i)
+        result = buffer.get_output(offset=offset)
+        assert result["data"] == "line %d\n" % i
+        offset = result["next_offset"]
+    assert maps == []
+
+    # 读取文件中的数据时映射一次，文件没有增长时复用映射
+    assert buffer.get_output(max_bytes=4)["data"] == "\x00\x01\x02\x03"
+    assert buffer.get_output(offset=100, max_bytes=10)["next_offset"] == 110
+    assert len(maps) == 1
+    buffer.close()
+
+
+def test_offsets_are_absolute_across_eviction():
+    buffer = StreamingBuffer(max_size=10)
+    buffer.write(b"0123456789")
+    first = buffer.get_output()
+    assert (first["data"], first["next_offset"]) == ("0123456789", 10)
+
+    buffer.write(b"abcde")
+    assert buffer.length == 15
+    assert buffer.size == 10
+    assert buffer.start_offset == buffer.truncated_bytes == 5
+    assert buffer.truncated
+
+    # 旧偏移量仍指向同一位置
+    result = buffer.get_output(offset=first["next_offset"])
+    assert (result["data"], result["offset"], result["next_offset"]) == (
+        "abcde",
+        10,
+        15,
+    )
+    # 已被截断的偏移量从最早保留的数据开始
+    result = buffer.get_output(offset=2)
+    assert (result["data"], result["offset"]) == ("56789abcde", 5)
+    assert result["truncated"] and result["start_offset"] == 5
+
+
+def test_eviction_drops_whole_segments(monkeypatch):
+    monkeypatch.setattr(streaming_buffer, "SEGMENT_SIZE", 4)
+    buffer = StreamingBuffer(max_size=8)
+    for chunk in (b"aaaa", b"bbbb", b"cccc", b"dd"):
+        buffer.write(chunk)
+
+    assert [start for start, _segment in buffer._segments] == [4, 8, 12]
+    assert buffer.get_all() == "bbccccdd"
+    assert buffer.get_output(offset=6)["data"] == "bbccccdd"
+
+
+def test_large_write_keeps_newest_bytes():
+    buffer = StreamingBuffer(max_size=4)
+    buffer.write(b"x" * 100 + b"tail")
+    result = buffer.get_output()
+    assert (result["data"], result["offset"], result["length"]) == ("tail", 100, 104)
+
+
+def test_clear_resets_offsets():
+    buffer = StreamingBuffer(max_size=4)
+    buffer.write(b"abcdef")
+    buffer.clear()
+    assert (buffer.length, buffer.start_offset, buffer.truncated) == (0, 0, False)
+    buffer.write(b"z")
+    assert buffer.get_output()["data"] == "z"
+
+
+def test_spill_reads_back_full_output(tmp_path):
+    buffer = SpillingStreamingBuffer(memory_size=16, directory=str(tmp_path))
+    expected = b"".join(b"line %04d\n" % i for i in range(500))
+    for start in range(0, len(expected), 37):
+        buffer.write(expected[start : start + 37])
+
+    assert buffer.disk_bytes > 0
+    assert buffer.get_output()["data"] == expected.decode()
+    result = buffer.get_output(offset=1000, max_bytes=20)
+    assert result["data"] == expected[1000:1020].decode()
+    assert result["has_more"]
+
+    buffer.freeze()
+    assert buffer.get_output(offset=4990)["data"] == expected[4990:].decode()
+
+
+def test_spill_quota_drops_oldest_half(tmp_path):
+    buffer = SpillingStreamingBuffer(
+        memory_size=10, disk_quota=100, directory=str(tmp_path)
+    )
+    data = bytes(range(48, 58)) * 30
+    for start in range(0, len(data), 10):
+        buffer.write(data[start : start + 10])
+
+    assert buffer.disk_bytes <= 100
+    result = buffer.get_output()
+    assert result["length"] == len(data)
+    assert result["offset"] == buffer.start_offset > 0
+    assert result["data"] == data[result["offset"] :].decode()
+
+
+def test_spill_file_removed_on_close(tmp_path):
+    buffer = SpillingStreamingBuffer(memory_size=4, directory=str(tmp_path))
+    buffer.write(b"x" * 100)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    buffer.close()
+    assert list(tmp_path.iterdir()) == []
+    buffer.write(b"ignored")
+    assert buffer.length == 0
+
+
+def test_paging_with_max_bytes():
+    buffer = StreamingBuffer()
+    buffer.write(b"abcdefghij")
+
+    pages, offset = [], 0
+    while True:
+        result = buffer.get_output(offset=offset, max_bytes=4)
+        pages.append(result["data"])
+        offset = result["next_offset"]
+        if not result["has_more"]:
+            break
+    assert pages == ["abcd", "efgh", "ij"]
+    assert offset == 10
+
+
+def test_paging_never_splits_characters():
+    buffer = StreamingBuffer()
+    buffer.write("a中文b".encode("utf-8"))
+
+    result = buffer.get_output(max_bytes=3)
+    assert (result["data"], result["next_offset"]) == ("a", 1)
+    # max_bytes 小于一个字符时仍返回一个完整字符
+    result = buffer.get_output(offset=1, max_bytes=1)
+    assert (result["data"], result["next_offset"]) == ("中", 4)
+    # 从字符中间开始时跳到下一个字符
+    assert buffer.get_output(offset=2)["data"] == "文b"
+
+
+def test_tail_bytes_and_lines():
+    buffer = StreamingBuffer()
+    buffer.write(b"one\ntwo\nthree\nfour\n")
+
+    assert buffer.get_output(tail_bytes=5)["data"] == "four\n"
+    assert buffer.get_output(tail_lines=2)["data"] == "three\nfour\n"
+    assert buffer.get_output(tail_lines=10)["data"] == "one\ntwo\nthree\nfour\n"
+    # 同时指定时取较短者，偏移量被忽略
+    result = buffer.get_output(offset=0, tail_lines=3, tail_bytes=8)
+    assert (result["data"], result["offset"]) == ("ee\nfour\n", 11)
+    assert not result["has_more"]
+
+
+def test_tail_lines_spanning_scan_chunks(monkeypatch):
+    monkeypatch.setattr(streaming_buffer, "_TAIL_SCAN_CHUNK_SIZE", 3)
+    buffer = StreamingBuffer()
+    buffer.write(b"aaaa\nbbbbbbb\ncc")
+
+    assert buffer.get_output(tail_lines=1)["data"] == "cc"
+    assert buffer.get_output(tail_lines=2)["data"] == "bbbbbbb\ncc"